@@ -12,6 +12,7 @@ import platform
 # Import custom modules
 from config import load_config, get_default_config, save_config
 from core import CursorFocusCore
+from rules_generator import wait_for_refinements
 from ui import (
     # Rich UI elements
     console, create_title_panel, display_menu, display_custom_progress,
@@ -1022,6 +1023,7 @@ def main_menu():
             about_menu()
         elif choice.lower() in ['q', '0', 'quit', 'exit']:
             console.print("\n[bold green]👋 Thank you for using CursorFocus![/]")
+            wait_for_refinements()
             time.sleep(1)
             sys.exit(0)
         else:
@@ -1040,9 +1042,14 @@ def handle_command_line():
     parser.add_argument('--list', '-l', action='store_true', help='List configured projects')
     parser.add_argument('--batch-update', '-b', action='store_true', help='Batch update all projects')
     parser.add_argument('--headless', action='store_true', help='Run in headless mode without interactive prompts')
+    parser.add_argument('--no-llm-cache', action='store_true', help='Always query the AI model instead of reusing cached responses')
     
     args = parser.parse_args()
     
+    # Read by every RulesGenerator created for this run
+    if args.no_llm_cache:
+        os.environ['LLM_CACHE'] = '0'
+    
     # Handle command line operation
     if len(sys.argv) > 1:
         if args.setup:
@@ -1191,6 +1198,7 @@ if __name__ == '__main__':
         if not handle_command_line():
             # Start interactive menu
             main_menu()
+        wait_for_refinements()
     except KeyboardInterrupt:
         console.print("\n\n[bold green]👋 Thank you for using CursorFocus![/]")
         sys.exit(0)
@@ -67,6 +67,11 @@ def get_default_config():
         "version": version,
         "project_path": "",
         "update_interval": 60,
+        "focus_update_mode": "events",
+        "focus_debounce": 1,
+        "focus_reconcile_interval": 600,
+        "llm_provider": "gemini",
+        "rules_refinement": "background",
         "max_depth": 3,
         "output_directory": ".me",
         "file_paths": {
@@ -200,6 +205,9 @@ IGNORED_KEYWORDS = {
 # Names of files and directories that should be ignored
 IGNORED_NAMES = set(_config.get('ignored_directories', []))
 
+# Glob patterns of files that should be ignored
+IGNORED_FILES = set(_config.get('ignored_files', []))
+
 FILE_LENGTH_STANDARDS = _config.get('file_length_standards', {})
 
 def get_file_length_limit(file_path):
@@ -12,7 +12,7 @@ from config import (
 )
 import re
 import logging
-from typing import Dict, List, Tuple, Set
+from typing import Dict, List, Tuple, Set, Optional, Iterable
 
 class ProjectMetrics:
     def __init__(self):
@@ -22,8 +22,64 @@ class ProjectMetrics:
         self.lines_by_type = {}
         self.files_with_functions = []
 
-def get_directory_structure(project_path: str, max_depth: int = 3, current_depth: int = 0, metrics: ProjectMetrics = None) -> Dict:
-    """Get the directory structure with file information."""
+class FileAnalysisCache:
+    """Function and line counts of files, reused while their size and mtime are unchanged.
+    
+    Lets Focus.md be regenerated after a change without reading every file
+    again. Changed directories can also be invalidated explicitly, for file
+    systems whose mtime is too coarse to show quick successive edits, and
+    files a full walk no longer reaches are dropped with start_walk() and
+    prune().
+    """
+
+    def __init__(self):
+        self.entries: Dict[str, Tuple[Tuple[int, int], List[Tuple[str, str]], int]] = {}
+        self.seen: Set[str] = set()  # Files analyzed since start_walk()
+
+    def analyze(self, file_path: str) -> Tuple[List[Tuple[str, str]], int]:
+        """analyze_file_content() of a file, from the cache while the file is unchanged."""
+        self.seen.add(file_path)
+        try:
+            st = os.stat(file_path)
+            key = (st.st_mtime_ns, st.st_size)
+        except OSError:
+            return analyze_file_content(file_path)
+
+        entry = self.entries.get(file_path)
+        if entry is not None and entry[0] == key:
+            return entry[1], entry[2]
+        functions, line_count = analyze_file_content(file_path)
+        self.entries[file_path] = (key, functions, line_count)
+        return functions, line_count
+
+    def invalidate(self, paths: Iterable[str]) -> None:
+        """Forget the files in or under the given paths."""
+        paths = set(paths)
+        prefixes = tuple(os.path.join(path, '') for path in paths)
+        for file_path in [f for f in self.entries if f in paths or f.startswith(prefixes)]:
+            del self.entries[file_path]
+
+    def start_walk(self) -> None:
+        """Start recording the files analyzed, for a following prune()."""
+        self.seen = set()
+
+    def prune(self) -> int:
+        """Forget the files not analyzed since start_walk(), e.g. deleted or renamed ones.
+        
+        Returns:
+            Number of entries dropped
+        """
+        stale = [file_path for file_path in self.entries if file_path not in self.seen]
+        for file_path in stale:
+            del self.entries[file_path]
+        return len(stale)
+
+def get_directory_structure(project_path: str, max_depth: int = 3, current_depth: int = 0, metrics: ProjectMetrics = None,
+                            cache: Optional[FileAnalysisCache] = None) -> Dict:
+    """Get the directory structure with file information.
+    
+    With a cache, files unchanged since an earlier call are not read again.
+    """
     if current_depth > max_depth:
         return {}
     
@@ -36,7 +92,7 @@ def get_directory_structure(project_path: str, max_depth: int = 3, current_depth
             item_path = os.path.join(project_path, item)
             
             if os.path.isdir(item_path):
-                substructure = get_directory_structure(item_path, max_depth, current_depth + 1, metrics)
+                substructure = get_directory_structure(item_path, max_depth, current_depth + 1, metrics, cache)
                 if substructure:
                     structure[item] = substructure
             else:
@@ -47,7 +103,7 @@ def get_directory_structure(project_path: str, max_depth: int = 3, current_depth
                 if ext not in CODE_EXTENSIONS:
                     continue
                     
-                functions, line_count = analyze_file_content(item_path)
+                functions, line_count = cache.analyze(item_path) if cache else analyze_file_content(item_path)
                 
                 if metrics:
                     metrics.total_files += 1
@@ -94,8 +150,14 @@ def structure_to_tree(structure: Dict, prefix: str = '', project_path: str = '')
     
     return lines
 
-def generate_focus_content(project_path: str, config: Dict) -> str:
-    """Generate the Focus file content."""
+def generate_focus_content(project_path: str, config: Dict, cache: Optional[FileAnalysisCache] = None) -> str:
+    """Generate the Focus file content.
+    
+    Args:
+        project_path: Path to the project
+        config: Settings, at least 'max_depth'
+        cache: File analyses kept between calls, see FileAnalysisCache
+    """
     metrics = ProjectMetrics()
     
     project_type = detect_project_type(project_path)
@@ -122,7 +184,7 @@ def generate_focus_content(project_path: str, config: Dict) -> str:
     ]
     
     # Add directory structure with integrated file information
-    structure = get_directory_structure(project_path, config['max_depth'], metrics=metrics)
+    structure = get_directory_structure(project_path, config['max_depth'], metrics=metrics, cache=cache)
     content.extend(structure_to_tree(structure))
     
     # Add files with functions section
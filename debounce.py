@@ -0,0 +1,96 @@
+import time
+import logging
+import threading
+from typing import Callable, Optional, Set
+
+class Debouncer:
+    """Coalesce bursts of events into one call, made once the burst is over.
+
+    Every trigger() adds its key to the pending set and restarts the quiet
+    window; when no trigger arrived for `delay` seconds, the callback runs
+    once with all keys collected. With max_wait set, a burst that never goes
+    quiet is still flushed that many seconds after its first event. Calls
+    never overlap: events arriving while the callback runs start a new
+    window.
+
+    Example:
+        debouncer = Debouncer(5, lambda paths: regenerate(paths))
+        debouncer.trigger('/project/package.json')
+    """
+
+    def __init__(self, delay: float, callback: Callable[[Set[str]], None],
+                 max_wait: Optional[float] = None, name: str = 'debouncer'):
+        """
+        Args:
+            delay: Quiet seconds after the last event before the callback runs
+            callback: Called with the set of keys collected during the burst
+            max_wait: Longest time an event may wait, None for no limit
+            name: Name of the worker thread
+        """
+        self.delay = delay
+        self.callback = callback
+        self.max_wait = max_wait
+        self.name = name
+        self.logger = logging.getLogger(__name__)
+        self._pending: Set[str] = set()
+        self._first_event = None
+        self._deadline = None
+        self._worker = None
+        self._condition = threading.Condition()
+        self._run_lock = threading.Lock()
+
+    def trigger(self, key: str) -> None:
+        """Record an event and restart the quiet window.
+        
+        Only moves the deadline; one worker thread per burst sleeps until it,
+        so a flood of events costs no thread or timer per event.
+        """
+        with self._condition:
+            now = time.monotonic()
+            if not self._pending:
+                self._first_event = now
+            self._pending.add(key)
+
+            deadline = now + self.delay
+            if self.max_wait is not None:
+                deadline = min(deadline, self._first_event + self.max_wait)
+            self._deadline = deadline
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._wait, name=self.name, daemon=True)
+                self._worker.start()
+
+    def _wait(self) -> None:
+        """Sleep until the deadline of the pending events, then flush them."""
+        while True:
+            with self._condition:
+                while self._pending and time.monotonic() < self._deadline:
+                    self._condition.wait(self._deadline - time.monotonic())
+                if not self._pending:
+                    self._worker = None
+                    return
+            self.flush()
+
+    def flush(self) -> None:
+        """Run the callback now with the pending keys, if there are any."""
+        with self._run_lock:
+            with self._condition:
+                keys, self._pending = self._pending, set()
+                self._condition.notify_all()
+            if not keys:
+                return
+            try:
+                self.callback(keys)
+            except Exception as e:
+                self.logger.error(f"Error handling {len(keys)} coalesced events: {e}", exc_info=True)
+
+    def cancel(self) -> None:
+        """Drop the pending keys without calling the callback."""
+        with self._condition:
+            self._pending = set()
+            self._condition.notify_all()
+
+    @property
+    def pending(self) -> Set[str]:
+        """Keys collected since the last call."""
+        with self._condition:
+            return set(self._pending)
@@ -2,45 +2,76 @@ import os
 import time
 from datetime import datetime
 from config import load_config, get_default_config
-from content_generator import generate_focus_content
+from content_generator import generate_focus_content, FileAnalysisCache
+from analyzers import should_ignore_file
+from debounce import Debouncer
 from rules_analyzer import RulesAnalyzer
-from rules_generator import RulesGenerator
-from rules_watcher import ProjectWatcherManager
+from rules_generator import RulesGenerator, rules_refinement_mode
+from rules_watcher import ProjectWatcherManager, get_dispatcher
+from watchdog.events import FileSystemEventHandler
 import logging
 from auto_updater import AutoUpdater
 from dotenv import load_dotenv, set_key
 
+# Debouncer key of the periodic full reconcile of Focus.md
+RECONCILE = ''
+
 def retry_generate_rules(project_path, project_name, max_retries=3):
-    """Retry generating rules file automatically."""
+    """Generate rules file, asking again for a missing API key up to max_retries times.
+    
+    Unless rules_refinement is 'sync', the rules are first written from the
+    local analysis, so .cursorrules is ready at once; in 'background' mode the
+    AI rules replace them when they arrive.
+    
+    Transient AI errors (rate limits, server errors, timeouts) are retried
+    by the LLM request scheduler, so any other error is reported at once.
+    """
+    print(f"\n📄 Analyzing: {project_path}")
+    analyzer = RulesAnalyzer(project_path)
+    project_info = analyzer.analyze_project_for_rules()
+    
+    # Ask for format preference using numbers, once for all attempts
+    print("\nSelect format for .cursorrules file:")
+    print("1. JSON")
+    print("2. Markdown")
+    while True:
+        try:
+            choice = int(input("Enter selection (1-2): "))
+            if choice in [1, 2]:
+                format_choice = 'json' if choice == 1 else 'markdown'
+                break
+            print("Please enter 1 or 2")
+        except ValueError:
+            print("Please enter a number")
+    
+    # The AI client is created on first use, so a retry after entering a key reuses the analysis
+    rules_generator = RulesGenerator(project_path)
+    refinement = rules_refinement_mode()
+    local_rules_file = None
+    if refinement != 'sync':
+        local_rules_file = rules_generator.generate_heuristic_rules_file(dict(project_info), format=format_choice)
+        print(f"✓ {os.path.basename(local_rules_file)} (from local analysis)")
+        if refinement == 'off':
+            return local_rules_file
+
     retries = 0
-    while retries < max_retries:
+    while True:
         try:
-            print(f"\n📄 Analyzing: {project_path}")
-            analyzer = RulesAnalyzer(project_path)
-            project_info = analyzer.analyze_project_for_rules()
-            
-            # Ask for format preference using numbers
-            print("\nSelect format for .cursorrules file:")
-            print("1. JSON")
-            print("2. Markdown")
-            while True:
-                try:
-                    choice = int(input("Enter selection (1-2): "))
-                    if choice in [1, 2]:
-                        format_choice = 'json' if choice == 1 else 'markdown'
-                        break
-                    print("Please enter 1 or 2")
-                except ValueError:
-                    print("Please enter a number")
-            
-            rules_generator = RulesGenerator(project_path)
+            if refinement == 'background':
+                # Set up the provider here, where a missing API key can still be asked for
+                rules_generator.provider
+                rules_generator.refine_rules_in_background(project_info, format=format_choice)
+                print("⏳ Refining rules with AI in the background")
+                return local_rules_file
+
             rules_file = rules_generator.generate_rules_file(project_info, format=format_choice)
             print(f"✓ {os.path.basename(rules_file)}")
             return rules_file
         except Exception as e:
             error_msg = str(e)
             # Check if it's an API key error
-            if "GEMINI_API_KEY is required" in error_msg:
+            if "GEMINI_API_KEY is required" in error_msg and retries < max_retries:
+                retries += 1
                 print("\n⚠️ Gemini API Key is not set")
                 print("Please enter your API key (get key at https://makersuite.google.com/app/apikey):")
                 api_key = input()
@@ -60,18 +91,16 @@ def retry_generate_rules(project_path, project_name, max_retries=3):
                     continue
                 else:
                     print("❌ Invalid API key")
+                    if local_rules_file:
+                        print("⚠️ Keeping the locally generated rules")
+                        return local_rules_file
                     raise ValueError("API key is not provided")
             
-            retries += 1
-            if retries < max_retries:
-                wait_time = 2 * (2 ** (retries - 1))  # Exponential backoff
-                print(f"\n⚠️ Error occurred, automatically retrying in {wait_time} seconds... (attempt {retries}/{max_retries})")
-                print(f"Error details: {str(e)}")
-                time.sleep(wait_time)
-                continue
-            else:
-                print(f"\n❌ Failed to generate rules after {max_retries} attempts: {e}")
-                raise
+            if local_rules_file:
+                print(f"⚠️ AI refinement failed, keeping the locally generated rules: {e}")
+                return local_rules_file
+            print(f"\n❌ Failed to generate rules: {e}")
+            raise
 
 def setup_cursor_focus(project_path, project_name=None):
     """Set up CursorFocus for a project by generating necessary files."""
@@ -100,8 +129,45 @@ def setup_cursor_focus(project_path, project_name=None):
         print(f"❌ Setup error: {e}")
         raise
 
+class FocusChangeTracker(FileSystemEventHandler):
+    """Report the files and directories of a project changed by file events.
+    
+    Ignored directories and the project's own Focus.md are skipped, so
+    writing Focus.md does not trigger another update.
+    """
+
+    def __init__(self, project_path: str, focus_file: str, on_change):
+        self.project_path = os.path.abspath(project_path)
+        self.focus_file = os.path.abspath(focus_file)
+        self.on_change = on_change
+
+    def on_any_event(self, event):
+        if event.event_type in ('opened', 'closed', 'closed_no_write'):
+            return
+        if event.is_directory and event.event_type == 'modified':
+            return  # The changed entries have events of their own
+        paths = [event.src_path] + ([event.dest_path] if getattr(event, 'dest_path', None) else [])
+        for path in map(os.fsdecode, paths):
+            if path == self.focus_file:
+                continue
+            rel_path = os.path.relpath(path, self.project_path)
+            if rel_path.startswith('..') or any(should_ignore_file(part) for part in rel_path.split(os.sep) if part != '.'):
+                continue
+            self.on_change(path)
+
+def _without_timestamp(content: str) -> str:
+    """Focus.md content without its 'Updated' line, to compare two versions."""
+    return content.rsplit('\n', 1)[0]
+
 def monitor_project(project_config, global_config):
-    """Monitor a single project."""
+    """Monitor a single project.
+    
+    With focus_update_mode 'events' (the default) Focus.md is regenerated
+    focus_debounce seconds after file changes stop, rereading only the files
+    that changed, and fully reconciled every focus_reconcile_interval seconds
+    in case an event was missed. 'poll' regenerates it every update_interval
+    seconds instead.
+    """
     project_path = project_config['project_path']
     project_name = project_config['name']
     print(f"👀 {project_name}")
@@ -110,32 +176,77 @@ def monitor_project(project_config, global_config):
     config = {**global_config, **project_config}
     
     focus_file = os.path.join(project_path, 'Focus.md')
-    last_content = None
-    last_update = 0
 
-    # Start rules watcher for this project
+    # Start rules watcher for this project, on the observer shared by all projects
     watcher = ProjectWatcherManager()
     watcher.add_project(project_path, project_name)
 
+    try:
+        if config.get('focus_update_mode', 'events') == 'poll':
+            _poll_focus(project_path, project_name, focus_file, config)
+        else:
+            _watch_focus(project_path, project_name, focus_file, config)
+    finally:
+        watcher.stop_all()
+
+def _write_focus(focus_file: str, project_name: str, content: str) -> bool:
+    try:
+        with open(focus_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+        print(f"✓ {project_name} ({datetime.now().strftime('%H:%M')})")
+        return True
+    except Exception as e:
+        print(f"❌ {project_name}: {e}")
+        return False
+
+def _poll_focus(project_path, project_name, focus_file, config):
+    """Regenerate Focus.md every update_interval seconds."""
+    last_content = None
     while True:
-        current_time = time.time()
-        
-        if current_time - last_update < config.get('update_interval', 60):
-            time.sleep(1)
-            continue
-            
         content = generate_focus_content(project_path, config)
-        
-        if content != last_content:
-            try:
-                with open(focus_file, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                last_content = content
-                print(f"✓ {project_name} ({datetime.now().strftime('%H:%M')})")
-            except Exception as e:
-                print(f"❌ {project_name}: {e}")
-        
-        last_update = current_time
+        if content != last_content and _write_focus(focus_file, project_name, content):
+            last_content = content
+        time.sleep(config.get('update_interval', 60))
+
+def _watch_focus(project_path, project_name, focus_file, config):
+    """Regenerate Focus.md after file changes, plus a periodic reconcile."""
+    cache = FileAnalysisCache()
+    state = {'content': None}
+    if os.path.exists(focus_file):
+        try:
+            with open(focus_file, 'r', encoding='utf-8') as f:
+                state['content'] = f.read()
+        except Exception:
+            pass
+
+    def regenerate(dirty_paths):
+        # Changed directories are reread; elsewhere only files with a new size or mtime are
+        cache.invalidate(path for path in dirty_paths if path != RECONCILE)
+        reconcile = RECONCILE in dirty_paths
+        if reconcile:
+            cache.start_walk()
+        content = generate_focus_content(project_path, config, cache=cache)
+        if reconcile:
+            # Files the walk no longer reached were deleted, renamed or ignored
+            cache.prune()
+        if state['content'] is None or _without_timestamp(content) != _without_timestamp(state['content']):
+            if _write_focus(focus_file, project_name, content):
+                state['content'] = content
+
+    debouncer = Debouncer(config.get('focus_debounce', 1), regenerate,
+                          max_wait=config.get('focus_max_wait', 10), name=f"focus-{project_name}")
+    tracker = FocusChangeTracker(project_path, focus_file, debouncer.trigger)
+    dispatcher = get_dispatcher()
+    dispatcher.register(project_path, tracker)
+    try:
+        reconcile_interval = config.get('focus_reconcile_interval', 600)
+        while True:
+            debouncer.trigger(RECONCILE)
+            debouncer.flush()
+            time.sleep(reconcile_interval)
+    finally:
+        dispatcher.unregister(project_path, tracker)
+        debouncer.cancel()
 
 def main():
     """Main function to monitor multiple projects."""
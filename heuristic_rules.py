@@ -0,0 +1,291 @@
+import os
+import re
+from collections import Counter
+from typing import Dict, Any, List, Optional, Tuple
+
+# A convention is stated as a rule once this share of the names follows it
+DOMINANT_SHARE = 0.6
+MAX_LISTED = 5  # Names quoted per rule
+MAX_MODULES = 10  # Modules described in the module organization
+LARGE_FILE_DEFINITIONS = 40  # Files with more classes and functions are worth splitting
+
+# Exception types too broad to recommend catching
+GENERIC_EXCEPTIONS = {'Exception', 'BaseException', 'Error', 'Throwable', 'RuntimeException', 'StandardError'}
+
+# Performance idioms recognised from imported modules and declared dependencies
+PERFORMANCE_HINTS = {
+    'functools': "Cache repeated pure computations with functools.lru_cache",
+    'concurrent': "Run independent I/O-bound work in a concurrent.futures thread pool",
+    'asyncio': "Use asyncio for concurrent I/O instead of blocking calls",
+    'threading': "Guard state shared between threads with locks",
+    'multiprocessing': "Move CPU-bound work to multiprocessing workers",
+    'numpy': "Vectorize numeric loops with numpy arrays",
+    'pandas': "Use vectorized pandas operations instead of row-by-row loops",
+    'react': "Memoize expensive renders with useMemo, useCallback or React.memo",
+    'lodash': "Debounce or throttle handlers of frequent events",
+    'System.Threading.Tasks': "Use async/await Tasks for I/O instead of blocking threads",
+}
+PERFORMANCE_AVOID = {
+    'requests': "Blocking HTTP requests without a timeout",
+    'threading': "Sharing mutable state between threads without a lock",
+    'asyncio': "Blocking calls inside coroutines",
+    'react': "Creating new objects and callbacks on every render of hot components",
+}
+
+CASE_PATTERNS = [
+    ('UPPER_CASE', re.compile(r'^[A-Z][A-Z0-9]*(?:_[A-Z0-9]+)+$')),
+    ('snake_case', re.compile(r'^[a-z][a-z0-9]*(?:_[a-z0-9]+)+$')),
+    ('camelCase', re.compile(r'^[a-z][a-z0-9]*(?:[A-Z][a-z0-9]*)+$')),
+    ('PascalCase', re.compile(r'^[A-Z][a-z0-9]+(?:[A-Z][a-z0-9]*)*$')),
+    ('kebab-case', re.compile(r'^[a-z][a-z0-9]*(?:-[a-z0-9]+)+$')),
+]
+
+def case_style(name: str) -> Optional[str]:
+    """Naming convention of an identifier, ignoring leading underscores.
+
+    Single lowercase words fit snake_case and camelCase alike and return None.
+    """
+    name = name.lstrip('_')
+    for style, pattern in CASE_PATTERNS:
+        if pattern.match(name):
+            return style
+    return None
+
+def _convention(names: List[str]) -> Tuple[Optional[str], float, Counter]:
+    """Dominant naming style of names, its share of the classified names, and all style counts."""
+    styles = Counter(style for style in map(case_style, names) if style)
+    if not styles:
+        return None, 0.0, styles
+    style, count = styles.most_common(1)[0]
+    return style, count / sum(styles.values()), styles
+
+def _percent(share: float) -> str:
+    return f"{round(share * 100)}%"
+
+def _top(counter: Counter, limit: int = MAX_LISTED) -> str:
+    return ', '.join(f"{name} ({count})" for name, count in counter.most_common(limit))
+
+def _module_of(path: str) -> str:
+    """Top-level module of a project file: its first directory, or its name for root files."""
+    parts = path.replace(os.sep, '/').split('/')
+    return parts[0] if len(parts) > 1 else os.path.splitext(parts[0])[0]
+
+def _naming(structure: Dict[str, Any]) -> Dict[str, Tuple[Optional[str], float, Counter, int]]:
+    """Naming conventions of classes, functions, files and directories."""
+    patterns = structure['patterns']
+    names = {
+        'classes': [p['name'] for p in patterns.get('class_patterns', [])],
+        'functions': [p['name'] for p in patterns.get('function_patterns', []) if not p['name'].startswith('__')],
+        'files': [os.path.splitext(os.path.basename(f))[0] for f in structure.get('files', [])],
+    }
+    naming = {kind: (*_convention(values), len(values)) for kind, values in names.items()}
+
+    directories = Counter(p['name_pattern'] for p in patterns.get('directory_patterns', []))
+    if directories:
+        style, count = directories.most_common(1)[0]
+        naming['directories'] = (style, count / sum(directories.values()), directories, sum(directories.values()))
+    return naming
+
+def _style_rules(structure: Dict[str, Any], naming: Dict[str, Any]) -> Dict[str, List[str]]:
+    prefer, avoid = [], []
+    for kind in ('classes', 'functions'):
+        style, share, styles, total = naming[kind]
+        if style and share >= DOMINANT_SHARE:
+            prefer.append(f"Name {kind} in {style} ({_percent(share)} of {total} {kind})")
+            for other, count in styles.items():
+                if other != style:
+                    avoid.append(f"{other} {kind[:-2] if kind == 'classes' else kind[:-1]} names ({count} of {total} {kind})")
+
+    functions = structure['patterns'].get('function_patterns', [])
+    if functions:
+        private = sum(1 for p in functions if p['name'].startswith('_') and not p['name'].startswith('__'))
+        if private / len(functions) >= 0.2:
+            prefer.append(f"Prefix internal helpers with an underscore ({private} of {len(functions)} functions)")
+        typed = sum(1 for p in functions if p.get('return_type'))
+        if typed / len(functions) >= 0.5:
+            prefer.append(f"Annotate return types ({_percent(typed / len(functions))} of functions do)")
+        with_parameters = [p['parameters'] for p in functions if p.get('parameters')]
+        if len(with_parameters) >= 10:
+            average = sum(len(params.split(',')) for params in with_parameters) / len(with_parameters)
+            if average > 5:
+                avoid.append(f"Long parameter lists (functions take {average:.1f} parameters on average)")
+
+    style, share, _, total = naming['files']
+    if style and share >= DOMINANT_SHARE:
+        prefer.append(f"Name source files in {style} ({_percent(share)} of {total} files)")
+    return {'prefer': prefer, 'avoid': avoid}
+
+def _error_rules(structure: Dict[str, Any]) -> Tuple[Dict[str, List[str]], Counter]:
+    patterns = structure['patterns'].get('error_patterns', [])
+    kinds = Counter(p['kind'] for p in patterns)
+    caught = Counter(p['name'] for p in patterns if p['kind'] == 'catch')
+    raised = Counter(p['name'] for p in patterns if p['kind'] == 'raise')
+    logged = Counter(p['name'] for p in patterns if p['kind'] == 'log')
+    defined = {p['name'] for p in structure['patterns'].get('class_patterns', [])}
+
+    prefer, avoid = [], []
+    own = Counter({name: count for name, count in (caught + raised).items() if name.split('.')[-1] in defined})
+    if own:
+        prefer.append(f"Use the project's own exception types: {_top(own)}")
+    specific = Counter({name: count for name, count in caught.items() if name not in GENERIC_EXCEPTIONS})
+    if specific:
+        prefer.append(f"Catch specific exceptions, as the code does with {_top(specific)}")
+    if raised:
+        prefer.append(f"Raise the exception types already in use: {_top(raised)}")
+    if logged:
+        prefer.append(f"Report handled errors through {_top(logged, 3)}")
+
+    handlers = kinds['catch'] + kinds['catch_all']
+    if kinds['catch_all']:
+        avoid.append(f"Bare catch-all handlers ({kinds['catch_all']} of {handlers} handlers)")
+    generic = sum(count for name, count in caught.items() if name in GENERIC_EXCEPTIONS)
+    if handlers and generic / handlers >= 0.5:
+        avoid.append(f"Catching broad exceptions where a narrower type is known ({generic} of {handlers} handlers)")
+    if handlers and not logged:
+        avoid.append("Handlers that swallow errors without reporting them")
+    return {'prefer': prefer, 'avoid': avoid}, kinds
+
+def _performance_rules(structure: Dict[str, Any]) -> Dict[str, List[str]]:
+    modules = set(structure.get('dependencies', {})) | set(structure.get('declared_dependencies', {}))
+    roots = {name.split('.')[0].split('/')[0] for name in modules} | modules
+    prefer = [hint for name, hint in PERFORMANCE_HINTS.items() if name in roots]
+    avoid = [hint for name, hint in PERFORMANCE_AVOID.items() if name in roots]
+    return {'prefer': prefer, 'avoid': avoid}
+
+def _suggestions(structure: Dict[str, Any], naming: Dict[str, Any], error_kinds: Counter) -> Dict[str, List[str]]:
+    improve = []
+    if error_kinds['catch_all']:
+        improve.append(f"Replace the {error_kinds['catch_all']} catch-all handlers with specific exceptions")
+    for kind in ('classes', 'functions'):
+        style, share, styles, _ = naming[kind]
+        outliers = sum(count for other, count in styles.items() if other != style)
+        if style and share >= DOMINANT_SHARE and outliers:
+            improve.append(f"Rename the {outliers} {kind} that do not use {style}")
+
+    file_index = structure.get('file_index', {})
+    large = sorted(
+        ((entry['classes'] + entry['functions'], path) for path, entry in file_index.items()
+         if entry['classes'] + entry['functions'] > LARGE_FILE_DEFINITIONS),
+        reverse=True
+    )
+    if large:
+        improve.append("Split large files: " + ', '.join(f"{path} ({count} definitions)" for count, path in large[:MAX_LISTED]))
+    return {
+        'improve': improve,
+        'avoid': ["Introducing naming or error handling conventions that differ from the rules above"]
+    }
+
+def _module_organization(structure: Dict[str, Any], naming: Dict[str, Any]) -> Dict[str, Any]:
+    file_index = structure.get('file_index', {})
+    directories = structure['patterns'].get('directory_patterns', [])
+    top_level = sorted(
+        (p for p in directories if os.sep not in p['path'] and '/' not in p['path'] and p['code_files']),
+        key=lambda p: (-p['code_files'], p['path'])
+    )
+    root_files = [path for path in file_index if not os.path.dirname(path)]
+
+    layout = []
+    if root_files:
+        layout.append(f"Project root: {len(root_files)} code files")
+    for pattern in top_level[:MAX_MODULES]:
+        languages = ', '.join(sorted(pattern['languages'], key=lambda lang: -pattern['languages'][lang]))
+        purpose = f", {'/'.join(pattern['purpose'])}" if pattern['purpose'] else ''
+        layout.append(f"{pattern['path']}/: {pattern['code_files']} code files ({languages}{purpose})")
+
+    # Internal dependencies: imports of other top-level modules of the project
+    modules = {_module_of(path) for path in file_index}
+    imports = {}
+    for path, entry in file_index.items():
+        module = _module_of(path)
+        for name in entry['imports']:
+            if name in modules and name != module:
+                imports.setdefault(module, Counter())[name] += 1
+    dependencies = [
+        f"{module} imports {', '.join(sorted(targets))}"
+        for module, targets in sorted(imports.items(), key=lambda item: (-sum(item[1].values()), item[0]))[:MAX_MODULES]
+    ]
+
+    responsibilities = {}
+    ranked = sorted(file_index.items(), key=lambda item: (-(item[1]['classes'] + item[1]['functions']), item[0]))
+    for path, entry in ranked[:MAX_MODULES]:
+        symbols = entry['top_classes'] + entry['top_functions']
+        if symbols:
+            responsibilities[path] = f"Defines {', '.join(symbols[:MAX_LISTED])}"
+    for pattern in top_level[:MAX_MODULES]:
+        if pattern['purpose']:
+            responsibilities[f"{pattern['path']}/"] = ', '.join(pattern['purpose']).replace('_', ' ').capitalize()
+
+    rules = []
+    by_purpose = {}
+    for pattern in directories:
+        for purpose in pattern['purpose']:
+            by_purpose.setdefault(purpose, []).append(pattern['path'])
+    placement = {
+        'testing': "Keep tests in",
+        'utilities': "Put shared helpers in",
+        'domain': "Keep domain models in",
+        'business_logic': "Keep services and handlers in",
+        'presentation': "Keep views and components in",
+    }
+    for purpose, paths in by_purpose.items():
+        rules.append(f"{placement[purpose]} {', '.join(sorted(paths)[:MAX_LISTED])}")
+    if file_index and len(root_files) / len(file_index) >= 0.8:
+        rules.append(f"Keep modules flat in the project root ({len(root_files)} of {len(file_index)} code files)")
+    if structure.get('manifest_files'):
+        rules.append(f"Declare dependencies in {', '.join(structure['manifest_files'][:MAX_LISTED])}")
+
+    conventions = {
+        kind: f"{style} ({_percent(share)} of {total})"
+        for kind, (style, share, _, total) in naming.items() if style
+    }
+    return {
+        'structure': layout,
+        'dependencies': dependencies,
+        'responsibilities': responsibilities,
+        'rules': rules,
+        'naming': conventions
+    }
+
+def build_heuristic_rules(structure: Dict[str, Any]) -> Dict[str, Any]:
+    """Build the ai_behavior rules from the project analysis alone, without an AI request.
+
+    Naming conventions come from the class, function, file and directory
+    names, error handling from the caught, raised and logged errors, and the
+    module organization from the directory patterns and the file index.
+
+    Args:
+        structure: Project structure from RulesGenerator.get_analysis()
+
+    Returns:
+        Rules with every section of the AI rules schema
+    """
+    naming = _naming(structure)
+    error_handling, error_kinds = _error_rules(structure)
+    return {
+        'ai_behavior': {
+            'code_generation': {
+                'style': _style_rules(structure, naming),
+                'error_handling': error_handling,
+                'performance': _performance_rules(structure),
+                'suggest_patterns': _suggestions(structure, naming, error_kinds),
+                'module_organization': _module_organization(structure, naming)
+            }
+        }
+    }
+
+def build_heuristic_description(project_info: Dict[str, Any], structure: Dict[str, Any]) -> str:
+    """One-paragraph project description from the analysis."""
+    languages = sorted(structure.get('languages', {}).items(), key=lambda item: -item[1])
+    language = languages[0][0] if languages else project_info.get('language', 'unknown')
+    framework = project_info.get('framework', 'none')
+    kind = project_info.get('type', 'application')
+    totals = structure.get('pattern_totals', {})
+
+    description = f"A {language} {kind}"
+    if framework and framework != 'none':
+        description += f" built with {framework}"
+    description += (f", with {len(structure.get('files', []))} code files defining "
+                    f"{totals.get('class_patterns', 0)} classes and {totals.get('function_patterns', 0)} functions.")
+    if len(languages) > 1:
+        description += f" Also uses {', '.join(name for name, _ in languages[1:4])}."
+    return description
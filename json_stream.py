@@ -0,0 +1,196 @@
+import re
+import json
+from typing import Any, Optional
+
+# Complete number and keyword tokens
+JSON_LITERAL = re.compile(r'-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][+-]?\d+)?|true|false|null')
+LITERAL_CHARS = set('+-.0123456789eEtruefalsn')
+MAX_LITERAL_CHARS = 64
+ESCAPE_CHARS = set('"\\/bfnrtu')
+
+class JSONStreamError(ValueError):
+    """Raised as soon as a streamed response can no longer be valid JSON."""
+
+class IncrementalJSONExtractor:
+    """Extract the first JSON object from text that arrives in chunks.
+
+    Text before the object (prose, code fences) is skipped. From the opening
+    brace on, every character is checked against the JSON grammar, so
+    malformed output is rejected at the first bad character instead of after
+    the whole response has arrived. With required_key set, the object must
+    contain that key; other top-level keys are allowed in any order.
+
+    Example:
+        extractor = IncrementalJSONExtractor(required_key='ai_behavior')
+        for chunk in chunks:
+            if extractor.feed(chunk):
+                break
+        rules = extractor.result
+    """
+
+    def __init__(self, required_key: Optional[str] = None, max_preamble: int = 2000):
+        """
+        Args:
+            required_key: Key the top-level object has to contain
+            max_preamble: Characters allowed before the object starts
+        """
+        self.required_key = required_key
+        self.max_preamble = max_preamble
+        self.reset()
+
+    def reset(self) -> None:
+        """Forget everything consumed so far, e.g. before a retried request."""
+        self.preamble = 0
+        self.stack = []
+        self.expect = 'value'
+        self.in_string = False
+        self.escape = False
+        self.string_is_key = False
+        self.key = []
+        self.top_keys = set()
+        self.literal = []
+        self.chars = []
+        self.done = False
+        self.result = None
+
+    @property
+    def text(self) -> str:
+        """JSON text of the object consumed so far."""
+        return ''.join(self.chars)
+
+    def feed(self, chunk: str) -> bool:
+        """Consume a chunk of the response.
+
+        Returns:
+            True once the object is complete; later chunks are ignored
+
+        Raises:
+            JSONStreamError: If the text can no longer be a valid object
+        """
+        for char in chunk:
+            if self.done:
+                break
+            if not self.chars:
+                if char == '{':
+                    self.chars.append(char)
+                    self._open('{')
+                else:
+                    self.preamble += 1
+                    if self.preamble > self.max_preamble:
+                        raise JSONStreamError(f"No JSON object in the first {self.max_preamble} characters")
+                continue
+            self.chars.append(char)
+            self._consume(char)
+        return self.done
+
+    def _fail(self, message: str) -> None:
+        raise JSONStreamError(f"{message} at character {len(self.chars)}: ...{self.text[-40:]!r}")
+
+    def _consume(self, char: str) -> None:
+        if self.in_string:
+            self._consume_string(char)
+            return
+
+        if self.literal:
+            if char in LITERAL_CHARS and len(self.literal) < MAX_LITERAL_CHARS:
+                self.literal.append(char)
+                return
+            literal = ''.join(self.literal)
+            self.literal = []
+            if not JSON_LITERAL.fullmatch(literal):
+                self._fail(f"Invalid literal {literal!r}")
+            self._after_value()
+
+        if char in ' \t\r\n':
+            return
+
+        expect = self.expect
+        if expect in ('value', 'value_or_close'):
+            if char in '{[':
+                self._open(char)
+            elif char == '"':
+                self._start_string(is_key=False)
+            elif char in '-0123456789tfn':
+                self.literal = [char]
+            elif char == ']' and expect == 'value_or_close':
+                self._close()
+            else:
+                self._fail(f"Unexpected {char!r} where a value was expected")
+        elif expect in ('key', 'key_or_close'):
+            if char == '"':
+                self._start_string(is_key=True)
+            elif char == '}' and expect == 'key_or_close':
+                self._close()
+            else:
+                self._fail(f"Unexpected {char!r} where a key was expected")
+        elif expect == 'colon':
+            if char != ':':
+                self._fail(f"Unexpected {char!r} where ':' was expected")
+            self.expect = 'value'
+        elif expect == 'comma_or_close':
+            if char == ',':
+                self.expect = 'key' if self.stack[-1] == '{' else 'value'
+            elif char == ('}' if self.stack[-1] == '{' else ']'):
+                self._close()
+            else:
+                self._fail(f"Unexpected {char!r} where ',' or a closing bracket was expected")
+
+    def _consume_string(self, char: str) -> None:
+        if self.escape:
+            if char not in ESCAPE_CHARS:
+                self._fail(f"Invalid escape '\\{char}'")
+            self.escape = False
+        elif char == '\\':
+            self.escape = True
+        elif char == '"':
+            self.in_string = False
+            if self.string_is_key:
+                self._end_key()
+            else:
+                self._after_value()
+            return
+        elif char < ' ':
+            self._fail("Control character in string")
+        if self.string_is_key:
+            self.key.append(char)
+
+    def _start_string(self, is_key: bool) -> None:
+        self.in_string = True
+        self.string_is_key = is_key
+        self.key = []
+
+    def _end_key(self) -> None:
+        if len(self.stack) == 1:
+            self.top_keys.add(''.join(self.key))
+        self.expect = 'colon'
+
+    def _open(self, bracket: str) -> None:
+        self.stack.append(bracket)
+        self.expect = 'key_or_close' if bracket == '{' else 'value_or_close'
+
+    def _close(self) -> None:
+        self.stack.pop()
+        if not self.stack and self.required_key is not None and self.required_key not in self.top_keys:
+            self._fail(f"Object has no '{self.required_key}' key")
+        self._after_value()
+
+    def _after_value(self) -> None:
+        if self.stack:
+            self.expect = 'comma_or_close'
+            return
+        try:
+            self.result = json.loads(self.text)
+        except json.JSONDecodeError as e:
+            raise JSONStreamError(f"Invalid JSON object: {e}")
+        self.done = True
+
+def extract_json(text: str, required_key: Optional[str] = None) -> Any:
+    """Extract the first JSON object from a complete response text.
+
+    Raises:
+        JSONStreamError: If the text holds no complete, valid object
+    """
+    extractor = IncrementalJSONExtractor(required_key=required_key, max_preamble=len(text))
+    if not extractor.feed(text):
+        raise JSONStreamError("Incomplete JSON object in response")
+    return extractor.result
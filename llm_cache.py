@@ -0,0 +1,137 @@
+import os
+import json
+import time
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, Optional
+
+# Defaults, overridable through the environment
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cursorfocus', 'llm_cache')
+DEFAULT_TTL = 7 * 24 * 3600  # Seconds a response stays valid
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024  # Total size before the oldest entries are evicted
+EVICT_EVERY_PUTS = 100  # Puts between directory walks while the size looks fine
+EVICT_TO = 0.9  # Fraction of max_bytes left after an eviction, so the next puts don't walk again
+TMP_GRACE_SECONDS = 60  # Younger .tmp files may still be written by another process
+
+def llm_cache_enabled() -> bool:
+    """Check whether the LLM response cache is enabled (LLM_CACHE=0 disables it)."""
+    return os.environ.get('LLM_CACHE', '1').lower() not in ('0', 'false', 'no', 'off')
+
+class LLMResponseCache:
+    """On-disk cache of model responses, keyed by a hash of the request.
+
+    Entries expire after a TTL. When the cache grows past its size limit the
+    least recently used entries are evicted; reads refresh an entry's mtime,
+    so mtime order is LRU order. The size is tracked across puts, so the
+    cache directory is only walked when it may be over the limit or every
+    EVICT_EVERY_PUTS puts, to account for other processes' writes.
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, ttl: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.cache_dir = cache_dir or os.environ.get('LLM_CACHE_DIR') or DEFAULT_CACHE_DIR
+        self.ttl = ttl if ttl is not None else float(os.environ.get('LLM_CACHE_TTL', DEFAULT_TTL))
+        self.max_bytes = max_bytes if max_bytes is not None else int(float(os.environ.get('LLM_CACHE_MAX_MB', DEFAULT_MAX_BYTES / (1024 * 1024))) * 1024 * 1024)
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.Lock()
+        self._size = None  # Estimated total size in bytes, None until the first walk
+        self._puts = 0  # Puts since the last walk
+
+    @staticmethod
+    def make_key(model: str, prompt: str, settings: Optional[Dict[str, Any]] = None) -> str:
+        """Hash the model name, prompt text and generation settings of a request."""
+        request = json.dumps({'model': model, 'prompt': prompt, 'settings': settings or {}}, sort_keys=True, default=str)
+        return hashlib.sha256(request.encode('utf-8')).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str) -> Optional[str]:
+        """Get a cached response text, or None if it is missing or expired."""
+        path = self._path(key)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if time.time() - entry.get('created', 0) > self.ttl:
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path)  # Mark as recently used
+        except OSError:
+            pass
+        return entry.get('text')
+
+    def put(self, key: str, text: str) -> None:
+        """Store a response text and evict old entries if the cache is too large."""
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'created': time.time(), 'text': text}, f)
+            written = os.path.getsize(tmp_path)
+            try:
+                replaced = os.path.getsize(path)
+            except OSError:
+                replaced = 0
+            os.replace(tmp_path, path)
+        except OSError as e:
+            self.logger.warning(f"Could not write LLM cache entry: {e}")
+            self._remove(tmp_path)
+            return
+
+        with self._lock:
+            self._puts += 1
+            if self._size is not None:
+                self._size += written - replaced
+            due = self._size is None or self._size > self.max_bytes or self._puts >= EVICT_EVERY_PUTS
+        if due:
+            self._evict()
+
+    def invalidate(self, key: str) -> None:
+        """Remove an entry from the cache."""
+        self._remove(self._path(key))
+
+    def _evict(self) -> None:
+        """Delete the least recently used entries once the cache exceeds max_bytes.
+        
+        Entries are deleted until EVICT_TO of max_bytes is left. Temporary
+        files younger than TMP_GRACE_SECONDS are counted but left alone, they
+        may be entries another writer has not renamed yet.
+        """
+        with self._lock:
+            entries = []
+            total = 0
+            now = time.time()
+            for root, _, files in os.walk(self.cache_dir):
+                for file in files:
+                    path = os.path.join(root, file)
+                    try:
+                        st = os.stat(path)
+                    except OSError:
+                        continue
+                    total += st.st_size
+                    if file.endswith('.tmp') and now - st.st_mtime < TMP_GRACE_SECONDS:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, path))
+
+            target = self.max_bytes * EVICT_TO if total > self.max_bytes else total
+            for _, size, path in sorted(entries):
+                if total <= target:
+                    break
+                self._remove(path)
+                total -= size
+
+            self._size = total
+            self._puts = 0
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,331 @@
+import os
+import inspect
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from typing import List, Optional, Tuple, Iterator
+
+# (role, text) pairs, role is 'user' or 'model'
+History = List[Tuple[str, str]]
+
+class LLMError(Exception):
+    """Error returned by an LLM provider.
+
+    Attributes:
+        status: HTTP status of the failed request, if any
+        retry_after: Seconds the server asked to wait before retrying, if any
+    """
+
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+class LLMProvider:
+    """Interface of the model backends used for rules generation."""
+
+    name = 'base'
+    requests_per_minute = 0  # Default rate limit, 0 for none
+
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self.logger = logging.getLogger(__name__)
+
+    def generate(self, prompt: str, history: Optional[History] = None, timeout: Optional[float] = None,
+                 json_mode: bool = False) -> str:
+        """Send a prompt, preceded by an optional conversation, and return the response text.
+
+        Args:
+            prompt: The prompt text
+            history: Earlier (role, text) turns of the conversation
+            timeout: Seconds to wait for the response
+            json_mode: Ask the model to answer with JSON only, where supported
+        """
+        raise NotImplementedError
+
+    def stream(self, prompt: str, history: Optional[History] = None, timeout: Optional[float] = None,
+               json_mode: bool = False) -> Iterator[str]:
+        """Send a prompt and yield the response text in chunks as it arrives.
+
+        Closing the iterator early abandons the request. Providers without
+        streaming support yield the whole response at once.
+        """
+        yield self.generate(prompt, history=history, timeout=timeout, json_mode=json_mode)
+
+    def start_chat(self, max_turns: Optional[int] = None) -> 'ChatSession':
+        """Start a conversation that keeps its history between prompts.
+
+        Args:
+            max_turns: Most recent prompt/response pairs to keep, None for all
+        """
+        return ChatSession(self, max_turns)
+
+class ChatSession:
+    """Conversation with a provider, replaying the history with each prompt."""
+
+    def __init__(self, provider: LLMProvider, max_turns: Optional[int] = None):
+        self.provider = provider
+        self.max_turns = max_turns
+        self.history = []
+
+    def send(self, prompt: str, timeout: Optional[float] = None, json_mode: bool = False) -> str:
+        """Send a prompt in this conversation and return the response text."""
+        text = self.provider.generate(prompt, history=self.history, timeout=timeout, json_mode=json_mode)
+        self.record(prompt, text)
+        return text
+
+    def record(self, prompt: str, text: str) -> None:
+        """Add a prompt and its response to the conversation, dropping the oldest turns past max_turns."""
+        self.history.extend([('user', prompt), ('model', text)])
+        if self.max_turns is not None and len(self.history) > 2 * self.max_turns:
+            del self.history[:len(self.history) - 2 * self.max_turns]
+
+class GeminiProvider(LLMProvider):
+    """Google Gemini through google.generativeai."""
+
+    name = 'gemini'
+    requests_per_minute = 15
+
+    def __init__(self, model_name: Optional[str] = None):
+        super().__init__(model_name or os.environ.get("GEMINI_MODEL", "gemini-2.5-pro-exp-03-25"))
+        api_key = os.environ.get("GEMINI_API_KEY")
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY is required")
+
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.model = genai.GenerativeModel(model_name=self.model_name)
+
+        # Older SDKs (e.g. 0.3.x) pass unknown arguments into the request and reject them,
+        # so per-request timeouts and JSON mode are only used when the SDK declares them
+        self.supports_timeout = 'request_options' in inspect.signature(self.model.generate_content).parameters
+        self.supports_json_mode = 'response_mime_type' in inspect.signature(genai.types.GenerationConfig).parameters
+
+    def _request(self, prompt: str, history: Optional[History], timeout: Optional[float], json_mode: bool, stream: bool):
+        contents = [{'role': role, 'parts': [text]} for role, text in history or []]
+        contents.append({'role': 'user', 'parts': [prompt]})
+        kwargs = {}
+        if json_mode and self.supports_json_mode:
+            kwargs['generation_config'] = {'response_mime_type': 'application/json'}
+        if timeout and self.supports_timeout:
+            kwargs['request_options'] = {'timeout': timeout}
+        return self.model.generate_content(contents, stream=stream, **kwargs)
+
+    def generate(self, prompt: str, history: Optional[History] = None, timeout: Optional[float] = None,
+                 json_mode: bool = False) -> str:
+        return self._request(prompt, history, timeout, json_mode, stream=False).text
+
+    def stream(self, prompt: str, history: Optional[History] = None, timeout: Optional[float] = None,
+               json_mode: bool = False) -> Iterator[str]:
+        for chunk in self._request(prompt, history, timeout, json_mode, stream=True):
+            try:
+                text = chunk.text
+            except ValueError:
+                continue  # Chunks without text, e.g. only safety ratings
+            if text:
+                yield text
+
+class OpenAICompatibleProvider(LLMProvider):
+    """Any endpoint implementing the OpenAI chat completions API."""
+
+    name = 'openai'
+    requests_per_minute = 60
+
+    def __init__(self, model_name: Optional[str] = None, base_url: Optional[str] = None, api_key: Optional[str] = None):
+        super().__init__(model_name or os.environ.get("OPENAI_MODEL", "gpt-4o-mini"))
+        self.base_url = (base_url or os.environ.get("OPENAI_BASE_URL", "https://api.openai.com/v1")).rstrip('/')
+        self.api_key = api_key if api_key is not None else os.environ.get("OPENAI_API_KEY", "")
+        # Some compatible servers reject response_format, OPENAI_JSON_MODE=0 leaves it out
+        self.supports_json_mode = os.environ.get("OPENAI_JSON_MODE", "1").lower() not in ('0', 'false', 'no', 'off')
+
+        import requests
+        self.session = requests.Session()
+
+    def _post(self, prompt: str, history: Optional[History], timeout: Optional[float], json_mode: bool, stream: bool):
+        messages = [
+            {'role': 'assistant' if role == 'model' else 'user', 'content': text}
+            for role, text in history or []
+        ]
+        messages.append({'role': 'user', 'content': prompt})
+
+        payload = {'model': self.model_name, 'messages': messages}
+        if stream:
+            payload['stream'] = True
+        if json_mode and self.supports_json_mode:
+            payload['response_format'] = {'type': 'json_object'}
+
+        headers = {'Content-Type': 'application/json'}
+        if self.api_key:
+            headers['Authorization'] = f"Bearer {self.api_key}"
+
+        response = self.session.post(
+            f"{self.base_url}/chat/completions",
+            json=payload,
+            headers=headers,
+            timeout=timeout,
+            stream=stream
+        )
+        if response.status_code != 200:
+            try:
+                retry_after = float(response.headers.get('Retry-After', ''))
+            except ValueError:
+                retry_after = None
+            raise LLMError(f"{self.base_url} returned HTTP {response.status_code}: {response.text[:200]}",
+                           response.status_code, retry_after)
+        return response
+
+    def generate(self, prompt: str, history: Optional[History] = None, timeout: Optional[float] = None,
+                 json_mode: bool = False) -> str:
+        response = self._post(prompt, history, timeout, json_mode, stream=False)
+        try:
+            return response.json()['choices'][0]['message']['content']
+        except (ValueError, KeyError, IndexError) as e:
+            raise LLMError(f"Malformed response from {self.base_url}: {e}")
+
+    def stream(self, prompt: str, history: Optional[History] = None, timeout: Optional[float] = None,
+               json_mode: bool = False) -> Iterator[str]:
+        response = self._post(prompt, history, timeout, json_mode, stream=True)
+        response.encoding = 'utf-8'
+        try:
+            # Server-sent events, one "data: {...}" line per chunk
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith('data:'):
+                    continue
+                data = line[5:].strip()
+                if data == '[DONE]':
+                    break
+                try:
+                    text = json.loads(data)['choices'][0].get('delta', {}).get('content')
+                except (ValueError, KeyError, IndexError) as e:
+                    raise LLMError(f"Malformed stream event from {self.base_url}: {e}")
+                if text:
+                    yield text
+        finally:
+            response.close()  # Drops the connection if the caller stopped early
+
+def stub_response(prompt: str, malformed: bool = False) -> str:
+    """Deterministic response to a prompt, shaped like what the rules pipeline expects.
+
+    With malformed set, rules responses turn invalid early and then run on,
+    like a model echoing the commented schema from the prompt.
+    """
+    digest = hashlib.sha256(prompt.encode('utf-8')).hexdigest()[:12]
+    if '"ai_behavior"' in prompt and malformed:
+        return '{"ai_behavior": {"code_generation": {"structure": [],  # Analyze the structure' + ' ...' * 2000
+    if '"ai_behavior"' in prompt:
+        section = {'prefer': [f"Follow existing patterns ({digest})"], 'avoid': ["Introducing new conventions"]}
+        return json.dumps({'ai_behavior': {'code_generation': {
+            'style': section,
+            'error_handling': section,
+            'performance': section,
+            'suggest_patterns': {'improve': [], 'avoid': []},
+            'module_organization': {
+                'structure': [], 'dependencies': [], 'responsibilities': {}, 'rules': [], 'naming': {}
+            }
+        }}})
+    return f"A software project analyzed offline by the stub model ({digest})."
+
+def stub_chunks(text: str, size: int = 64) -> List[str]:
+    """Split a stub response into stream chunks."""
+    return [text[i:i + size] for i in range(0, len(text), size)] or ['']
+
+class StubProvider(LLMProvider):
+    """Offline provider with configurable latency and failure injection.
+
+    Responses depend only on the prompt. Latency, failures and malformed
+    responses are drawn from a generator seeded by LLM_STUB_SEED, so runs
+    are reproducible. Streamed responses spread the latency over the chunks.
+    """
+
+    name = 'stub'
+
+    def __init__(self, model_name: Optional[str] = None, latency: Optional[float] = None,
+                 jitter: Optional[float] = None, failure_rate: Optional[float] = None, seed: Optional[int] = None,
+                 malformed_rate: Optional[float] = None):
+        super().__init__(model_name or 'stub')
+        self.latency = latency if latency is not None else float(os.environ.get('LLM_STUB_LATENCY', 0))
+        self.jitter = jitter if jitter is not None else float(os.environ.get('LLM_STUB_JITTER', 0))
+        self.failure_rate = failure_rate if failure_rate is not None else float(os.environ.get('LLM_STUB_FAILURE_RATE', 0))
+        self.malformed_rate = malformed_rate if malformed_rate is not None else float(os.environ.get('LLM_STUB_MALFORMED_RATE', 0))
+        self.random = random.Random(seed if seed is not None else int(os.environ.get('LLM_STUB_SEED', 0)))
+        self._random_lock = threading.Lock()
+
+    def _draw(self) -> Tuple[float, bool, bool]:
+        """Draw the latency, failure and malformed outcome of a request."""
+        with self._random_lock:
+            delay = max(0.0, self.latency + self.random.uniform(-self.jitter, self.jitter))
+            failed = self.random.random() < self.failure_rate
+            malformed = self.malformed_rate > 0 and self.random.random() < self.malformed_rate
+        return delay, failed, malformed
+
+    def generate(self, prompt: str, history: Optional[History] = None, timeout: Optional[float] = None,
+                 json_mode: bool = False) -> str:
+        delay, failed, malformed = self._draw()
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise TimeoutError(f"Stub request timed out after {timeout}s")
+        time.sleep(delay)
+        if failed:
+            raise LLMError("Injected stub failure", 503)
+        return stub_response(prompt, malformed)
+
+    def stream(self, prompt: str, history: Optional[History] = None, timeout: Optional[float] = None,
+               json_mode: bool = False) -> Iterator[str]:
+        delay, failed, malformed = self._draw()
+        if failed:
+            raise LLMError("Injected stub failure", 503)
+        chunks = stub_chunks(stub_response(prompt, malformed))
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        for chunk in chunks:
+            time.sleep(delay / len(chunks))
+            if deadline is not None and time.monotonic() > deadline:
+                raise TimeoutError(f"Stub request timed out after {timeout}s")
+            yield chunk
+
+PROVIDERS = {
+    'gemini': GeminiProvider,
+    'openai': OpenAICompatibleProvider,
+    'stub': StubProvider,
+}
+
+def resolve_provider_name(name: Optional[str] = None) -> str:
+    """Name of the provider to use.
+
+    The provider is chosen by the name argument, then the LLM_PROVIDER
+    environment variable, then the 'llm_provider' config setting, and
+    defaults to Gemini.
+    """
+    if not name:
+        name = os.environ.get('LLM_PROVIDER')
+    if not name:
+        from config import load_config
+        name = (load_config() or {}).get('llm_provider', 'gemini')
+
+    name = name.lower()
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{name}', expected one of: {', '.join(PROVIDERS)}")
+    return name
+
+def create_provider(name: Optional[str] = None, **kwargs) -> LLMProvider:
+    """Create a new instance of the configured LLM provider, see resolve_provider_name()."""
+    return PROVIDERS[resolve_provider_name(name)](**kwargs)
+
+# Providers shared by every generator in the process, by name
+_providers = {}
+_providers_lock = threading.Lock()
+
+def get_provider(name: Optional[str] = None) -> LLMProvider:
+    """Get the process-wide instance of the configured LLM provider.
+
+    The client is created on the first call. A failed creation (e.g. a
+    missing API key) is not remembered, so a later call tries again.
+    """
+    name = resolve_provider_name(name)
+    with _providers_lock:
+        provider = _providers.get(name)
+        if provider is None:
+            provider = _providers[name] = create_provider(name)
+        return provider
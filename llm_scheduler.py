@@ -0,0 +1,193 @@
+import os
+import time
+import random
+import logging
+import threading
+from typing import Callable, Optional, TypeVar
+from json_stream import JSONStreamError
+
+T = TypeVar('T')
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits and server errors
+RETRYABLE_STATUSES = {408, 409, 425, 429, 500, 502, 503, 504}
+
+def is_retryable(error: Exception) -> bool:
+    """Check whether a failed LLM request may succeed when sent again.
+
+    Rate limits, server errors, timeouts, dropped connections and malformed
+    output are retried; other HTTP errors (bad request, authentication,
+    unknown model) and configuration errors fail fast.
+    """
+    status = getattr(error, 'status', None)
+    if status is None:
+        # google.api_core errors carry the HTTP status as 'code'
+        code = getattr(error, 'code', None)
+        status = code if isinstance(code, int) else None
+    if status is not None:
+        return status in RETRYABLE_STATUSES
+
+    if isinstance(error, (TimeoutError, ConnectionError, JSONStreamError)):
+        return True
+    try:
+        import requests
+        return isinstance(error, (requests.ConnectionError, requests.Timeout))
+    except ImportError:
+        return False
+
+class TokenBucket:
+    """Token bucket limiting how often requests start.
+
+    Callers reserve a token and sleep until it is available, so waiting
+    requests are served in arrival order without holding the lock.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        """
+        Args:
+            rate: Tokens added per second, 0 for no limit
+            capacity: Most tokens available at once (the burst size)
+        """
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, deadline: Optional[float] = None) -> float:
+        """Wait for a token.
+
+        Args:
+            deadline: time.monotonic() value after which to give up
+
+        Returns:
+            Seconds spent waiting
+
+        Raises:
+            TimeoutError: If no token is available before the deadline
+        """
+        if self.rate <= 0:
+            return 0.0
+
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            wait = max(0.0, (1 - self.tokens) / self.rate)
+            if deadline is not None and now + wait > deadline:
+                raise TimeoutError(f"Rate limit allows no request within {deadline - now:.0f}s")
+            self.tokens -= 1
+
+        if wait:
+            time.sleep(wait)
+        return wait
+
+class LLMScheduler:
+    """Process-wide gate for LLM requests.
+
+    Every request waits for a token from its provider's bucket and a free
+    slot under the max-in-flight limit. Retryable failures are sent again
+    after a full-jitter exponential backoff (or the server's Retry-After);
+    other failures are raised at once.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, burst: Optional[float] = None,
+                 max_in_flight: Optional[int] = None, max_retries: Optional[int] = None,
+                 base_delay: Optional[float] = None, max_delay: Optional[float] = None):
+        """
+        Args:
+            requests_per_minute: Rate limit for every provider, overriding each
+                provider's default (LLM_REQUESTS_PER_MINUTE, 0 for no limit)
+            burst: Requests that may start at once (LLM_BURST)
+            max_in_flight: Requests running at the same time (LLM_MAX_IN_FLIGHT)
+            max_retries: Retries of a failed request (LLM_MAX_RETRIES)
+            base_delay: Backoff of the first retry, doubled for each next one (LLM_RETRY_BASE_DELAY)
+            max_delay: Longest backoff (LLM_RETRY_MAX_DELAY)
+        """
+        env = os.environ
+        rpm = requests_per_minute if requests_per_minute is not None else env.get('LLM_REQUESTS_PER_MINUTE')
+        self.requests_per_minute = float(rpm) if rpm is not None else None
+        self.burst = burst if burst is not None else float(env.get('LLM_BURST', 2))
+        self.max_in_flight = max_in_flight if max_in_flight is not None else int(env.get('LLM_MAX_IN_FLIGHT', 4))
+        self.max_retries = max_retries if max_retries is not None else int(env.get('LLM_MAX_RETRIES', 3))
+        self.base_delay = base_delay if base_delay is not None else float(env.get('LLM_RETRY_BASE_DELAY', 2))
+        self.max_delay = max_delay if max_delay is not None else float(env.get('LLM_RETRY_MAX_DELAY', 60))
+
+        self.logger = logging.getLogger(__name__)
+        self.random = random.Random()
+        self._in_flight = threading.BoundedSemaphore(max(1, self.max_in_flight))
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'retries': 0, 'failures': 0, 'throttled_seconds': 0.0}
+
+    def _bucket(self, key: str, requests_per_minute: float) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                rpm = self.requests_per_minute if self.requests_per_minute is not None else requests_per_minute
+                bucket = self._buckets[key] = TokenBucket(rpm / 60.0, self.burst)
+            return bucket
+
+    def _count(self, stat: str, amount: float = 1) -> None:
+        with self._lock:
+            self.stats[stat] += amount
+
+    def backoff(self, attempt: int, error: Optional[Exception] = None) -> float:
+        """Seconds to wait before retry number attempt (1-based)."""
+        delay = self.random.uniform(0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1)))
+        retry_after = getattr(error, 'retry_after', None)
+        if retry_after:
+            delay = max(delay, min(self.max_delay, retry_after))
+        return delay
+
+    def call(self, request: Callable[[], T], key: str = 'default', requests_per_minute: float = 0,
+             deadline: Optional[float] = None) -> T:
+        """Run an LLM request under the rate limit, retrying retryable failures.
+
+        Args:
+            request: Function sending the request and returning its result
+            key: Rate limit bucket, normally the provider name
+            requests_per_minute: Rate limit of the bucket unless one is configured
+            deadline: time.monotonic() value after which no attempt is started
+
+        Returns:
+            The result of the first successful attempt
+        """
+        bucket = self._bucket(key, requests_per_minute)
+        attempt = 0
+        while True:
+            waited = bucket.acquire(deadline)
+            if waited:
+                self._count('throttled_seconds', waited)
+
+            with self._in_flight:
+                self._count('requests')
+                try:
+                    return request()
+                except Exception as e:
+                    error = e
+
+            attempt += 1
+            if not is_retryable(error) or attempt > self.max_retries:
+                self._count('failures')
+                raise error
+
+            delay = self.backoff(attempt, error)
+            if deadline is not None and time.monotonic() + delay >= deadline:
+                self._count('failures')
+                raise error
+
+            self._count('retries')
+            print(f"⏳ AI request failed ({error}), retrying in {delay:.1f}s (attempt {attempt}/{self.max_retries})")
+            time.sleep(delay)
+
+# Scheduler shared by every generator in the process
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+def get_scheduler() -> LLMScheduler:
+    """Get the process-wide LLM request scheduler."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = LLMScheduler()
+        return _scheduler
@@ -0,0 +1,131 @@
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from llm_providers import stub_response, stub_chunks
+
+class StubCompletionsHandler(BaseHTTPRequestHandler):
+    """Answers OpenAI-style chat completion requests with deterministic stub responses."""
+
+    def do_POST(self):
+        if not self.path.rstrip('/').endswith('/chat/completions'):
+            self._send_json(404, {'error': {'message': f"Unknown path {self.path}"}})
+            return
+
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length) or b'{}')
+            prompt = request['messages'][-1]['content']
+        except (ValueError, KeyError, IndexError, TypeError) as e:
+            self._send_json(400, {'error': {'message': f"Invalid request: {e}"}})
+            return
+
+        server = self.server
+        with server.random_lock:
+            delay = max(0.0, server.latency + server.random.uniform(-server.jitter, server.jitter))
+            failed = server.random.random() < server.failure_rate
+            malformed = server.malformed_rate > 0 and server.random.random() < server.malformed_rate
+
+        if failed:
+            time.sleep(delay)
+            self._send_json(server.failure_status, {'error': {'message': 'Injected stub failure'}})
+            return
+
+        text = stub_response(prompt, malformed)
+        if request.get('stream'):
+            self._send_stream(request.get('model', 'stub'), text, delay)
+            return
+
+        time.sleep(delay)
+        self._send_json(200, {
+            'object': 'chat.completion',
+            'model': request.get('model', 'stub'),
+            'choices': [{'index': 0, 'message': {'role': 'assistant', 'content': text}, 'finish_reason': 'stop'}]
+        })
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_stream(self, model: str, text: str, delay: float):
+        """Send the response as server-sent events, spreading the delay over the chunks."""
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/event-stream')
+        self.send_header('Connection', 'close')
+        self.end_headers()
+        self.close_connection = True
+
+        chunks = stub_chunks(text)
+        try:
+            for chunk in chunks:
+                time.sleep(delay / len(chunks))
+                event = {'object': 'chat.completion.chunk', 'model': model,
+                         'choices': [{'index': 0, 'delta': {'content': chunk}, 'finish_reason': None}]}
+                self.wfile.write(f"data: {json.dumps(event)}\n\n".encode('utf-8'))
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client stopped reading early
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+def create_stub_server(host: str = '127.0.0.1', port: int = 0, latency: float = 0.0, jitter: float = 0.0,
+                       failure_rate: float = 0.0, failure_status: int = 503, seed: int = 0,
+                       verbose: bool = False, malformed_rate: float = 0.0) -> ThreadingHTTPServer:
+    """Create a local OpenAI-compatible stub server (port 0 picks a free port).
+
+    Args:
+        latency: Seconds each response is delayed
+        jitter: Random +/- variation of the latency, in seconds
+        failure_rate: Fraction of requests answered with failure_status
+        malformed_rate: Fraction of rules requests answered with invalid JSON
+        seed: Seed for the latency and failure draws
+    """
+    server = ThreadingHTTPServer((host, port), StubCompletionsHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.jitter = jitter
+    server.failure_rate = failure_rate
+    server.failure_status = failure_status
+    server.malformed_rate = malformed_rate
+    server.random = random.Random(seed)
+    server.random_lock = threading.Lock()
+    server.verbose = verbose
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description='Local OpenAI-compatible stub server for offline benchmarking')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=8765, help='Port to listen on')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds each response is delayed')
+    parser.add_argument('--jitter', type=float, default=0.0, help='Random +/- variation of the latency')
+    parser.add_argument('--failure-rate', type=float, default=0.0, help='Fraction of requests that fail')
+    parser.add_argument('--malformed-rate', type=float, default=0.0, help='Fraction of rules responses with invalid JSON')
+    parser.add_argument('--failure-status', type=int, default=503, help='HTTP status of injected failures')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for latency and failure draws')
+    parser.add_argument('--verbose', action='store_true', help='Log every request')
+    args = parser.parse_args()
+
+    server = create_stub_server(args.host, args.port, args.latency, args.jitter,
+                                args.failure_rate, args.failure_status, args.seed, args.verbose,
+                                args.malformed_rate)
+    host, port = server.server_address[:2]
+    print(f"🧪 Stub LLM server listening on http://{host}:{port}/v1")
+    print(f"   Use it with LLM_PROVIDER=openai OPENAI_BASE_URL=http://{host}:{port}/v1")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,273 @@
+import os
+import re
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple, Callable
+
+# Root-level files whose contents describe a project
+MANIFEST_NAMES = {
+    'package.json', 'composer.json', 'requirements.txt', 'setup.py', 'pyproject.toml',
+    'Pipfile', 'pom.xml', 'build.gradle', 'build.gradle.kts', 'Cargo.toml', 'go.mod',
+    'Gemfile', 'CMakeLists.txt', 'Podfile', 'pubspec.yaml', 'build.sbt', 'manage.py',
+    'wp-config.php', 'mix.exs', 'project.clj', 'build.zig', 'app.py', 'Makefile',
+    'webpack.config.js'
+}
+MANIFEST_SUFFIXES = ('.csproj', '.vbproj', '.fsproj', '.gemspec', '.sln')
+
+MAX_CACHED_TEXT_BYTES = 256 * 1024  # Larger manifests are read from disk every time
+MAX_INDEXES = 64  # Project indexes kept by get_manifest_index
+
+# Sections of JSON manifests that declare dependencies
+DEPENDENCY_SECTIONS = {
+    'package.json': ('dependencies', 'devDependencies', 'peerDependencies'),
+    'composer.json': ('require', 'require-dev'),
+}
+
+# Requirement specifiers end at the first version, marker or extras character
+REQUIREMENT_NAME = re.compile(r'^\s*([A-Za-z0-9][A-Za-z0-9._-]*)')
+
+StatKey = Tuple[int, int]
+
+def is_manifest(name: str) -> bool:
+    """Check whether a root file name is one of the known manifests."""
+    return name in MANIFEST_NAMES or name.endswith(MANIFEST_SUFFIXES)
+
+class ManifestIndex:
+    """Cached view of the manifest files in a project root.
+
+    The root is listed once and only re-listed when its mtime changes. Each
+    manifest is read and parsed at most once per (mtime, size), and facts
+    derived from the manifests are memoized until any of them changes. Other
+    files, and manifests over MAX_CACHED_TEXT_BYTES, are read from disk on
+    every call.
+    """
+
+    def __init__(self, project_path: str):
+        self.project_path = project_path
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._root_mtime = None
+        self._entries = {}  # name -> is_dir
+        self._texts = {}  # manifest name -> (stat key, text)
+        self._json = {}  # name -> (stat key, parsed data)
+        self._facts = {}  # key -> (fingerprint, value)
+
+    def _refresh_listing(self) -> None:
+        """Re-list the project root if it changed since the last listing."""
+        try:
+            mtime = os.stat(self.project_path).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._root_mtime and mtime is not None:
+            return
+
+        entries = {}
+        if mtime is not None:
+            try:
+                with os.scandir(self.project_path) as it:
+                    for entry in it:
+                        try:
+                            entries[entry.name] = entry.is_dir()
+                        except OSError:
+                            continue
+            except OSError:
+                pass
+        self._entries = entries
+        self._root_mtime = mtime
+
+    def _stat_key(self, name: str) -> Optional[StatKey]:
+        """Get the (mtime, size) of a file, or None if it is not a readable file."""
+        try:
+            st = os.stat(os.path.join(self.project_path, name))
+        except OSError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def names(self) -> List[str]:
+        """Names of all entries in the project root."""
+        with self._lock:
+            self._refresh_listing()
+            return sorted(self._entries)
+
+    def files(self) -> List[str]:
+        """Names of the files in the project root."""
+        with self._lock:
+            self._refresh_listing()
+            return sorted(name for name, is_dir in self._entries.items() if not is_dir)
+
+    def has(self, name: str) -> bool:
+        """Check whether a file or directory exists, using the root listing for root entries."""
+        if '/' in name or os.sep in name:
+            return os.path.exists(os.path.join(self.project_path, name))
+        with self._lock:
+            self._refresh_listing()
+            return name in self._entries
+
+    def is_dir(self, name: str) -> bool:
+        """Check whether a root entry is a directory."""
+        with self._lock:
+            self._refresh_listing()
+            return self._entries.get(name, False)
+
+    def files_with_suffix(self, *suffixes: str) -> List[str]:
+        """Names of the root files ending with any of the given suffixes."""
+        return [name for name in self.files() if name.endswith(suffixes)]
+
+    def read_text(self, name: str) -> Optional[str]:
+        """Read a file relative to the project root; manifests are cached per (mtime, size)."""
+        read = self._read(name)
+        return read[1] if read else None
+
+    def _read(self, name: str) -> Optional[Tuple[StatKey, str]]:
+        """Read a file and the stat key its text belongs to."""
+        with self._lock:
+            if '/' not in name and os.sep not in name:
+                self._refresh_listing()
+                if self._entries.get(name, True):
+                    return None
+
+            key = self._stat_key(name)
+            if key is None:
+                self._texts.pop(name, None)
+                return None
+
+            cached = self._texts.get(name)
+            if cached and cached[0] == key:
+                return cached
+
+            try:
+                with open(os.path.join(self.project_path, name), 'r', encoding='utf-8', errors='ignore') as f:
+                    text = f.read()
+            except (IOError, OSError) as e:
+                self.logger.error(f"Error reading {name}: {str(e)}")
+                return None
+
+            if is_manifest(name) and key[1] <= MAX_CACHED_TEXT_BYTES:
+                self._texts[name] = (key, text)
+            else:
+                self._texts.pop(name, None)
+            return key, text
+
+    def read_json(self, name: str) -> Optional[Any]:
+        """Parse a JSON file, at most once per (mtime, size)."""
+        with self._lock:
+            read = self._read(name)
+            if read is None:
+                return None
+
+            key, text = read
+            cached = self._json.get(name)
+            if cached and cached[0] == key:
+                return cached[1]
+
+            try:
+                data = json.loads(text)
+            except json.JSONDecodeError as e:
+                self.logger.error(f"Error parsing {name}: {str(e)}")
+                data = None
+
+            self._json[name] = (key, data)
+            return data
+
+    def manifests(self) -> List[str]:
+        """Names of the manifest files present in the project root."""
+        return [name for name in self.files() if is_manifest(name)]
+
+    def fingerprint(self) -> Tuple:
+        """Identify the current state of the root listing and every manifest."""
+        with self._lock:
+            manifests = self.manifests()
+            return (self._root_mtime,) + tuple((name, self._stat_key(name)) for name in manifests)
+
+    def memoize(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Return a derived fact, recomputing it only when the manifests changed.
+
+        Args:
+            key: Name of the fact
+            compute: Function computing the fact from the current project root
+        """
+        with self._lock:
+            fingerprint = self.fingerprint()
+            cached = self._facts.get(key)
+            if cached and cached[0] == fingerprint:
+                return cached[1]
+
+            value = compute()
+            self._facts[key] = (fingerprint, value)
+            return value
+
+    def dependencies(self) -> Dict[str, str]:
+        """Declared dependencies and their version specifiers across the root manifests."""
+        return self.memoize('dependencies', self._collect_dependencies)
+
+    def _collect_dependencies(self) -> Dict[str, str]:
+        """Collect dependencies from package.json, composer.json and requirements.txt."""
+        deps = {}
+
+        for name in DEPENDENCY_SECTIONS:
+            summary = summarize_manifest(name, self.read_json(name))
+            if summary:
+                deps.update(summary['dependencies'])
+
+        requirements = self.read_text('requirements.txt')
+        if requirements:
+            for line in requirements.splitlines():
+                line = line.split('#', 1)[0]
+                if not line.strip() or line.lstrip().startswith('-'):
+                    continue
+                match = REQUIREMENT_NAME.match(line)
+                if match:
+                    deps[match.group(1)] = line[match.end():].strip()
+
+        return deps
+
+def summarize_manifest(name: str, data: Any) -> Optional[Dict[str, Any]]:
+    """Reduce a parsed package.json or composer.json to a compact summary.
+
+    Args:
+        name: File name of the manifest
+        data: Parsed JSON content
+
+    Returns:
+        Dict with the package 'name', its 'dependencies' (name -> version
+        specifier) and 'scripts', or None if the manifest is not supported
+    """
+    sections = DEPENDENCY_SECTIONS.get(os.path.basename(name))
+    if not sections or not isinstance(data, dict):
+        return None
+
+    dependencies = {}
+    for section in sections:
+        declared = data.get(section)
+        if isinstance(declared, dict):
+            dependencies.update((dep, str(version)) for dep, version in declared.items())
+
+    scripts = data.get('scripts')
+    return {
+        'name': data.get('name'),
+        'dependencies': dependencies,
+        'scripts': sorted(scripts) if isinstance(scripts, dict) else []
+    }
+
+# Indexes shared by every analyzer working on the same project, least recently used first
+_indexes: 'OrderedDict[str, ManifestIndex]' = OrderedDict()
+_indexes_lock = threading.Lock()
+
+def get_manifest_index(project_path: str) -> ManifestIndex:
+    """Get the shared manifest index for a project.
+
+    At most MAX_INDEXES indexes are kept; the least recently used one is
+    dropped to make room for a new project.
+    """
+    key = os.path.abspath(project_path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = ManifestIndex(key)
+            while len(_indexes) > MAX_INDEXES:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(key)
+        return index
@@ -1,5 +1,104 @@
 import re
-from typing import Dict, Any, Pattern, List, Tuple, Union
+from array import array
+from bisect import bisect_left
+from itertools import accumulate, count
+from operator import add
+from typing import Dict, Any, Pattern, Match, List, Tuple, Union, Optional, FrozenSet
+
+try:
+    from re import _parser as sre_parse, _constants as sre_constants
+except ImportError:  # Python < 3.11
+    import sre_parse
+    import sre_constants
+
+# A literal requirement: the pattern can only match if one of the literals
+# occurs in the content (compared case-insensitively when the flag is set)
+LiteralRequirement = Tuple[FrozenSet[str], bool]
+
+# Number of literal requirements checked per pattern
+MAX_LITERAL_REQUIREMENTS = 3
+
+def _required_literals(items) -> List[FrozenSet[str]]:
+    """Get the literal requirements of a parsed regex pattern.
+    
+    Each requirement is a set of literals one of which has to occur in any
+    text the pattern matches, e.g. 'class' for r'class\s+\w+' or
+    {'MonoBehaviour', 'ScriptableObject'} for an alternation of the two.
+    Optional parts, character classes and case-insensitive groups never
+    contribute requirements, so the result is always safe to check.
+    """
+    requirements = []
+    run = ''
+    for op, av in items:
+        if op is sre_constants.LITERAL:
+            run += chr(av)
+            continue
+        if run:
+            requirements.append(frozenset([run]))
+            run = ''
+            
+        if op is sre_constants.SUBPATTERN:
+            add_flags, pattern = av[1], av[3]
+            if not add_flags & re.IGNORECASE:
+                requirements.extend(_required_literals(pattern))
+        elif op is sre_constants.BRANCH:
+            # Each branch must contribute a literal for the alternation to
+            branch_literals = []
+            for branch in av[1]:
+                branch_requirements = _required_literals(branch)
+                if not branch_requirements:
+                    branch_literals = None
+                    break
+                branch_literals.append(max(branch_requirements, key=lambda literals: min(map(len, literals))))
+            if branch_literals:
+                requirements.append(frozenset().union(*branch_literals))
+        elif op in (sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT) and av[0] >= 1:
+            requirements.extend(_required_literals(av[2]))
+            
+    if run:
+        requirements.append(frozenset([run]))
+    return list(dict.fromkeys(requirements))
+
+def _literals_present(requirements: List[LiteralRequirement], content: str, lowered: Optional[str] = None) -> bool:
+    """Check that every requirement has one of its literals in the content."""
+    for literals, ignore_case in requirements:
+        if ignore_case:
+            if lowered is None:
+                lowered = content.lower()
+            text = lowered
+        else:
+            text = content
+        if not any(literal in text for literal in literals):
+            return False
+    return True
+
+class LineIndex:
+    """Offsets of the newlines in a text, for mapping spans to line numbers.
+    
+    The index is built once per text and each lookup is a binary search,
+    so it can be shared by every pattern category analyzed for a file.
+    """
+    
+    def __init__(self, content: str):
+        lines = content.split('\n')
+        # Newline i sits after the first i + 1 lines and the i newlines before it
+        offsets = map(add, accumulate(map(len, lines[:-1])), count())
+        self.newlines = array('I' if len(content) < 2 ** 32 else 'Q', offsets)
+        
+    @property
+    def line_count(self) -> int:
+        """Number of lines in the text."""
+        return len(self.newlines) + 1
+        
+    def line_of(self, offset: int) -> int:
+        """Get the 1-based line number containing a character offset."""
+        return bisect_left(self.newlines, offset) + 1
+        
+    def position(self, offset: int) -> Tuple[int, int]:
+        """Get the 1-based (line, column) of a character offset."""
+        line = bisect_left(self.newlines, offset) + 1
+        line_start = self.newlines[line - 2] + 1 if line > 1 else 0
+        return line, offset - line_start + 1
 
 class PatternsAnalyzer:
     """Class containing regex patterns for analyzing source code across different languages."""
@@ -220,9 +319,20 @@ class PatternsAnalyzer:
         'markup': ['HTML', 'XML', 'CSS', 'SCSS', 'LESS', 'Markdown']
     }
     
+    # Extra pattern categories analyzed for specific languages
+    LANGUAGE_CATEGORIES = {
+        'go': ['go'],
+        'rust': ['rust'],
+        'sql': ['sql'],
+        'javascript/react': ['unity'],
+        'typescript/react': ['unity']
+    }
+    
     def __init__(self):
         """Initialize the PatternsAnalyzer with compiled regex patterns."""
         self.compiled_patterns = self._compile_patterns()
+        self.required_literals = self._extract_required_literals()
+        self._scan_plans = {}
         
     def _compile_patterns(self) -> Dict[str, Dict[str, Any]]:
         """Precompile all regex patterns for better performance."""
@@ -236,18 +346,59 @@ class PatternsAnalyzer:
                 # Handle nested patterns (import, class, function)
                 if category in ['import', 'class', 'function']:
                     for lang_group, pattern in patterns.items():
-                        compiled[category][lang_group] = re.compile(pattern, re.IGNORECASE if 'sql' in lang_group or 'data' == lang_group else 0)
+                        compiled[category][lang_group] = re.compile(pattern, self._pattern_flags(category, lang_group))
                 # Handle common patterns and other language-specific patterns
                 else:
                     for pattern_name, pattern in patterns.items():
-                        flags = re.IGNORECASE if category == 'sql' or (category == 'docker') else 0
-                        compiled[category][pattern_name] = re.compile(pattern, flags)
+                        compiled[category][pattern_name] = re.compile(pattern, self._pattern_flags(category, pattern_name))
             else:
                 # Handle simple patterns
                 compiled[category] = re.compile(patterns)
                 
         return compiled
         
+    @staticmethod
+    def _pattern_flags(category: str, key: str) -> int:
+        """Get the regex flags a pattern is compiled with."""
+        if category == 'import' and key == 'python':
+            return re.MULTILINE  # Anchored to line starts and ends
+        if category in ['import', 'class', 'function']:
+            return re.IGNORECASE if 'sql' in key or 'data' == key else 0
+        return re.IGNORECASE if category == 'sql' or (category == 'docker') else 0
+        
+    def _extract_required_literals(self) -> Dict[str, Dict[str, List[LiteralRequirement]]]:
+        """Extract the literals each pattern requires in order to match."""
+        required = {}
+        for category, patterns in self.PATTERNS.items():
+            required[category] = {}
+            for key, pattern in patterns.items():
+                flags = self._pattern_flags(category, key)
+                try:
+                    requirements = _required_literals(sre_parse.parse(pattern, flags))
+                except Exception:
+                    requirements = []
+                ignore_case = bool(flags & re.IGNORECASE)
+                if ignore_case:
+                    requirements = [frozenset(literal.lower() for literal in literals) for literals in requirements]
+                # Check the most selective requirements only
+                requirements.sort(key=lambda literals: -min(map(len, literals)))
+                required[category][key] = [(literals, ignore_case) for literals in requirements[:MAX_LITERAL_REQUIREMENTS]]
+        return required
+        
+    def may_match(self, category: str, key: str, content: str, lowered: Optional[str] = None) -> bool:
+        """Check the literal prefilter of a pattern against content.
+        
+        Returns False only when the pattern cannot match the content, so
+        running the regex can be skipped entirely.
+        
+        Args:
+            category: Pattern category (e.g. 'common', 'unity')
+            key: Pattern name or language group within the category
+            content: The content to check
+            lowered: Optional content.lower(), reused for case-insensitive patterns
+        """
+        return _literals_present(self.required_literals[category][key], content, lowered)
+        
     def get_language_from_ext(self, ext: str) -> str:
         """Get programming language from file extension."""
         lang_map = {
@@ -348,9 +499,16 @@ class PatternsAnalyzer:
                 return group
         return 'unknown'
         
-    def analyze_patterns(self, content: str, language: str) -> Dict[str, List[Dict[str, Any]]]:
-        """Analyze content for patterns based on language."""
-        language_group = self.get_language_group(language)
+    def analyze_patterns(self, content: str, language: str, line_index: Optional[LineIndex] = None) -> Dict[str, List[Dict[str, Any]]]:
+        """Analyze content for patterns based on language.
+        
+        Every match gets the 'line' and 'column' (both 1-based) of its start.
+        Pass line_index to reuse an index already built for the content;
+        otherwise one is built for this scan and dropped afterwards.
+        """
+        if line_index is None:
+            line_index = LineIndex(content)
+            
         results = {
             'imports': [],
             'classes': [],
@@ -359,107 +517,129 @@ class PatternsAnalyzer:
             'other_patterns': []
         }
         
-        # Analyze imports
-        if language_group in self.compiled_patterns['import']:
-            pattern = self.compiled_patterns['import'][language_group]
-            for match in pattern.finditer(content):
-                groups = match.groupdict()
-                module = next((v for k, v in groups.items() if v and k.startswith('module')), None)
-                if module:
-                    results['imports'].append({
-                        'module': module.strip(),
-                        'span': match.span(),
-                        'text': match.group(0)
-                    })
-        
-        # Analyze classes
-        if language_group in self.compiled_patterns['class']:
-            pattern = self.compiled_patterns['class'][language_group]
-            for match in pattern.finditer(content):
-                groups = match.groupdict()
-                name = next((v for k, v in groups.items() if v and (k == 'name' or k == 'n')), None)
-                if name:
-                    class_info = {
-                        'name': name.strip(),
-                        'span': match.span(),
-                        'text': match.group(0)
-                    }
+        lowered = None
+        for kind, pattern_name, pattern, requirements in self._get_scan_plan(language):
+            # Skip patterns whose required literals are not in the content
+            if requirements:
+                if lowered is None and any(ignore_case for _, ignore_case in requirements):
+                    lowered = content.lower()
+                if not _literals_present(requirements, content, lowered):
+                    continue
                     
-                    # Add inheritance info if available
-                    base = next((v for k, v in groups.items() if v and k.startswith('base')), None)
-                    if base:
-                        class_info['base'] = base.strip()
-                        
-                    # Add implementation info if available
-                    impl = next((v for k, v in groups.items() if v and k.startswith('impl')), None)
-                    if impl:
-                        class_info['implements'] = impl.strip()
-                        
-                    results['classes'].append(class_info)
-        
-        # Analyze functions
-        if language_group in self.compiled_patterns['function']:
-            pattern = self.compiled_patterns['function'][language_group]
+            if kind == 'import':
+                build_info, key = self._import_info, 'imports'
+            elif kind == 'class':
+                build_info, key = self._class_info, 'classes'
+            elif kind == 'function':
+                build_info, key = self._function_info, 'functions'
+            else:
+                build_info, key = self._pattern_info, 'other_patterns'
+                
             for match in pattern.finditer(content):
-                groups = match.groupdict()
-                name = next((v for k, v in groups.items() if v and (k == 'name' or k == 'n')), None)
-                if name:
-                    func_info = {
-                        'name': name.strip(),
-                        'span': match.span(),
-                        'text': match.group(0)
-                    }
-                    
-                    # Add parameters if available
-                    params = next((v for k, v in groups.items() if v and k.startswith('params')), None)
-                    if params:
-                        func_info['parameters'] = params.strip()
-                        
-                    # Add return type if available
-                    return_type = next((v for k, v in groups.items() if v and k.startswith('return')), None)
-                    if return_type:
-                        func_info['return_type'] = return_type.strip()
-                        
-                    results['functions'].append(func_info)
-        
-        # Analyze common patterns
+                info = build_info(pattern_name, match, match.groupdict())
+                if info:
+                    info['line'], info['column'] = line_index.position(match.start())
+                    results[key].append(info)
+        
+        return results
+        
+    def _get_scan_plan(self, language: str) -> List[Tuple[str, str, Pattern, List[LiteralRequirement]]]:
+        """Get (and cache) the patterns to scan for a language.
+        
+        The plan lists (kind, pattern name, compiled pattern, required
+        literals) for imports,
+        classes and functions of the language group, the common patterns and
+        the language-specific categories. Patterns without named groups are
+        left out since their matches never produce any results.
+        """
+        language_group = self.get_language_group(language)
+        categories = tuple(self.LANGUAGE_CATEGORIES.get(language.lower(), []))
+        cache_key = (language_group, categories)
+        if cache_key in self._scan_plans:
+            return self._scan_plans[cache_key]
+            
+        plan = []
+        for kind in ['import', 'class', 'function']:
+            if language_group in self.compiled_patterns[kind]:
+                plan.append((kind, kind, self.compiled_patterns[kind][language_group],
+                             self.required_literals[kind][language_group]))
         for pattern_name, pattern in self.compiled_patterns['common'].items():
-            for match in pattern.finditer(content):
-                groups = match.groupdict()
-                if any(groups.values()):
-                    pattern_info = {
-                        'pattern': pattern_name,
-                        'span': match.span(),
-                        'text': match.group(0),
-                        'details': {k: v.strip() if v else v for k, v in groups.items() if v}
-                    }
-                    results['other_patterns'].append(pattern_info)
+            plan.append(('pattern', pattern_name, pattern, self.required_literals['common'][pattern_name]))
+        for category in categories:
+            for pattern_name, pattern in self.compiled_patterns.get(category, {}).items():
+                plan.append(('pattern', f"{category}_{pattern_name}", pattern,
+                             self.required_literals[category][pattern_name]))
+                
+        plan = [entry for entry in plan if entry[2].groupindex]
+        self._scan_plans[cache_key] = plan
+        return plan
         
-        # Analyze language-specific patterns
-        if language.lower() == 'go' and 'go' in self.compiled_patterns:
-            self._analyze_language_specific_patterns(content, 'go', results)
+    def _import_info(self, pattern_name: str, match: Match, groups: Dict[str, Optional[str]]) -> Optional[Dict[str, Any]]:
+        """Build import information from a match."""
+        module = next((v for k, v in groups.items() if v and k.startswith('module')), None)
+        if not module:
+            return None
+        return {
+            'module': module.strip(),
+            'span': match.span(),
+            'text': match.group(0)
+        }
+        
+    def _class_info(self, pattern_name: str, match: Match, groups: Dict[str, Optional[str]]) -> Optional[Dict[str, Any]]:
+        """Build class information from a match."""
+        name = next((v for k, v in groups.items() if v and (k == 'name' or k == 'n')), None)
+        if not name:
+            return None
             
-        if language.lower() == 'rust' and 'rust' in self.compiled_patterns:
-            self._analyze_language_specific_patterns(content, 'rust', results)
+        class_info = {
+            'name': name.strip(),
+            'span': match.span(),
+            'text': match.group(0)
+        }
+        
+        # Add inheritance info if available
+        base = next((v for k, v in groups.items() if v and k.startswith('base')), None)
+        if base:
+            class_info['base'] = base.strip()
             
-        if language.lower() == 'sql' and 'sql' in self.compiled_patterns:
-            self._analyze_language_specific_patterns(content, 'sql', results)
+        # Add implementation info if available
+        impl = next((v for k, v in groups.items() if v and k.startswith('impl')), None)
+        if impl:
+            class_info['implements'] = impl.strip()
             
-        if language.lower() in ['javascript/react', 'typescript/react'] and 'unity' in self.compiled_patterns:
-            self._analyze_language_specific_patterns(content, 'unity', results)
+        return class_info
         
-        return results
+    def _function_info(self, pattern_name: str, match: Match, groups: Dict[str, Optional[str]]) -> Optional[Dict[str, Any]]:
+        """Build function information from a match."""
+        name = next((v for k, v in groups.items() if v and (k == 'name' or k == 'n')), None)
+        if not name:
+            return None
+            
+        func_info = {
+            'name': name.strip(),
+            'span': match.span(),
+            'text': match.group(0)
+        }
         
-    def _analyze_language_specific_patterns(self, content: str, category: str, results: Dict[str, List[Dict[str, Any]]]):
-        """Analyze content for language-specific patterns."""
-        for pattern_name, pattern in self.compiled_patterns[category].items():
-            for match in pattern.finditer(content):
-                groups = match.groupdict()
-                if any(groups.values()):
-                    pattern_info = {
-                        'pattern': f"{category}_{pattern_name}",
-                        'span': match.span(),
-                        'text': match.group(0),
-                        'details': {k: v.strip() if v else v for k, v in groups.items() if v}
-                    }
-                    results['other_patterns'].append(pattern_info) 
\ No newline at end of file
+        # Add parameters if available
+        params = next((v for k, v in groups.items() if v and k.startswith('params')), None)
+        if params:
+            func_info['parameters'] = params.strip()
+            
+        # Add return type if available
+        return_type = next((v for k, v in groups.items() if v and k.startswith('return')), None)
+        if return_type:
+            func_info['return_type'] = return_type.strip()
+            
+        return func_info
+        
+    def _pattern_info(self, pattern_name: str, match: Match, groups: Dict[str, Optional[str]]) -> Optional[Dict[str, Any]]:
+        """Build generic pattern information from a match."""
+        if not any(groups.values()):
+            return None
+        return {
+            'pattern': pattern_name,
+            'span': match.span(),
+            'text': match.group(0),
+            'details': {k: v.strip() if v else v for k, v in groups.items() if v}
+        }
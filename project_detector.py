@@ -2,12 +2,24 @@ import os
 import json
 import re
 from config import load_config
+from manifest_index import get_manifest_index
 import time
 from typing import List, Dict, Any
 
 # Load project types from config at module level
 _config = load_config()
 
+def _root_file_with_suffix(path, suffixes):
+    """Check whether the project root holds a file ending with any of the suffixes."""
+    if isinstance(suffixes, str):
+        suffixes = (suffixes,)
+    return bool(get_manifest_index(path).files_with_suffix(*suffixes))
+
+def _manifest_contains(path, name, *needles):
+    """Check whether a root file contains any of the given strings."""
+    content = get_manifest_index(path).read_text(name)
+    return bool(content) and any(needle in content for needle in needles)
+
 # Project type definitions with improved structure
 PROJECT_TYPES = {
     'python': {
@@ -17,7 +29,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 10,
         'additional_checks': [
-            lambda path: any(f.endswith('.py') for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, '.py')
         ]
     },
     'java': {
@@ -27,7 +39,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 7,
         'additional_checks': [
-            lambda path: any(f.endswith('.java') for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, '.java')
         ]
     },
     'go': {
@@ -37,7 +49,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 7,
         'additional_checks': [
-            lambda path: any(f.endswith('.go') for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, '.go')
         ]
     },
     'ruby': {
@@ -47,7 +59,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 6,
         'additional_checks': [
-            lambda path: any(f.endswith('.rb') for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, '.rb')
         ]
     },
     'rust': {
@@ -57,7 +69,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 7,
         'additional_checks': [
-            lambda path: any(f.endswith('.rs') for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, '.rs')
         ]
     },
     'dart': {
@@ -67,7 +79,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 6,
         'additional_checks': [
-            lambda path: any(f.endswith('.dart') for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, '.dart')
         ]
     },
     'scala': {
@@ -77,7 +89,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 6,
         'additional_checks': [
-            lambda path: any(f.endswith('.scala') for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, '.scala')
         ]
     },
     'javascript': {
@@ -87,7 +99,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 5,
         'additonal_checks': [
-            lambda path: any(f.endswith(('.js', '.jsx', '.mjs', '.cjs')) for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, ('.js', '.jsx', '.mjs', '.cjs'))
         ]
     },
     'typescript': {
@@ -97,7 +109,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 6,  # Higher than JS because TS projects often have JS files too
         'additional_checks': [
-            lambda path: any(f.endswith(('.ts', '.tsx')) for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, ('.ts', '.tsx'))
         ]
     },
     'web': {
@@ -114,7 +126,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 5,
         'additional_checks': [
-            lambda path: any(f.endswith('.php') for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, '.php')
         ]
     },
     'cpp': {
@@ -124,7 +136,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 5,
         'additional_checks': [
-            lambda path: any(f.endswith(('.cpp', '.hpp', '.cc', '.cxx', '.h', '.hxx')) for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, ('.cpp', '.hpp', '.cc', '.cxx', '.h', '.hxx'))
         ]
     },
     'csharp': {
@@ -134,7 +146,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 5,
         'additional_checks': [
-            lambda path: any(f.endswith('.cs') for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, '.cs')
         ]
     },
     'kotlin': {
@@ -144,7 +156,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 5,
         'additional_checks': [
-            lambda path: any(f.endswith(('.kt', '.kts')) for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, ('.kt', '.kts'))
         ]
     },
     'swift': {
@@ -154,7 +166,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 5,
         'additional_checks': [
-            lambda path: any(f.endswith('.swift') for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, '.swift')
         ]
     },
     'react': {
@@ -164,9 +176,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 7,  # Higher than generic javascript
         'additional_checks': [
-            lambda path: os.path.exists(os.path.join(path, 'package.json')) and any(
-                'react' in line for line in open(os.path.join(path, 'package.json'), 'r').readlines()
-            ) if os.path.exists(os.path.join(path, 'package.json')) else False
+            lambda path: _manifest_contains(path, 'package.json', 'react')
         ]
     },
     'vue': {
@@ -176,9 +186,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 7,
         'additional_checks': [
-            lambda path: os.path.exists(os.path.join(path, 'package.json')) and any(
-                'vue' in line for line in open(os.path.join(path, 'package.json'), 'r').readlines()
-            ) if os.path.exists(os.path.join(path, 'package.json')) else False
+            lambda path: _manifest_contains(path, 'package.json', 'vue')
         ]
     },
     'angular': {
@@ -188,9 +196,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 7,
         'additional_checks': [
-            lambda path: os.path.exists(os.path.join(path, 'package.json')) and any(
-                '@angular/core' in line for line in open(os.path.join(path, 'package.json'), 'r').readlines()
-            ) if os.path.exists(os.path.join(path, 'package.json')) else False
+            lambda path: _manifest_contains(path, 'package.json', '@angular/core')
         ]
     },
     'django': {
@@ -200,7 +206,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 9,
         'additional_checks': [
-            lambda path: os.path.exists(os.path.join(path, 'manage.py')) and 'django' in open(os.path.join(path, 'manage.py'), 'r').read() if os.path.exists(os.path.join(path, 'manage.py')) else False
+            lambda path: _manifest_contains(path, 'manage.py', 'django')
         ]
     },
     'flask': {
@@ -211,8 +217,8 @@ PROJECT_TYPES = {
         'priority': 8,
         'additional_checks': [
             lambda path: any(
-                os.path.exists(os.path.join(path, f)) and 'flask' in open(os.path.join(path, f), 'r').read().lower()
-                for f in os.listdir(path) if f.endswith('.py') and os.path.isfile(os.path.join(path, f))
+                'flask' in (get_manifest_index(path).read_text(f) or '').lower()
+                for f in get_manifest_index(path).files_with_suffix('.py')
             )
         ]
     },
@@ -223,7 +229,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 8,
         'additional_checks': [
-            lambda path: os.path.exists(os.path.join(path, 'artisan')) and os.path.exists(os.path.join(path, 'app'))
+            lambda path: get_manifest_index(path).has('artisan') and get_manifest_index(path).has('app')
         ]
     },
     'dotnet': {
@@ -233,7 +239,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 7,
         'additional_checks': [
-            lambda path: any(f.endswith(('.csproj', '.vbproj', '.fsproj')) for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, ('.csproj', '.vbproj', '.fsproj'))
         ]
     },
     'unity': {
@@ -243,7 +249,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 7,
         'additional_checks': [
-            lambda path: os.path.exists(os.path.join(path, 'Assets')) and os.path.exists(os.path.join(path, 'ProjectSettings'))
+            lambda path: get_manifest_index(path).has('Assets') and get_manifest_index(path).has('ProjectSettings')
         ]
     },
     'android': {
@@ -253,9 +259,9 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 6,
         'additional_checks': [
-            lambda path: os.path.exists(os.path.join(path, 'app')) and (
-                os.path.exists(os.path.join(path, 'app/src/main/AndroidManifest.xml')) or
-                os.path.exists(os.path.join(path, 'AndroidManifest.xml'))
+            lambda path: get_manifest_index(path).has('app') and (
+                get_manifest_index(path).has('app/src/main/AndroidManifest.xml') or
+                get_manifest_index(path).has('AndroidManifest.xml')
             )
         ]
     },
@@ -266,7 +272,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 6,
         'additional_checks': [
-            lambda path: any(f.endswith(('.xcodeproj', '.xcworkspace')) for f in os.listdir(path) if os.path.isdir(os.path.join(path, f)))
+            lambda path: any(f.endswith(('.xcodeproj', '.xcworkspace')) and get_manifest_index(path).is_dir(f) for f in get_manifest_index(path).names())
         ]
     },
     'docker': {
@@ -276,7 +282,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 5,
         'additional_checks': [
-            lambda path: any(f == 'Dockerfile' or f.startswith('Dockerfile.') or f in ['docker-compose.yml', 'docker-compose.yaml'] for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: any(f == 'Dockerfile' or f.startswith('Dockerfile.') or f in ['docker-compose.yml', 'docker-compose.yaml'] for f in get_manifest_index(path).files())
         ]
     },
     'terraform': {
@@ -286,7 +292,7 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 5,
         'additional_checks': [
-            lambda path: any(f.endswith('.tf') for f in os.listdir(path) if os.path.isfile(os.path.join(path, f)))
+            lambda path: _root_file_with_suffix(path, '.tf')
         ]
     },
     'dataScience': {
@@ -296,11 +302,8 @@ PROJECT_TYPES = {
         'required_files': [],
         'priority': 5,
         'additional_checks': [
-            lambda path: any(f.endswith('.ipynb') for f in os.listdir(path) if os.path.isfile(os.path.join(path, f))) or
-                        (os.path.exists(os.path.join(path, 'requirements.txt')) and any(
-                            pkg in open(os.path.join(path, 'requirements.txt'), 'r').read() 
-                            for pkg in ['pandas', 'numpy', 'matplotlib', 'scikit-learn', 'tensorflow', 'pytorch', 'keras']
-                        ) if os.path.exists(os.path.join(path, 'requirements.txt')) else False)
+            lambda path: _root_file_with_suffix(path, '.ipynb') or
+                        _manifest_contains(path, 'requirements.txt', 'pandas', 'numpy', 'matplotlib', 'scikit-learn', 'tensorflow', 'pytorch', 'keras')
         ]
     }
 }
@@ -361,11 +364,10 @@ def detect_project_type(project_path):
     if not os.path.exists(project_path):
         return _get_generic_result()
         
-    try:
-        files = os.listdir(project_path)
-        files_set = set(files)  # For faster lookups
-    except (PermissionError, OSError):
+    files = get_manifest_index(project_path).names()
+    if not files and not os.access(project_path, os.R_OK):
         return _get_generic_result()
+    files_set = set(files)  # For faster lookups
 
     # Get all files recursively up to depth 2 for better detection
     all_files = _get_files_recursive(project_path, max_depth=2)
@@ -493,10 +495,10 @@ def _detect_generic_project_type(files_set, all_files):
 
 def detect_language_and_framework(project_path):
     """Detect primary language and framework of a project."""
-    try:
-        files = os.listdir(project_path)
-    except:
+    if not os.path.isdir(project_path):
         return 'unknown', 'none'
+    manifests = get_manifest_index(project_path)
+    files = manifests.names()
         
     # Language detection based on file extensions and key files
     language_indicators = {
@@ -644,6 +646,15 @@ def detect_language_and_framework(project_path):
         'prisma': ['prisma', 'Prisma', 'schema.prisma'],
     }
     
+    # List the source directories once for every language below
+    subdir_files = {}
+    for f in ['src', 'lib', 'app', 'test', 'tests']:
+        if manifests.is_dir(f):
+            try:
+                subdir_files[f] = os.listdir(os.path.join(project_path, f))
+            except:
+                pass
+
     # Detect language
     detected_language = 'unknown'
     max_matches = 0
@@ -655,15 +666,9 @@ def detect_language_and_framework(project_path):
                 matches += 1
                 
             # Check for directories that might indicate a language
-            if os.path.isdir(os.path.join(project_path, f)):
-                if f in ['src', 'lib', 'app', 'test', 'tests']:
-                    try:
-                        subfiles = os.listdir(os.path.join(project_path, f))
-                        for subfile in subfiles:
-                            if any(subfile.endswith(ind) if ind.startswith('.') else ind in subfile for ind in indicators):
-                                matches += 0.5  # Half point for matches in subdirectories
-                    except:
-                        pass
+            for subfile in subdir_files.get(f, ()):
+                if any(subfile.endswith(ind) if ind.startswith('.') else ind in subfile for ind in indicators):
+                    matches += 0.5  # Half point for matches in subdirectories
                         
         if matches > max_matches:
             max_matches = matches
@@ -681,7 +686,7 @@ def detect_language_and_framework(project_path):
     
     source_files = []
     for f in files:
-        if os.path.isfile(os.path.join(project_path, f)) and (
+        if not manifests.is_dir(f) and (
             f.endswith(('.py', '.js', '.jsx', '.ts', '.tsx', '.java', '.kt', '.php', '.rb', '.go', 
                        '.rs', '.cs', '.swift', '.cpp', '.h', '.dart', '.vue', '.scala'))
         ):
@@ -694,15 +699,11 @@ def detect_language_and_framework(project_path):
     
     # Check config files first
     for f in [f for f in files if f in config_files]:
-        try:
-            with open(os.path.join(project_path, f), 'r', encoding='utf-8', errors='ignore') as file:
-                content = file.read().lower()
-                for framework, indicators in framework_indicators.items():
-                    matches = sum(1 for ind in indicators if ind.lower() in content)
-                    if matches > 0:
-                        framework_matches[framework] = framework_matches.get(framework, 0) + matches * 2  # Config files have higher weight
-        except:
-            pass
+        content = (manifests.read_text(f) or '').lower()
+        for framework, indicators in framework_indicators.items():
+            matches = sum(1 for ind in indicators if ind.lower() in content)
+            if matches > 0:
+                framework_matches[framework] = framework_matches.get(framework, 0) + matches * 2  # Config files have higher weight
     
     # Check source files next
     for f in source_files:
@@ -0,0 +1,107 @@
+import os
+import math
+from typing import Dict, Any, Optional, Iterable, Tuple
+
+# Rough size of a token for English text and source code
+CHARS_PER_TOKEN = 4
+DEFAULT_TOKEN_BUDGET = 32000  # Tokens per prompt unless LLM_PROMPT_TOKEN_BUDGET is set
+MIN_TRUNCATED_TOKENS = 200  # Smaller remainders are not worth a cut-off item
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens in a text, at about four characters per token."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+def prompt_token_budget() -> int:
+    """Token budget for a prompt, from LLM_PROMPT_TOKEN_BUDGET (0 means unlimited)."""
+    return int(os.environ.get('LLM_PROMPT_TOKEN_BUDGET', DEFAULT_TOKEN_BUDGET))
+
+class PromptBuilder:
+    """Assemble a prompt from fixed text and ranked item lists within a token budget.
+
+    Fixed text is always kept. Item lists are filled in priority order (lower
+    first), each taking its items in rank order until the next one no longer
+    fits. Parts are emitted in the order they were added, and what was left
+    out is recorded in the report returned by build().
+    """
+
+    def __init__(self, budget: Optional[int] = None):
+        self.budget = prompt_token_budget() if budget is None else budget
+        self.parts = []
+
+    def text(self, text: str) -> 'PromptBuilder':
+        """Add text that is always part of the prompt."""
+        self.parts.append({'text': text})
+        return self
+
+    def items(self, name: str, items: Iterable[str], priority: int = 0,
+              separator: str = '\n', truncate: bool = False) -> 'PromptBuilder':
+        """Add a list of items that is kept only as far as the budget allows.
+
+        Args:
+            name: Name of the list in the report
+            items: Items, most valuable first
+            priority: Lists with lower values are filled first
+            separator: Text placed between kept items
+            truncate: Cut the first item that does not fit instead of dropping it
+        """
+        self.parts.append({
+            'name': name,
+            'items': list(items),
+            'priority': priority,
+            'separator': separator,
+            'truncate': truncate
+        })
+        return self
+
+    def build(self) -> Tuple[str, Dict[str, Any]]:
+        """Render the prompt.
+
+        Returns:
+            Tuple of the prompt text and a report with the 'budget', the
+            'estimated_tokens' of the prompt, the number of items 'dropped'
+            per list and the lists whose last item was 'truncated'
+        """
+        lists = [part for part in self.parts if 'items' in part]
+        fixed = sum(estimate_tokens(part['text']) for part in self.parts if 'text' in part)
+        remaining = self.budget - fixed if self.budget > 0 else math.inf
+
+        kept = {}
+        dropped = {}
+        truncated = []
+        for part in sorted(lists, key=lambda p: p['priority']):
+            separator_cost = estimate_tokens(part['separator'])
+            selected = []
+            for item in part['items']:
+                cost = estimate_tokens(item) + (separator_cost if selected else 0)
+                if cost <= remaining:
+                    selected.append(item)
+                    remaining -= cost
+                    continue
+                if part['truncate'] and remaining >= MIN_TRUNCATED_TOKENS:
+                    chars = int(remaining - separator_cost) * CHARS_PER_TOKEN
+                    selected.append(item[:chars])
+                    truncated.append(part['name'])
+                    remaining = 0
+                break
+
+            kept[id(part)] = selected
+            if len(selected) < len(part['items']):
+                dropped[part['name']] = len(part['items']) - len(selected)
+
+        prompt = ''.join(
+            part['text'] if 'text' in part else part['separator'].join(kept[id(part)])
+            for part in self.parts
+        )
+        report = {
+            'budget': self.budget,
+            'estimated_tokens': estimate_tokens(prompt),
+            'dropped': dropped,
+            'truncated': truncated
+        }
+        return prompt, report
+
+def describe_report(report: Dict[str, Any]) -> str:
+    """One-line summary of what a budgeted prompt left out."""
+    parts = [f"{count} {name}" for name, count in report['dropped'].items()]
+    parts += [f"cut {name}" for name in report['truncated'] if name not in report['dropped']]
+    return f"~{report['estimated_tokens']} tokens, budget {report['budget']}; left out {', '.join(parts)}"
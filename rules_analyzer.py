@@ -1,19 +1,63 @@
 import os
-import json
+import re
+import math
+import fnmatch
 import logging
-from typing import Dict, Any, Optional
+from collections import deque
+from typing import Dict, Any, List, Optional, Tuple
+from analyzers import should_ignore_file
+from config import IGNORED_FILES
+from manifest_index import get_manifest_index
 
 class RulesAnalyzer:
+    # Map extensions to languages
+    LANGUAGE_EXTENSIONS = {
+        '.js': 'javascript',
+        '.jsx': 'javascript',
+        '.ts': 'typescript',
+        '.tsx': 'typescript',
+        '.py': 'python',
+        '.java': 'java',
+        '.cpp': 'cpp',
+        '.c': 'c',
+        '.h': 'c',
+        '.hpp': 'cpp',
+        '.cs': 'csharp',
+        '.go': 'go',
+        '.rb': 'ruby',
+        '.php': 'php',
+        '.swift': 'swift',
+        '.kt': 'kotlin',
+        '.kts': 'kotlin',
+        '.json': 'json',
+        '.md': 'markdown',
+        '.html': 'html',
+        '.css': 'css',
+        '.scss': 'scss',
+        '.less': 'less',
+        '.vue': 'vue',
+        '.svelte': 'svelte'
+    }
+
+    # Language census settings
+    CENSUS_MAX_FILE_WEIGHT = 256 * 1024  # Size cap per file, in bytes
+    CENSUS_MIN_FILES = 200  # Files to count before stopping early
+    CENSUS_CONFIDENCE = 0.99  # Confidence required to stop early
+    CENSUS_EXCLUDED_LANGUAGES = {'json', 'markdown'}  # Data and docs, never the main language
+
     def __init__(self, project_path: str):
         self.project_path = project_path
         self.logger = logging.getLogger(__name__)
+        self.manifests = get_manifest_index(project_path)
 
     def analyze_project_for_rules(self) -> Dict[str, Any]:
         """Analyze the project and return project information for rules generation."""
+        census = self._language_census()
         project_info = {
             'name': self._detect_project_name(),
             'version': '1.0.0',
-            'language': self._detect_main_language(),
+            'language': census['language'],
+            'language_confidence': census['confidence'],
             'framework': self._detect_framework(),
             'type': self._detect_project_type()
         }
@@ -23,11 +67,16 @@ class RulesAnalyzer:
         """Detect the project name from package files or directory name.
         
         Checks common project definition files in priority order and falls back
-        to the directory name if no project files are found or readable.
+        to the directory name if no project files are found or readable. The
+        result is memoized by the manifest index until a manifest changes.
         
         Returns:
             str: The detected project name
         """
+        return self.manifests.memoize('rules_analyzer.name', self._compute_project_name)
+
+    def _compute_project_name(self) -> str:
+        """Run the project name detection against the current manifests."""
         # Define project file checkers in order of priority
         project_files = [
             self._get_name_from_package_json,
@@ -52,46 +101,31 @@ class RulesAnalyzer:
     
     def _get_name_from_package_json(self) -> Optional[str]:
         """Extract project name from package.json file."""
-        package_json_path = os.path.join(self.project_path, 'package.json')
-        if os.path.exists(package_json_path):
-            try:
-                with open(package_json_path, 'r', encoding='utf-8') as f:
-                    data = json.load(f)
-                    if data.get('name'):
-                        self.logger.debug(f"Found project name in package.json: {data['name']}")
-                        return data['name']
-            except json.JSONDecodeError as e:
-                self.logger.error(f"Error parsing package.json: {str(e)}")
-            except IOError as e:
-                self.logger.error(f"Error reading package.json: {str(e)}")
+        data = self.manifests.read_json('package.json')
+        if isinstance(data, dict) and data.get('name'):
+            self.logger.debug(f"Found project name in package.json: {data['name']}")
+            return data['name']
         return None
     
     def _get_name_from_setup_py(self) -> Optional[str]:
         """Extract project name from setup.py file."""
-        setup_py_path = os.path.join(self.project_path, 'setup.py')
-        if os.path.exists(setup_py_path):
-            try:
-                with open(setup_py_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # Look for name parameter in setup() function
-                    import re
-                    name_match = re.search(r"name=['\"]([^'\"]+)['\"]", content)
-                    if name_match:
-                        name = name_match.group(1)
-                        self.logger.debug(f"Found project name in setup.py: {name}")
-                        return name
-            except IOError as e:
-                self.logger.error(f"Error reading setup.py: {str(e)}")
+        content = self.manifests.read_text('setup.py')
+        if content:
+            # Look for name parameter in setup() function
+            name_match = re.search(r"name=['\"]([^'\"]+)['\"]", content)
+            if name_match:
+                name = name_match.group(1)
+                self.logger.debug(f"Found project name in setup.py: {name}")
+                return name
         return None
     
     def _get_name_from_pom_xml(self) -> Optional[str]:
         """Extract project name from Maven pom.xml file."""
-        pom_path = os.path.join(self.project_path, 'pom.xml')
-        if os.path.exists(pom_path):
+        content = self.manifests.read_text('pom.xml')
+        if content:
             try:
                 import xml.etree.ElementTree as ET
-                tree = ET.parse(pom_path)
-                root = tree.getroot()
+                root = ET.fromstring(content)
                 
                 # Handle potential namespace in XML
                 ns = {'': root.tag.split('}')[0].strip('{') if '}' in root.tag else ''}
@@ -112,54 +146,44 @@ class RulesAnalyzer:
     
     def _get_name_from_gradle(self) -> Optional[str]:
         """Extract project name from build.gradle file."""
-        gradle_path = os.path.join(self.project_path, 'build.gradle')
-        if os.path.exists(gradle_path):
-            try:
-                with open(gradle_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    # Look for project name in various gradle configurations
-                    import re
-                    # Try rootProject.name or project.name
-                    name_match = re.search(r"(?:rootProject|project)\.name\s*=\s*['\"]([^'\"]+)['\"]", content)
-                    if name_match:
-                        name = name_match.group(1)
-                        self.logger.debug(f"Found project name in build.gradle: {name}")
-                        return name
-                    
-                    # Try looking for archivesBaseName
-                    archive_match = re.search(r"archivesBaseName\s*=\s*['\"]([^'\"]+)['\"]", content)
-                    if archive_match:
-                        name = archive_match.group(1)
-                        self.logger.debug(f"Found project name in build.gradle (archivesBaseName): {name}")
-                        return name
-            except IOError as e:
-                self.logger.error(f"Error reading build.gradle: {str(e)}")
+        content = self.manifests.read_text('build.gradle')
+        if content:
+            # Look for project name in various gradle configurations
+            # Try rootProject.name or project.name
+            name_match = re.search(r"(?:rootProject|project)\.name\s*=\s*['\"]([^'\"]+)['\"]", content)
+            if name_match:
+                name = name_match.group(1)
+                self.logger.debug(f"Found project name in build.gradle: {name}")
+                return name
+            
+            # Try looking for archivesBaseName
+            archive_match = re.search(r"archivesBaseName\s*=\s*['\"]([^'\"]+)['\"]", content)
+            if archive_match:
+                name = archive_match.group(1)
+                self.logger.debug(f"Found project name in build.gradle (archivesBaseName): {name}")
+                return name
         return None
     
     def _get_name_from_cargo_toml(self) -> Optional[str]:
         """Extract project name from Cargo.toml file (Rust)."""
-        cargo_path = os.path.join(self.project_path, 'Cargo.toml')
-        if os.path.exists(cargo_path):
+        content = self.manifests.read_text('Cargo.toml')
+        if content:
             try:
                 # Try to use toml parser if available
                 try:
                     import toml
-                    with open(cargo_path, 'r', encoding='utf-8') as f:
-                        data = toml.load(f)
-                        if data.get('package', {}).get('name'):
-                            name = data['package']['name']
-                            self.logger.debug(f"Found project name in Cargo.toml: {name}")
-                            return name
+                    data = toml.loads(content)
+                    if data.get('package', {}).get('name'):
+                        name = data['package']['name']
+                        self.logger.debug(f"Found project name in Cargo.toml: {name}")
+                        return name
                 except ImportError:
                     # Fallback to regex if toml module is not available
-                    with open(cargo_path, 'r', encoding='utf-8') as f:
-                        content = f.read()
-                        import re
-                        name_match = re.search(r"name\s*=\s*['\"]([^'\"]+)['\"]", content)
-                        if name_match:
-                            name = name_match.group(1)
-                            self.logger.debug(f"Found project name in Cargo.toml (regex): {name}")
-                            return name
+                    name_match = re.search(r"name\s*=\s*['\"]([^'\"]+)['\"]", content)
+                    if name_match:
+                        name = name_match.group(1)
+                        self.logger.debug(f"Found project name in Cargo.toml (regex): {name}")
+                        return name
             except Exception as e:
                 self.logger.error(f"Error reading Cargo.toml: {str(e)}")
         return None
@@ -167,37 +191,31 @@ class RulesAnalyzer:
     def _get_name_from_gemspec(self) -> Optional[str]:
         """Extract project name from .gemspec files (Ruby)."""
         # Find any .gemspec file in the project root
-        gemspec_files = [f for f in os.listdir(self.project_path) 
-                        if f.endswith('.gemspec') and os.path.isfile(os.path.join(self.project_path, f))]
+        gemspec_files = self.manifests.files_with_suffix('.gemspec')
         
         if gemspec_files:
-            gemspec_path = os.path.join(self.project_path, gemspec_files[0])
-            try:
-                with open(gemspec_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                    import re
-                    # Look for gem name definition
-                    name_match = re.search(r"\.name\s*=\s*['\"]([^'\"]+)['\"]", content)
-                    if name_match:
-                        name = name_match.group(1)
-                        self.logger.debug(f"Found project name in {gemspec_files[0]}: {name}")
-                        return name
-            except IOError as e:
-                self.logger.error(f"Error reading {gemspec_files[0]}: {str(e)}")
+            content = self.manifests.read_text(gemspec_files[0])
+            if content:
+                # Look for gem name definition
+                name_match = re.search(r"\.name\s*=\s*['\"]([^'\"]+)['\"]", content)
+                if name_match:
+                    name = name_match.group(1)
+                    self.logger.debug(f"Found project name in {gemspec_files[0]}: {name}")
+                    return name
         return None
     
     def _get_name_from_csproj(self) -> Optional[str]:
         """Extract project name from .csproj files (.NET)."""
         # Find any .csproj file in the project root
-        csproj_files = [f for f in os.listdir(self.project_path) 
-                       if f.endswith('.csproj') and os.path.isfile(os.path.join(self.project_path, f))]
+        csproj_files = self.manifests.files_with_suffix('.csproj')
         
         if csproj_files:
-            csproj_path = os.path.join(self.project_path, csproj_files[0])
+            content = self.manifests.read_text(csproj_files[0])
+            if content is None:
+                return None
             try:
                 import xml.etree.ElementTree as ET
-                tree = ET.parse(csproj_path)
-                root = tree.getroot()
+                root = ET.fromstring(content)
                 
                 # Look for AssemblyName or first PropertyGroup/RootNamespace
                 assembly_name = root.find(".//AssemblyName")
@@ -220,212 +238,245 @@ class RulesAnalyzer:
 
     def _detect_main_language(self) -> str:
         """Detect the main programming language used in the project."""
-        extensions = {}
+        return self._language_census()['language']
+
+    def _language_census(self) -> Dict[str, Any]:
+        """Tally source files by language, weighted by size.
         
-        for root, _, files in os.walk(self.project_path):
-            if 'node_modules' in root or 'venv' in root or '.git' in root:
-                continue
-                
-            for file in files:
-                ext = os.path.splitext(file)[1].lower()
-                if ext:
-                    extensions[ext] = extensions.get(ext, 0) + 1
-
-        # Map extensions to languages
-        FILE_EXTENSIONS = {
-            '.js': 'javascript',
-            '.jsx': 'javascript',
-            '.ts': 'typescript',
-            '.tsx': 'typescript',
-            '.py': 'python',
-            '.java': 'java',
-            '.cpp': 'cpp',
-            '.c': 'c',
-            '.h': 'c',
-            '.hpp': 'cpp',
-            '.cs': 'csharp',
-            '.go': 'go',
-            '.rb': 'ruby',
-            '.php': 'php',
-            '.swift': 'swift',
-            '.kt': 'kotlin',
-            '.kts': 'kotlin',
-            '.json': 'json',
-            '.md': 'markdown',
-            '.html': 'html',
-            '.css': 'css',
-            '.scss': 'scss',
-            '.less': 'less',
-            '.vue': 'vue',
-            '.svelte': 'svelte'
+        Walks the project, pruning ignored and hidden directories, and
+        weights each source file (data and docs, CENSUS_EXCLUDED_LANGUAGES,
+        are not counted) by its size (capped at CENSUS_MAX_FILE_WEIGHT so
+        one large file cannot dominate). Each top-level directory is walked
+        breadth-first on its own queue and the queues take turns, one
+        directory at a time, so the files counted are spread over the whole
+        tree instead of its shallow levels only. The walk stops early once
+        every top-level directory was visited, at least CENSUS_MIN_FILES
+        files have been counted and the lead of the dominant language over
+        the runner-up reaches CENSUS_CONFIDENCE, using a normal approximation
+        of the per-file weight difference between the two. The sample is not
+        random, so the confidence of an early stop is a heuristic score
+        rather than a probability.
+        
+        Returns:
+            Dict with the detected 'language', the 'confidence' in that
+            result, the number of 'files_sampled' and whether the walk was
+            'complete'
+        """
+        weights = {}
+        squares = {}
+        files_sampled = 0
+        confidence = 0.0
+        complete = True
+        strata = deque([deque([self.project_path])])  # Directories to visit, per top-level directory
+        first_round = 1  # Queues not visited yet in the first round
+
+        while strata and complete:
+            pending = strata.popleft()
+            first_round -= 1
+            directory = pending.popleft()
+            subdirs, files = self._census_scan(directory)
+            if directory == self.project_path:
+                strata.extend(deque([subdir]) for subdir in subdirs)
+                first_round = len(strata)
+            else:
+                pending.extend(subdirs)
+                if pending:
+                    strata.append(pending)
+
+            for language, weight in files:
+                weights[language] = weights.get(language, 0) + weight
+                squares[language] = squares.get(language, 0) + weight * weight
+                files_sampled += 1
+
+                if first_round <= 0 and files_sampled >= self.CENSUS_MIN_FILES:
+                    confidence = self._census_confidence(weights, squares, files_sampled)
+                    if confidence >= self.CENSUS_CONFIDENCE:
+                        complete = False
+                        break
+
+        if complete and weights:
+            # Every file was counted, so the tally is exact
+            confidence = 1.0
+
+        language = max(weights, key=weights.get) if weights else 'javascript'  # default
+        census = {
+            'language': language,
+            'confidence': round(confidence, 4),
+            'files_sampled': files_sampled,
+            'complete': complete
         }
+        self.logger.debug(f"Language census: {census}")
+        return census
 
-        # Find the most common language
-        max_count = 0
-        main_language = 'javascript'  # default
-        
-        for ext, count in extensions.items():
-            if ext in FILE_EXTENSIONS and count > max_count:
-                max_count = count
-                main_language = FILE_EXTENSIONS[ext]
+    def _census_scan(self, directory: str) -> Tuple[List[str], List[Tuple[str, int]]]:
+        """List the subdirectories and the (language, weight) of the source files in a directory."""
+        subdirs = []
+        files = []
+        try:
+            with os.scandir(directory) as entries:
+                entries = list(entries)
+        except OSError:
+            return subdirs, files
 
-        return main_language
+        for entry in entries:
+            if should_ignore_file(entry.name):
+                continue
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+                    continue
+                language = self.LANGUAGE_EXTENSIONS.get(os.path.splitext(entry.name)[1].lower())
+                if not language or language in self.CENSUS_EXCLUDED_LANGUAGES or self._is_ignored_file(entry.name):
+                    continue
+                size = entry.stat().st_size
+            except OSError:
+                continue
+            files.append((language, min(max(size, 1), self.CENSUS_MAX_FILE_WEIGHT)))
+        return subdirs, files
+
+    def _census_confidence(self, weights: Dict[str, int], squares: Dict[str, int], files_sampled: int) -> float:
+        """Confidence that the leading language stays ahead of the runner-up."""
+        ranked = sorted(weights, key=weights.get, reverse=True)
+        leader = ranked[0]
+        runner_up = ranked[1] if len(ranked) > 1 else None
+
+        # Each file contributes +weight for the leader, -weight for the
+        # runner-up and 0 otherwise; test whether its mean is above zero
+        mean = (weights[leader] - weights.get(runner_up, 0)) / files_sampled
+        variance = (squares[leader] + squares.get(runner_up, 0)) / files_sampled - mean * mean
+        if variance <= 0:
+            return 1.0
+        z = mean / math.sqrt(variance / files_sampled)
+        return 0.5 * (1.0 + math.erf(z / math.sqrt(2)))
+
+    def _is_ignored_file(self, name: str) -> bool:
+        """Check a file name against the configured ignore patterns."""
+        return any(fnmatch.fnmatch(name, pattern) for pattern in IGNORED_FILES)
 
     def _detect_framework(self) -> str:
         """Detect the framework used in the project."""
+        return self.manifests.memoize('rules_analyzer.framework', self._compute_framework)
+
+    def _compute_framework(self) -> str:
+        """Run the framework detection against the current manifests."""
         # Check package.json for JS/TS frameworks
-        package_json_path = os.path.join(self.project_path, 'package.json')
-        if os.path.exists(package_json_path):
-            try:
-                with open(package_json_path, 'r') as f:
-                    data = json.load(f)
-                    deps = {**data.get('dependencies', {}), **data.get('devDependencies', {})}
-                    
-                    if 'react' in deps:
-                        return 'react'
-                    if 'vue' in deps:
-                        return 'vue'
-                    if '@angular/core' in deps:
-                        return 'angular'
-                    if 'next' in deps:
-                        return 'next.js'
-                    if 'express' in deps:
-                        return 'express'
-            except:
-                pass
+        data = self.manifests.read_json('package.json')
+        if isinstance(data, dict):
+            deps = {**(data.get('dependencies') or {}), **(data.get('devDependencies') or {})}
+            
+            if 'react' in deps:
+                return 'react'
+            if 'vue' in deps:
+                return 'vue'
+            if '@angular/core' in deps:
+                return 'angular'
+            if 'next' in deps:
+                return 'next.js'
+            if 'express' in deps:
+                return 'express'
 
         # Check requirements.txt for Python frameworks
-        requirements_path = os.path.join(self.project_path, 'requirements.txt')
-        if os.path.exists(requirements_path):
-            try:
-                with open(requirements_path, 'r') as f:
-                    content = f.read().lower()
-                    if 'django' in content:
-                        return 'django'
-                    if 'flask' in content:
-                        return 'flask'
-                    if 'fastapi' in content:
-                        return 'fastapi'
-            except:
-                pass
+        content = (self.manifests.read_text('requirements.txt') or '').lower()
+        if 'django' in content:
+            return 'django'
+        if 'flask' in content:
+            return 'flask'
+        if 'fastapi' in content:
+            return 'fastapi'
 
         # Check composer.json for PHP frameworks
-        composer_path = os.path.join(self.project_path, 'composer.json')
-        if os.path.exists(composer_path):
-            try:
-                with open(composer_path, 'r') as f:
-                    data = json.load(f)
-                    deps = {**data.get('require', {}), **data.get('require-dev', {})}
-                    
-                    if 'laravel/framework' in deps:
-                        return 'laravel'
-                    if 'symfony/symfony' in deps:
-                        return 'symfony'
-                    if 'cakephp/cakephp' in deps:
-                        return 'cakephp'
-                    if 'codeigniter/framework' in deps:
-                        return 'codeigniter'
-                    if 'yiisoft/yii2' in deps:
-                        return 'yii2'
-            except:
-                pass
+        data = self.manifests.read_json('composer.json')
+        if isinstance(data, dict):
+            deps = {**(data.get('require') or {}), **(data.get('require-dev') or {})}
+            
+            if 'laravel/framework' in deps:
+                return 'laravel'
+            if 'symfony/symfony' in deps:
+                return 'symfony'
+            if 'cakephp/cakephp' in deps:
+                return 'cakephp'
+            if 'codeigniter/framework' in deps:
+                return 'codeigniter'
+            if 'yiisoft/yii2' in deps:
+                return 'yii2'
 
         # Check for WordPress
-        if os.path.exists(os.path.join(self.project_path, 'wp-config.php')):
+        if self.manifests.has('wp-config.php'):
             return 'wordpress'
 
         # Check for C++ frameworks
-        cmake_path = os.path.join(self.project_path, 'CMakeLists.txt')
-        if os.path.exists(cmake_path):
-            try:
-                with open(cmake_path, 'r') as f:
-                    content = f.read().lower()
-                    if 'qt' in content:
-                        return 'qt'
-                    if 'boost' in content:
-                        return 'boost'
-                    if 'opencv' in content:
-                        return 'opencv'
-            except:
-                pass
+        content = (self.manifests.read_text('CMakeLists.txt') or '').lower()
+        if 'qt' in content:
+            return 'qt'
+        if 'boost' in content:
+            return 'boost'
+        if 'opencv' in content:
+            return 'opencv'
 
         # Check for C# frameworks
-        csproj_files = [f for f in os.listdir(self.project_path) if f.endswith('.csproj')]
-        for csproj in csproj_files:
-            try:
-                with open(os.path.join(self.project_path, csproj), 'r') as f:
-                    content = f.read().lower()
-                    if 'microsoft.aspnetcore' in content:
-                        return 'asp.net core'
-                    if 'microsoft.net.sdk.web' in content:
-                        return 'asp.net core'
-                    if 'xamarin' in content:
-                        return 'xamarin'
-                    if 'microsoft.maui' in content:
-                        return 'maui'
-            except:
-                pass
+        for csproj in self.manifests.files_with_suffix('.csproj'):
+            content = (self.manifests.read_text(csproj) or '').lower()
+            if 'microsoft.aspnetcore' in content:
+                return 'asp.net core'
+            if 'microsoft.net.sdk.web' in content:
+                return 'asp.net core'
+            if 'xamarin' in content:
+                return 'xamarin'
+            if 'microsoft.maui' in content:
+                return 'maui'
 
         # Check for Swift frameworks
-        podfile_path = os.path.join(self.project_path, 'Podfile')
-        if os.path.exists(podfile_path):
-            try:
-                with open(podfile_path, 'r') as f:
-                    content = f.read().lower()
-                    if 'swiftui' in content:
-                        return 'swiftui'
-                    if 'combine' in content:
-                        return 'combine'
-                    if 'vapor' in content:
-                        return 'vapor'
-            except:
-                pass
+        content = (self.manifests.read_text('Podfile') or '').lower()
+        if 'swiftui' in content:
+            return 'swiftui'
+        if 'combine' in content:
+            return 'combine'
+        if 'vapor' in content:
+            return 'vapor'
 
         # Check for Kotlin frameworks
-        build_gradle_path = os.path.join(self.project_path, 'build.gradle')
-        if os.path.exists(build_gradle_path):
-            try:
-                with open(build_gradle_path, 'r') as f:
-                    content = f.read().lower()
-                    if 'org.jetbrains.compose' in content:
-                        return 'jetpack compose'
-                    if 'org.springframework.boot' in content:
-                        return 'spring boot'
-                    if 'ktor' in content:
-                        return 'ktor'
-            except:
-                pass
+        content = (self.manifests.read_text('build.gradle') or '').lower()
+        if 'org.jetbrains.compose' in content:
+            return 'jetpack compose'
+        if 'org.springframework.boot' in content:
+            return 'spring boot'
+        if 'ktor' in content:
+            return 'ktor'
 
         return 'none'
 
     def _detect_project_type(self) -> str:
         """Detect the type of project (web, mobile, library, etc.)."""
-        package_json_path = os.path.join(self.project_path, 'package.json')
-        
-        if os.path.exists(package_json_path):
-            try:
-                with open(package_json_path, 'r') as f:
-                    data = json.load(f)
-                    deps = {**data.get('dependencies', {}), **data.get('devDependencies', {})}
-                    
-                    # Check for mobile frameworks
-                    if 'react-native' in deps or '@ionic/core' in deps:
-                        return 'mobile application'
-                    
-                    # Check for desktop frameworks
-                    if 'electron' in deps:
-                        return 'desktop application'
-                    
-                    # Check if it's a library
-                    if data.get('name', '').startswith('@') or '-lib' in data.get('name', ''):
-                        return 'library'
-            except:
-                pass
+        project_type = self.manifests.memoize('rules_analyzer.type', self._project_type_from_package_json)
+        if project_type:
+            return project_type
 
         # Look for common web project indicators
         web_indicators = ['index.html', 'public/index.html', 'src/index.html']
         for indicator in web_indicators:
-            if os.path.exists(os.path.join(self.project_path, indicator)):
+            if self.manifests.has(indicator):
                 return 'web application'
 
-        return 'application' 
\ No newline at end of file
+        return 'application'
+
+    def _project_type_from_package_json(self) -> Optional[str]:
+        """Detect the project type from package.json dependencies and name."""
+        data = self.manifests.read_json('package.json')
+        if not isinstance(data, dict):
+            return None
+
+        deps = {**(data.get('dependencies') or {}), **(data.get('devDependencies') or {})}
+        
+        # Check for mobile frameworks
+        if 'react-native' in deps or '@ionic/core' in deps:
+            return 'mobile application'
+        
+        # Check for desktop frameworks
+        if 'electron' in deps:
+            return 'desktop application'
+        
+        # Check if it's a library
+        name = data.get('name') or ''
+        if name.startswith('@') or '-lib' in name:
+            return 'library'
+        return None
@@ -1,50 +1,263 @@
 import os
 import json
-from typing import Dict, Any, List
+import zlib
+import heapq
+import hashlib
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, List, Tuple, Iterator, Optional
 from datetime import datetime
-import google.generativeai as genai
 import re
 from rules_analyzer import RulesAnalyzer
 from dotenv import load_dotenv
-from patterns_analyzer import PatternsAnalyzer
+from patterns_analyzer import PatternsAnalyzer, LineIndex
+from manifest_index import MANIFEST_NAMES, summarize_manifest
+from llm_cache import LLMResponseCache, llm_cache_enabled
+from llm_providers import LLMProvider, ChatSession, get_provider
+from prompt_builder import PromptBuilder, describe_report
+from json_stream import IncrementalJSONExtractor, JSONStreamError
+from llm_scheduler import get_scheduler
+from heuristic_rules import build_heuristic_rules, build_heuristic_description
+from rules_sections import RULE_SECTIONS, CODE_SAMPLE_SECTIONS, SectionStore, rules_schema, section_fingerprints
+
+# Bounds on what the structure analysis keeps in memory
+MAX_PATTERNS_PER_KIND = 5000  # Entries kept per pattern list
+MAX_CODE_FILE_CHARS = 1024 * 1024  # Characters analyzed per code file
+MAX_EXCERPT_FILES = 50  # Code files sampled for the prompt
+MAX_EXCERPT_CHARS = 10000  # Characters kept per sampled file
+MAX_INDEX_SYMBOLS = 5  # Class/function names kept per file in the file index
+MAX_INDEX_IMPORTS = 20  # Imported modules kept per file in the file index
+MAX_CONFIG_BYTES = 256 * 1024  # Config files larger than this are not parsed
+
+# Lockfiles and generated files that are never ingested as configuration
+GENERATED_CONFIG_NAMES = {
+    'package-lock.json', 'npm-shrinkwrap.json', 'yarn.lock', 'pnpm-lock.yaml',
+    'composer.lock', 'Pipfile.lock', 'poetry.lock', 'Cargo.lock'
+}
+GENERATED_CONFIG_SUFFIXES = ('.tsbuildinfo', '.min.json', '.map')
+
+# Files read by the structure analysis
+ANALYZED_CODE_EXTENSIONS = {'.py', '.js', '.ts', '.tsx', '.kt', '.php', '.swift', '.cpp', '.c', '.h', '.hpp', '.cs', '.csx', '.java', '.rb', '.objc'}
+CONFIG_FILE_SUFFIXES = ('.json', '.ini', '.conf')
+
+# Language names from get_language_from_ext that don't lowercase to their pattern key
+LANGUAGE_KEYS = {
+    'c#': 'csharp',
+    'c# script': 'csharp',
+    'c++': 'cpp',
+    'c++ header': 'cpp',
+    'c/c++ header': 'c',
+    'objective-c': 'objc',
+    'objective-c++': 'objc',
+    'kotlin script': 'kotlin',
+}
+
+# Map-reduce summarization of large projects, see _summarize_modules
+MAP_SAMPLE_FILES = 3  # Files per module whose code is shown to the map prompt
+MAP_SAMPLE_CHARS = 3000  # Characters shown per sample file
+MAP_MAX_FILES_LISTED = 40  # Files listed per module in the map prompt
+
+# Error handling constructs, by language family; read by the heuristic rules
+ERROR_HANDLING_PATTERNS = {
+    'python': re.compile(
+        r'^[ \t]*except[ \t]*(?P<catch_all>:)'
+        r'|^[ \t]*except[ \t]+\(?[ \t]*(?P<catch>(?:[a-z_]\w*\.)*[A-Z]\w*)'
+        r'|^[ \t]*raise[ \t]+(?P<raise>(?:[a-z_]\w*\.)*[A-Z]\w*)'
+        r'|\b(?P<log>log(?:ger|ging)?\.(?:exception|error|warning))\(',
+        re.MULTILINE
+    ),
+    'braces': re.compile(
+        r'\bcatch[ \t]*(?P<catch_all>\{|\([ \t]*\.\.\.[ \t]*\))'
+        r'|\bcatch[ \t]*\([ \t]*(?:final[ \t]+)?(?P<catch>[A-Z][\w.]*)[ \t]+\w+'
+        r'|\bthrow[ \t]+new[ \t]+(?P<raise>[A-Za-z_][\w.]*)'
+        r'|\b(?P<log>console\.error|log(?:ger)?\.(?:error|warn(?:ing)?|exception))\('
+    ),
+}
+
+# Used when the project description could not be generated
+DEFAULT_DESCRIPTION = "A software project with automated analysis and rule generation capabilities."
+
+# Directories skipped by the structure analysis (matched as substrings)
+SKIPPED_DIR_PARTS = ['node_modules', 'venv', '.git', '__pycache__', 'build', 'dist']
+
+# How the AI refines the locally generated rules at setup, see rules_refinement_mode
+REFINEMENT_MODES = ('background', 'sync', 'off')
+
+_env_loaded = False
+
+def _load_env() -> None:
+    """Load the .env file into the environment, once per process."""
+    global _env_loaded
+    if not _env_loaded:
+        load_dotenv()
+        _env_loaded = True
+
+def rules_refinement_mode() -> str:
+    """How setup refines the rules generated from the local analysis.
+    
+    Read from the RULES_REFINEMENT environment variable, then the
+    'rules_refinement' config setting: 'background' (the default) writes the
+    local rules at once and replaces them with AI rules when those arrive,
+    'sync' waits for the AI rules only, 'off' never sends a request.
+    """
+    mode = os.environ.get('RULES_REFINEMENT')
+    if not mode:
+        from config import load_config
+        mode = (load_config() or {}).get('rules_refinement', 'background')
+    mode = mode.lower()
+    if mode not in REFINEMENT_MODES:
+        raise ValueError(f"Unknown rules refinement '{mode}', expected one of: {', '.join(REFINEMENT_MODES)}")
+    return mode
+
+# Background refinements that may still be running, see wait_for_refinements
+_refinements = set()
+_refinements_lock = threading.Lock()
+
+def wait_for_refinements(timeout: Optional[float] = None) -> None:
+    """Wait for the rules refinements started in the background to finish.
+    
+    Call before the process exits: once the interpreter shuts down, the
+    refinement can no longer start its AI requests.
+    """
+    with _refinements_lock:
+        pending = [thread for thread in _refinements if thread.is_alive()]
+    if pending:
+        print("⏳ Waiting for the AI rules refinement to finish")
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    for thread in pending:
+        thread.join(None if deadline is None else max(0, deadline - time.monotonic()))
+
+def walk_project(project_path: str) -> Iterator[Tuple[str, List[str], List[str]]]:
+    """Walk a project like os.walk, pruning the directories the analysis skips."""
+    for root, dirs, files in os.walk(project_path):
+        dirs[:] = sorted(d for d in dirs if not any(x in d for x in SKIPPED_DIR_PARTS))
+        yield root, dirs, files
+
+def tree_fingerprint(project_path: str) -> str:
+    """Hash the path, size and mtime of every file the structure analysis reads."""
+    digest = hashlib.sha1()
+    for root, _, files in walk_project(project_path):
+        for file in sorted(files):
+            if os.path.splitext(file)[1].lower() not in ANALYZED_CODE_EXTENSIONS and not file.endswith(CONFIG_FILE_SUFFIXES) \
+                    and not (root == project_path and file in MANIFEST_NAMES):
+                continue
+            try:
+                st = os.stat(os.path.join(root, file))
+            except OSError:
+                continue
+            digest.update(f"{os.path.relpath(os.path.join(root, file), project_path)}\0{st.st_size}\0{st.st_mtime_ns}\n".encode('utf-8', 'surrogateescape'))
+    return digest.hexdigest()
+
+class ProjectAnalysis:
+    """Result of one structure analysis, reusable while the project tree is unchanged."""
+
+    def __init__(self, project_path: str, structure: Dict[str, Any], fingerprint: str):
+        self.project_path = project_path
+        self.structure = structure
+        self.fingerprint = fingerprint
+        self.created_at = datetime.now()
+
+    @property
+    def files_analyzed(self) -> int:
+        """Number of code files that were analyzed."""
+        return len(self.structure['files'])
+
+    def is_fresh(self) -> bool:
+        """Check whether no file visible to the analysis was added, removed or modified."""
+        return tree_fingerprint(self.project_path) == self.fingerprint
 
 class RulesGenerator:
-    def __init__(self, project_path: str):
+    def __init__(self, project_path: str, use_llm_cache: Optional[bool] = None, provider: Optional[LLMProvider] = None):
+        """Create a rules generator for a project.
+        
+        Args:
+            project_path: Path to the project
+            use_llm_cache: Reuse cached AI responses for identical prompts;
+                defaults to the LLM_CACHE environment setting (on unless '0')
+            provider: LLM provider to use; defaults to the shared instance of
+                the one selected by LLM_PROVIDER or the 'llm_provider' config
+                setting, created when the first prompt is sent
+        """
+        # Load environment variables from .env before reading any settings
+        _load_env()
+
         self.project_path = project_path
         self.analyzer = RulesAnalyzer(project_path)
+        self._analysis = None
         
-        # Initialize pattern analyzer
-        patterns_analyzer = PatternsAnalyzer()
-        self.compiled_patterns = patterns_analyzer.compiled_patterns
-        self.get_language_from_ext = patterns_analyzer.get_language_from_ext
+        # Seconds each AI request may take before it is abandoned
+        self.request_timeout = float(os.environ.get('LLM_REQUEST_TIMEOUT', 180))
+
+        # Stream JSON responses so malformed output is rejected early (LLM_STREAM=0 disables)
+        self.stream_responses = os.environ.get('LLM_STREAM', '1').lower() not in ('0', 'false', 'no', 'off')
+
+        # Earlier prompts and responses replayed with each rules prompt. 0 (the
+        # default) sends every prompt on its own, so requests do not grow.
+        self.history_turns = int(os.environ.get('LLM_HISTORY_TURNS', 0))
+
+        # What the last budgeted prompt of each kind left out, see _build_prompt
+        self.prompt_reports = {}
         
-        # Load environment variables from .env
-        load_dotenv()
+        # Initialize pattern analyzer
+        self.patterns_analyzer = PatternsAnalyzer()
+        self.compiled_patterns = self.patterns_analyzer.compiled_patterns
+        self.get_language_from_ext = self.patterns_analyzer.get_language_from_ext
         
-        # Initialize Gemini AI
-        try:
-            api_key = os.environ.get("GEMINI_API_KEY")
-            if not api_key:
-                raise ValueError("GEMINI_API_KEY is required")
+        # The AI provider (Gemini unless configured otherwise) is set up on first use
+        self._provider = provider
+        self._chat_session = None
+        self._provider_lock = threading.Lock()
 
-            genai.configure(api_key=api_key)
-            
-            # Get model name from environment or use default
-            model_name = os.environ.get("GEMINI_MODEL", "gemini-2.5-pro-exp-03-25")
-            
-            self.model = genai.GenerativeModel(
-                model_name=model_name,
-            )
-            self.chat_session = self.model.start_chat(history=[])
-            
-        except Exception as e:
-            print(f"\n⚠️ Error when initializing Gemini AI: {e}")
-            raise
+        if use_llm_cache is None:
+            use_llm_cache = llm_cache_enabled()
+        self.llm_cache = LLMResponseCache() if use_llm_cache else None
+
+        # Sections of the previous rules, reused while their inputs are unchanged
+        self.section_store = SectionStore(project_path) if use_llm_cache else None
+
+    @property
+    def provider(self) -> LLMProvider:
+        """The AI provider, taken from the process-wide pool on first use."""
+        if self._provider is None:
+            with self._provider_lock:
+                if self._provider is None:
+                    try:
+                        self._provider = get_provider()
+                    except Exception as e:
+                        print(f"\n⚠️ Error when initializing AI provider: {e}")
+                        raise
+        return self._provider
+
+    @property
+    def model_name(self) -> str:
+        return self.provider.model_name
+
+    @property
+    def chat_session(self) -> ChatSession:
+        """Conversation of this generator, started on first use."""
+        if self._chat_session is None:
+            self._chat_session = self.provider.start_chat(max_turns=self.history_turns)
+        return self._chat_session
 
     def _get_timestamp(self) -> str:
         """Get current timestamp in standard format."""
         return datetime.now().strftime('%B %d, %Y at %I:%M %p')
 
+    def get_analysis(self, refresh: bool = False) -> ProjectAnalysis:
+        """Get the project analysis, reusing the previous one while it is fresh.
+        
+        Args:
+            refresh: Analyze again even if the previous analysis is still fresh
+        """
+        if not refresh and self._analysis is not None and self._analysis.is_fresh():
+            return self._analysis
+
+        # Fingerprint first, so changes made during the walk make the result stale
+        fingerprint = tree_fingerprint(self.project_path)
+        self._analysis = ProjectAnalysis(self.project_path, self._analyze_project_structure(), fingerprint)
+        return self._analysis
+
     def _analyze_project_structure(self) -> Dict[str, Any]:
         """Analyze project structure and collect detailed information."""
         structure = {
@@ -53,7 +266,11 @@ class RulesGenerator:
             'frameworks': [],
             'languages': {},
             'config_files': [],
-            'code_contents': {},
+            'declared_dependencies': {},  # From package.json/composer.json files and root requirements.txt
+            'config_stats': {'ingested': 0, 'skipped_generated': 0, 'skipped_large': 0},
+            'code_contents': {},  # Sampled excerpts, see _sample_excerpt
+            'pattern_totals': {},  # Patterns found per list, including dropped ones
+            'file_index': {},  # Per-file aggregates, see _analyze_file
             'directory_structure': {},  # Track directory hierarchy
             'language_stats': {},      # Track language statistics by directory
             'patterns': {
@@ -76,12 +293,11 @@ class RulesGenerator:
 
         # Track directory statistics
         dir_stats = {}
+        totals = structure['pattern_totals']
+        excerpts = []
 
         # Analyze each file
-        for root, dirs, files in os.walk(self.project_path):
-            # Skip ignored directories
-            dirs[:] = [d for d in dirs if not any(x in d for x in ['node_modules', 'venv', '.git', '__pycache__', 'build', 'dist'])]
-            
+        for root, dirs, files in walk_project(self.project_path):
             rel_root = os.path.relpath(root, self.project_path)
             if rel_root == '.':
                 rel_root = ''
@@ -108,7 +324,7 @@ class RulesGenerator:
                 
                 # Analyze code files
                 file_ext = os.path.splitext(file)[1].lower()
-                if file_ext in ['.py', '.js', '.ts', '.tsx', '.kt', '.php', '.swift', '.cpp', '.c', '.h', '.hpp', '.cs', '.csx', '.java', '.rb', '.objc']:
+                if file_ext in ANALYZED_CODE_EXTENSIONS:
                     structure['files'].append(rel_path)
                     dir_stats[rel_root]['code_files'] += 1
                     
@@ -119,29 +335,25 @@ class RulesGenerator:
                     
                     try:
                         with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            structure['code_contents'][rel_path] = content
-                            
-                            # Analyze based on file type
-                            self._analyze_file(content, rel_path, structure, lang)
-                            
+                            content = f.read(MAX_CODE_FILE_CHARS)
                     except Exception as e:
                         print(f"⚠️ Error reading file {rel_path}: {e}")
                         continue
 
+                    # Analyze based on file type, then keep only an excerpt if sampled
+                    before = [totals.get(kind, 0) for kind in ('class_patterns', 'function_patterns', 'imports')]
+                    self._analyze_file(content, rel_path, structure, lang)
+                    self._sample_excerpt(excerpts, rel_path, content)
+                    del content
+
+                    counters = dir_stats[rel_root]['patterns']
+                    counters['classes'] += totals.get('class_patterns', 0) - before[0]
+                    counters['functions'] += totals.get('function_patterns', 0) - before[1]
+                    counters['imports'] += totals.get('imports', 0) - before[2]
+
                 # Classify config files
-                elif file.endswith(('.json', '.ini', '.conf')):
-                    structure['config_files'].append(rel_path)
-                    try:
-                        with open(file_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                            structure['patterns']['configurations'].append({
-                                'file': rel_path,
-                                'content': content
-                            })
-                    except Exception as e:
-                        print(f"⚠️ Error reading config file {rel_path}: {e}")
-                        continue
+                elif file.endswith(CONFIG_FILE_SUFFIXES) or file in GENERATED_CONFIG_NAMES:
+                    self._ingest_config(file_path, rel_path, structure)
 
             # Add directory structure information
             if rel_root:
@@ -150,13 +362,101 @@ class RulesGenerator:
                     'parent': os.path.dirname(rel_root) or None
                 }
 
+        # Excerpts in path order, so the prompt is stable between runs
+        structure['code_contents'] = {path: text for _, path, text in sorted(excerpts, key=lambda item: item[1])}
+
         # Analyze directory patterns
         self._analyze_directory_patterns(structure, dir_stats)
+
+        # Frameworks and build files come from the shared manifest index
+        framework = self.analyzer._detect_framework()
+        if framework != 'none':
+            structure['frameworks'].append(framework)
+        structure['manifest_files'] = self.analyzer.manifests.manifests()
+        for name, version in self.analyzer.manifests.dependencies().items():
+            structure['declared_dependencies'].setdefault(name, version)
         
         return structure
 
+    def _ingest_config(self, file_path: str, rel_path: str, structure: Dict[str, Any]) -> None:
+        """Record a config file as a compact summary.
+        
+        Lockfiles and generated files are skipped, files above MAX_CONFIG_BYTES
+        are recorded by size only, and dependency manifests are reduced to
+        their declared dependencies and scripts.
+        """
+        stats = structure['config_stats']
+        file_name = os.path.basename(rel_path)
+        if file_name in GENERATED_CONFIG_NAMES or file_name.endswith(GENERATED_CONFIG_SUFFIXES):
+            stats['skipped_generated'] += 1
+            return
+
+        try:
+            size = os.path.getsize(file_path)
+        except OSError as e:
+            print(f"⚠️ Error reading config file {rel_path}: {e}")
+            return
+
+        structure['config_files'].append(rel_path)
+        info = {'file': rel_path, 'size': size}
+        if size > MAX_CONFIG_BYTES:
+            stats['skipped_large'] += 1
+            self._add_pattern(structure, 'configurations', info)
+            return
+
+        if file_name.endswith('.json'):
+            try:
+                with open(file_path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except Exception as e:
+                print(f"⚠️ Error reading config file {rel_path}: {e}")
+                data = None
+
+            summary = summarize_manifest(file_name, data)
+            if summary:
+                info['summary'] = summary
+                structure['declared_dependencies'].update(summary['dependencies'])
+            elif isinstance(data, dict):
+                info['keys'] = list(data)[:20]
+
+        stats['ingested'] += 1
+        self._add_pattern(structure, 'configurations', info)
+
+    def _add_pattern(self, structure: Dict[str, Any], kind: str, info: Any) -> None:
+        """Record a pattern, keeping at most MAX_PATTERNS_PER_KIND entries per list."""
+        totals = structure['pattern_totals']
+        totals[kind] = totals.get(kind, 0) + 1
+        if totals[kind] <= MAX_PATTERNS_PER_KIND:
+            structure['patterns'][kind].append(info)
+
+        # Keep the per-file aggregates in step with the pattern lists
+        if kind in ('class_patterns', 'function_patterns'):
+            entry = structure['file_index'].get(info.get('file'))
+            if entry is not None:
+                symbols = 'classes' if kind == 'class_patterns' else 'functions'
+                entry[symbols] += 1
+                if len(entry[f'top_{symbols}']) < MAX_INDEX_SYMBOLS:
+                    entry[f'top_{symbols}'].append(info['name'])
+
+    def _sample_excerpt(self, excerpts: List[Tuple[int, str, str]], rel_path: str, content: str) -> None:
+        """Keep an excerpt of the MAX_EXCERPT_FILES files with the lowest path hashes.
+        
+        Hashing the path gives a sample spread over the whole tree that does
+        not depend on walk order; excerpts is a heap with the highest kept
+        hash on top, so each file costs O(log MAX_EXCERPT_FILES).
+        """
+        key = -zlib.crc32(rel_path.encode('utf-8'))
+        if len(excerpts) < MAX_EXCERPT_FILES:
+            heapq.heappush(excerpts, (key, rel_path, content[:MAX_EXCERPT_CHARS]))
+        elif key > excerpts[0][0]:
+            heapq.heapreplace(excerpts, (key, rel_path, content[:MAX_EXCERPT_CHARS]))
+
     def _analyze_file(self, content: str, rel_path: str, structure: Dict[str, Any], language: str) -> None:
         """Generic file analyzer that handles all languages."""
+        # 'TypeScript/React' -> 'typescript', 'C#' -> 'csharp', ...
+        lang = language.lower()
+        lang = LANGUAGE_KEYS.get(lang, lang.split('/')[0])
+
         # Map language to pattern group
         pattern_groups = {
             'python': 'python',
@@ -172,7 +472,20 @@ class RulesGenerator:
             'ruby': 'web',
             'objc': 'system',
         }
-        pattern_group = pattern_groups.get(language, 'system')
+        pattern_group = pattern_groups.get(lang, 'system')
+        
+        # Shared by all pattern categories to map match offsets to line numbers
+        line_index = LineIndex(content)
+
+        # Aggregates read by the prompt builders instead of scanning pattern lists
+        file_entry = structure['file_index'][rel_path] = {
+            'language': language,
+            'classes': 0,
+            'functions': 0,
+            'top_classes': [],
+            'top_functions': [],
+            'imports': []
+        }
 
         # Find patterns using named groups
         for pattern_type in ['import', 'class', 'function']:
@@ -190,7 +503,10 @@ class RulesGenerator:
                         module = next((v for k, v in groups.items() if v and k.startswith('module')), None)
                         if module:
                             structure['dependencies'][module] = True
-                            structure['patterns']['imports'].append(module)
+                            self._add_pattern(structure, 'imports', module)
+                            root_module = module.split('.')[0]
+                            if root_module and root_module not in file_entry['imports'] and len(file_entry['imports']) < MAX_INDEX_IMPORTS:
+                                file_entry['imports'].append(root_module)
                         continue
                         
                     # Handle classes and functions
@@ -201,6 +517,7 @@ class RulesGenerator:
                     info['name'] = name
                     info['file'] = rel_path
                     info['type'] = pattern_type
+                    info['line'] = line_index.line_of(match.start())
                     
                     # Add parameters/base class if present
                     if 'params' in groups and groups['params']:
@@ -212,18 +529,29 @@ class RulesGenerator:
                         
                     # Add to appropriate pattern list
                     pattern_key = f'{pattern_type}_patterns'
-                    structure['patterns'][pattern_key].append(info)
+                    self._add_pattern(structure, pattern_key, info)
                     
                 except Exception as e:
                     continue  # Skip on any error
-                    
+
+        # Record how errors are caught, raised and logged
+        family = 'python' if lang == 'python' else 'braces'
+        for match in ERROR_HANDLING_PATTERNS[family].finditer(content):
+            kind = match.lastgroup
+            self._add_pattern(structure, 'error_patterns', {
+                'kind': kind,
+                'name': match.group(kind) if kind in ('catch', 'raise', 'log') else None,
+                'file': rel_path,
+                'line': line_index.line_of(match.start())
+            })
+
         # Handle web-specific patterns
-        if language in ['typescript', 'javascript']:
-            self._analyze_web_patterns(content, rel_path, structure)
+        if lang in ['typescript', 'javascript']:
+            self._analyze_web_patterns(content, rel_path, structure, line_index)
 
         # Handle Unity-specific patterns for C#
-        if language == 'csharp' and any(x in content for x in ['UnityEngine', 'MonoBehaviour', 'ScriptableObject']):
-            self._analyze_unity_patterns(content, rel_path, structure)
+        if lang == 'csharp' and any(x in content for x in ['UnityEngine', 'MonoBehaviour', 'ScriptableObject']):
+            self._analyze_unity_patterns(content, rel_path, structure, line_index)
 
     def _analyze_directory_patterns(self, structure: Dict[str, Any], dir_stats: Dict[str, Any]):
         """Analyze directory organization patterns."""
@@ -258,7 +586,7 @@ class RulesGenerator:
                 purpose.append('presentation')
                 
             # Add directory pattern
-            structure['patterns']['directory_patterns'].append({
+            self._add_pattern(structure, 'directory_patterns', {
                 'path': dir_path,
                 'name_pattern': pattern,
                 'purpose': purpose,
@@ -268,14 +596,133 @@ class RulesGenerator:
                 'code_metrics': stats['patterns']
             })
 
-    def _generate_ai_rules(self, project_info: Dict[str, Any]) -> Dict[str, Any]:
-        """Generate rules using Gemini AI based on project analysis."""
+    def _send_prompt(self, prompt: str, stateless: Optional[bool] = None,
+                     extractor: Optional[IncrementalJSONExtractor] = None,
+                     cache_key: Optional[str] = None) -> str:
+        """Send a prompt to the model and return the response text.
+        
+        Responses are served from the LLM response cache when an identical
+        request was answered before.
+        
+        Args:
+            prompt: The prompt text
+            stateless: Send it as a one-off request instead of through the chat
+                session, so it can run concurrently with a chat request;
+                defaults to stateless unless history_turns is set
+            extractor: Parse the response as JSON while it arrives. The model
+                is asked for JSON only, the request is abandoned as soon as the
+                extractor rejects the output, and the JSON text is returned.
+            cache_key: Key of the response in the LLM response cache, instead
+                of one derived from the prompt
+        
+        Requests go through the process-wide scheduler, which rate limits
+        them and retries rate limits, server errors, timeouts and malformed
+        JSON within request_timeout.
+        
+        Raises:
+            JSONStreamError: If the response is not the JSON the extractor expects
+        """
+        if stateless is None:
+            stateless = self.history_turns <= 0
+        json_mode = extractor is not None
+        cache_key = cache_key or self._prompt_cache_key(prompt, stateless, json_mode)
+        if self.llm_cache:
+            cached = self.llm_cache.get(cache_key)
+            if cached is not None:
+                if extractor:
+                    extractor.feed(cached)
+                return cached
+
+        history = None if stateless else self.chat_session.history
+        deadline = time.monotonic() + self.request_timeout
+
+        def request() -> str:
+            timeout = max(0.0, deadline - time.monotonic())
+            if not json_mode:
+                return self.provider.generate(prompt, history=history, timeout=timeout)
+
+            extractor.reset()
+            if self.stream_responses:
+                chunks = self.provider.stream(prompt, history=history, timeout=timeout, json_mode=True)
+            else:
+                chunks = iter([self.provider.generate(prompt, history=history, timeout=timeout, json_mode=True)])
+            try:
+                for chunk in chunks:
+                    if extractor.feed(chunk):
+                        break  # Anything after the object is not needed
+            finally:
+                if hasattr(chunks, 'close'):
+                    chunks.close()
+            if not extractor.done:
+                # Truncated output is retried like any other malformed JSON
+                raise JSONStreamError("Response ended before the JSON object was complete")
+            return extractor.text
+
+        # Rate limited and retried together with every other request in the process
+        text = get_scheduler().call(
+            request,
+            key=self.provider.name,
+            requests_per_minute=self.provider.requests_per_minute,
+            deadline=deadline
+        )
+
+        if not stateless:
+            self.chat_session.record(prompt, text)
+        if self.llm_cache:
+            self.llm_cache.put(cache_key, text)
+        return text
+
+    def _build_prompt(self, kind: str, builder: PromptBuilder) -> str:
+        """Render a budgeted prompt and record what it left out.
+        
+        Args:
+            kind: Name of the prompt in prompt_reports
+            builder: Builder holding the prompt sections
+        """
+        prompt, report = builder.build()
+        self.prompt_reports[kind] = report
+        if report['dropped'] or report['truncated']:
+            print(f"✂️ Trimmed {kind} prompt to fit the token budget ({describe_report(report)})")
+        return prompt
+
+    def _prompt_cache_key(self, prompt: str, stateless: bool, json_mode: bool = False) -> str:
+        """Cache key of a prompt sent with the current model and settings."""
+        settings = {'stateless': stateless}
+        if json_mode:
+            settings['json_mode'] = True
+        return LLMResponseCache.make_key(f"{self.provider.name}:{self.model_name}", prompt, settings)
+
+    def _forget_response(self, prompt: str, stateless: Optional[bool] = None, json_mode: bool = False) -> None:
+        """Drop a cached response that turned out to be unusable."""
+        if stateless is None:
+            stateless = self.history_turns <= 0
+        if self.llm_cache:
+            self.llm_cache.invalidate(self._prompt_cache_key(prompt, stateless, json_mode))
+
+    def _generate_ai_rules(self, project_info: Dict[str, Any], analysis: Optional[ProjectAnalysis] = None,
+                           sections: Optional[List[str]] = None,
+                           module_summaries: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+        """Generate rules using the AI provider based on project analysis.
+        
+        Args:
+            project_info: Detected project information
+            analysis: Structure analysis to use, see get_analysis()
+            sections: Sections of ai_behavior.code_generation to request,
+                all of RULE_SECTIONS if omitted
+            module_summaries: Summaries of the top-level modules, shown
+                instead of code samples (see _summarize_modules)
+        """
+        sections = sections or RULE_SECTIONS
+        prompt = None
         try:
             # Analyze project
-            project_structure = self._analyze_project_structure()
+            project_structure = (analysis or self.get_analysis()).structure
+            file_index = project_structure['file_index']
+            core_files = [f for f in project_structure['files'] if not any(x in f.lower() for x in ['setup', 'config'])][:5]
             
-            # Create detailed prompt
-            prompt = f"""As an AI assistant working in Cursor IDE, analyze this project to understand how you should behave and generate code that perfectly matches the project's patterns and standards.
+            # Create detailed prompt, trimmed to the token budget
+            builder = PromptBuilder()
+            builder.text(f"""As an AI assistant working in Cursor IDE, analyze this project to understand how you should behave and generate code that perfectly matches the project's patterns and standards.
 
 Project Overview:
 Language: {project_info.get('language', 'unknown')}
@@ -287,35 +734,44 @@ Primary Purpose: Code generation and project analysis
 Project Metrics:
 - Files & Structure:
   - Total Files: {len(project_structure['files'])}
-  - Config Files: {len(project_structure['config_files'])}
+  - Config Files: {len(project_structure['config_files'])} (skipped {project_structure['config_stats']['skipped_generated']} lockfiles/generated, {project_structure['config_stats']['skipped_large']} too large to parse)
 - Dependencies:
   - Frameworks: {', '.join(project_structure['frameworks']) or 'none'}
   - Core Dependencies: {', '.join(list(project_structure['dependencies'].keys())[:10])}
   - Total Dependencies: {len(project_structure['dependencies'])}
+  - Declared Dependencies: {', '.join(f"{name} {version}" for name, version in list(project_structure['declared_dependencies'].items())[:15]) or 'none'}
 
 Project Ecosystem:
 1. Development Environment:
 - Project Structure:
-{chr(10).join([f"- {f}" for f in project_structure['files'] if f.endswith(('.json', '.md', '.env', '.gitignore'))][:5])}
-- IDE Configuration:
-{chr(10).join([f"- {f}" for f in project_structure['files'] if '.vscode' in f or '.idea' in f][:5])}
-- Build System:
-{chr(10).join([f"- {f}" for f in project_structure['files'] if f in ['setup.py', 'requirements.txt', 'package.json', 'Makefile', 'composer.json', 'Gemfile', 'CMakeLists.txt', 'build.gradle', 'pom.xml', 'webpack.config.js']])}
+""")
+            builder.items('project files', [f"- {f}" for f in project_structure['files'] if f.endswith(('.json', '.md', '.env', '.gitignore'))][:5], priority=1)
+            builder.text("\n- IDE Configuration:\n")
+            builder.items('IDE files', [f"- {f}" for f in project_structure['files'] if '.vscode' in f or '.idea' in f][:5], priority=1)
+            builder.text("\n- Build System:\n")
+            builder.items('build files', [f"- {f}" for f in project_structure['manifest_files']], priority=0)
+            builder.text("""
 
 2. Project Components:
 - Core Modules:
-{chr(10).join([f"- {f}: {sum(1 for p in project_structure['patterns']['function_patterns'] if p['file'] == f)} functions" for f in project_structure['files'] if f.endswith('.py, .js, .ts, .tsx, .kt, .php, .swift, .cpp, .c, .h, .hpp, .cs, .csx') and not any(x in f.lower() for x in ['setup', 'config'])][:5])}
-- Support Modules:
-{chr(10).join([f"- {f}" for f in project_structure['files'] if any(x in f.lower() for x in ['util', 'helper', 'common', 'shared'])][:5])}
-- Templates:
-{chr(10).join([f"- {f}" for f in project_structure['files'] if 'template' in f.lower()][:5])}
+""")
+            builder.items('core modules', [f"- {f}: {file_index[f]['functions']} functions" for f in core_files if f in file_index], priority=0)
+            builder.text("\n- Support Modules:\n")
+            builder.items('support modules', [f"- {f}" for f in project_structure['files'] if any(x in f.lower() for x in ['util', 'helper', 'common', 'shared'])][:5], priority=1)
+            builder.text("\n- Templates:\n")
+            builder.items('templates', [f"- {f}" for f in project_structure['files'] if 'template' in f.lower()][:5], priority=1)
+            builder.text("""
 
 3. Module Organization Analysis:
 - Core Module Functions:
-{chr(10).join([f"- {f}: Primary module handling {f.split('_')[0].title()} functionality" for f in project_structure['files'] if f.endswith('.py, .js, .ts, .tsx, .kt, .php, .swift, .cpp, .c, .h, .hpp, .cs, .csx') and not any(x in f.lower() for x in ['setup', 'config'])][:5])}
+""")
+            builder.items('core module functions', [f"- {f}: Primary module handling {f.split('_')[0].title()} functionality" for f in core_files], priority=0)
+            builder.text("""
 
 - Module Dependencies:
-{chr(10).join([f"- {f} depends on: {', '.join(list(set([imp.split('.')[0] for imp in project_structure['patterns']['imports'] if imp in f])))}" for f in project_structure['files'] if f.endswith('.py, .js, .ts, .tsx, .kt, .php, .swift, .cpp, .c, .h, .hpp, .cs, .csx')][:5])}
+""")
+            builder.items('module dependencies', [f"- {f} depends on: {', '.join(entry['imports'])}" for f, entry in list(file_index.items())[:5]], priority=0)
+            builder.text("""
 
 - Module Responsibilities:
 Please analyze each module's code and describe its core responsibilities based on:
@@ -337,10 +793,19 @@ Based on the codebase analysis, identify and describe:
 6. Error handling strategies
 7. Performance optimization patterns
 
-Code Sample Analysis:
-{chr(10).join(f"File: {file}:{chr(10)}{content[:10000]}..." for file, content in list(project_structure['code_contents'].items())[:50])}
-
-Based on this detailed analysis, create behavior rules for AI to:
+""")
+            if module_summaries and CODE_SAMPLE_SECTIONS.intersection(sections):
+                builder.text("Module Summaries:\n")
+                builder.items('module summaries', [f"Module {module}:{chr(10)}{summary}" for module, summary in module_summaries.items()], priority=2, separator='\n\n')
+                builder.text("\n\n")
+            elif CODE_SAMPLE_SECTIONS.intersection(sections):
+                # Samples from the files with the most classes and functions come first
+                code_contents = project_structure['code_contents']
+                sample_files = sorted(code_contents, key=lambda f: -(file_index[f]['classes'] + file_index[f]['functions']) if f in file_index else 0)
+                builder.text("Code Sample Analysis:\n")
+                builder.items('code samples', [f"File: {file}:{chr(10)}{code_contents[file]}..." for file in sample_files], priority=2, truncate=True)
+                builder.text("\n\n")
+            builder.text(f"""Based on this detailed analysis, create behavior rules for AI to:
 1. Replicate the project's exact code style and patterns
 2. Match naming conventions precisely
 3. Follow identical error handling patterns
@@ -352,33 +817,7 @@ Based on this detailed analysis, create behavior rules for AI to:
 9. Follow configuration patterns
 
 Return a JSON object defining AI behavior rules:
-{{"ai_behavior": {{
-    "code_generation": {{
-        "style": {{
-            "prefer": [],
-            "avoid": []
-        }},
-        "error_handling": {{
-            "prefer": [],
-            "avoid": []
-        }},
-        "performance": {{
-            "prefer": [],
-            "avoid": []
-        }},
-        "suggest_patterns": {{
-            "improve": [],
-            "avoid": []
-        }},
-        "module_organization": {{
-            "structure": [],  # Analyze and describe the current module structure
-            "dependencies": [],  # Analyze actual dependencies between modules
-            "responsibilities": {{}},  # Analyze and describe each module's core responsibilities
-            "rules": [],  # Extract rules from actual code organization patterns
-            "naming": {{}}  # Extract naming conventions from actual code
-        }}
-    }}
-}}}}
+{rules_schema(sections)}
 
 Critical Guidelines for AI:
 1. NEVER deviate from existing code patterns
@@ -387,72 +826,75 @@ Critical Guidelines for AI:
 4. COPY the existing skill level approach
 5. PRESERVE all established practices
 6. REPLICATE the project's exact style
-7. UNDERSTAND pattern purposes"""
+7. UNDERSTAND pattern purposes""")
+            prompt = self._build_prompt('rules', builder)
     
-            # Get AI response
-            response = self.chat_session.send_message(prompt)
-            
-            # Extract JSON
-            json_match = re.search(r'({[\s\S]*})', response.text)
-            if not json_match:
-                print("⚠️ No JSON found in AI response")
-                raise ValueError("Invalid AI response format")
-                
-            json_str = json_match.group(1)
-            
+            # Get AI response, validating the JSON while it streams in
+            extractor = IncrementalJSONExtractor(required_key='ai_behavior')
             try:
-                ai_rules = json.loads(json_str)
-                
-                if not isinstance(ai_rules, dict) or 'ai_behavior' not in ai_rules:
-                    print("⚠️ Invalid JSON structure in AI response")
-                    raise ValueError("Invalid AI rules structure")
-                    
-                return ai_rules
-                
-            except json.JSONDecodeError as e:
+                self._send_prompt(prompt, extractor=extractor)
+            except JSONStreamError as e:
                 print(f"⚠️ Error parsing AI response JSON: {e}")
                 raise
+
+            if not extractor.done:
+                print("⚠️ No JSON found in AI response")
+                raise JSONStreamError("Invalid AI response format")
+
+            ai_rules = extractor.result
+            if not isinstance(ai_rules.get('ai_behavior'), dict):
+                print("⚠️ Invalid JSON structure in AI response")
+                raise ValueError("Invalid AI rules structure")
+
+            return ai_rules
                 
         except Exception as e:
             print(f"⚠️ Error generating AI rules: {e}")
+            if prompt:
+                self._forget_response(prompt, json_mode=True)
             raise
 
-    def _generate_project_description(self, project_structure: Dict[str, Any]) -> str:
+    def _generate_project_description(self, analysis: Optional[ProjectAnalysis] = None) -> str:
         """Generate project description using AI based on project analysis."""
         try:
+            project_structure = (analysis or self.get_analysis()).structure
+
             # Analyze core modules
             core_modules = []
-            for file in project_structure.get('files', []):
+            for file, entry in project_structure.get('file_index', {}).items():
                 if file.endswith('.py') and not any(x in file.lower() for x in ['setup', 'config', 'test']):
-                    module_info = {
-                        'name': file,
-                        'classes': [c for c in project_structure['patterns']['class_patterns'] if c['file'] == file],
-                        'functions': [f for f in project_structure['patterns']['function_patterns'] if f['file'] == file],
-                        'imports': [imp for imp in project_structure['patterns']['imports'] if imp in file]
-                    }
-                    core_modules.append(module_info)
+                    core_modules.append({'name': file, **entry})
 
             # Analyze main patterns
+            totals = project_structure.get('pattern_totals', {})
             main_patterns = {
-                'error_handling': project_structure.get('patterns', {}).get('error_patterns', []),
-                'performance': project_structure.get('patterns', {}).get('performance_patterns', []),
-                'code_organization': project_structure.get('patterns', {}).get('code_organization', [])
+                'error_handling': totals.get('error_patterns', 0),
+                'performance': totals.get('performance_patterns', 0),
+                'code_organization': totals.get('code_organization', 0)
             }
 
-            # Create detailed prompt for AI
-            prompt = f"""Analyze this project structure and create a detailed description (2-3 sentences) that captures its essence:
+            # Modules with the most classes and functions are kept first when trimming
+            ranked_modules = sorted(core_modules, key=lambda m: -(m['classes'] + m['functions']))
+
+            # Create detailed prompt for AI, trimmed to the token budget
+            builder = PromptBuilder()
+            builder.text("""Analyze this project structure and create a detailed description (2-3 sentences) that captures its essence:
 
 Project Overview:
 1. Core Modules Analysis:
-{chr(10).join([f"- {m['name']}: {len(m['classes'])} classes, {len(m['functions'])} functions" for m in core_modules])}
+""")
+            builder.items('core modules', [f"- {m['name']}: {m['classes']} classes, {m['functions']} functions" for m in ranked_modules], priority=0)
+            builder.text("""
 
 2. Module Responsibilities:
-{chr(10).join([f"- {m['name']}: Main purpose indicated by {', '.join([c['name'] for c in m['classes'][:2]])}" for m in core_modules if m['classes']])}
+""")
+            builder.items('module responsibilities', [f"- {m['name']}: Main purpose indicated by {', '.join(m['top_classes'][:2])}" for m in ranked_modules if m['top_classes']], priority=1)
+            builder.text(f"""
 
 3. Technical Implementation:
-- Error Handling: {len(main_patterns['error_handling'])} patterns found
-- Performance Optimizations: {len(main_patterns['performance'])} patterns found
-- Code Organization: {len(main_patterns['code_organization'])} patterns found
+- Error Handling: {main_patterns['error_handling']} patterns found
+- Performance Optimizations: {main_patterns['performance']} patterns found
+- Code Organization: {main_patterns['code_organization']} patterns found
 
 4. Project Architecture:
 - Total Files: {len(project_structure.get('files', []))}
@@ -466,11 +908,11 @@ Based on this analysis, create a description that covers:
 4. Unique characteristics or innovations
 
 Format: Return a clear, concise description focusing on what makes this project unique.
-Do not include technical metrics in the description."""
+Do not include technical metrics in the description.""")
+            prompt = self._build_prompt('description', builder)
 
             # Get AI response
-            response = self.chat_session.send_message(prompt)
-            description = response.text.strip()
+            description = self._send_prompt(prompt, stateless=True).strip()
             
             # Validate description length and content
             if len(description.split()) > 100:  # Length limit
@@ -480,12 +922,13 @@ Do not include technical metrics in the description."""
             
         except Exception as e:
             print(f"⚠️ Error generating project description: {e}")
-            return "A software project with automated analysis and rule generation capabilities."
+            return DEFAULT_DESCRIPTION
 
-    def _generate_markdown_rules(self, project_info: Dict[str, Any], ai_rules: Dict[str, Any]) -> str:
+    def _generate_markdown_rules(self, project_info: Dict[str, Any], ai_rules: Dict[str, Any], analysis: Optional[ProjectAnalysis] = None) -> str:
         """Generate rules in markdown format."""
         timestamp = self._get_timestamp()
-        description = project_info.get('description', 'A software project with automated analysis and rule generation capabilities.')
+        analysis = analysis or self.get_analysis()
+        description = project_info.get('description', DEFAULT_DESCRIPTION)
         
         markdown = f"""# Project Rules
 
@@ -496,6 +939,7 @@ Do not include technical metrics in the description."""
 - **Language**: {project_info.get('language', 'unknown')}
 - **Framework**: {project_info.get('framework', 'none')}
 - **Type**: {project_info.get('type', 'application')}
+- **Files Analyzed**: {analysis.files_analyzed}
 
 ## Project Description
 {description}
@@ -551,92 +995,362 @@ Do not include technical metrics in the description."""
             
         return markdown
 
-    def generate_rules_file(self, project_info: Dict[str, Any] = None, format: str = 'json') -> str:
-        """Generate the .cursorrules file based on project analysis and AI suggestions."""
+    def _generate_rules_and_description(self, project_info: Dict[str, Any], analysis: ProjectAnalysis,
+                                        sections: Optional[List[str]] = None,
+                                        description: Optional[str] = None) -> Tuple[Dict[str, Any], str]:
+        """Request the AI rules and the project description at the same time.
+        
+        Args:
+            project_info: Detected project information
+            analysis: Structure analysis to use
+            sections: Rules sections to request, all if omitted; an empty list
+                skips the rules request
+            description: Description to use instead of requesting one
+        
+        The two requests are independent: the description is always a
+        stateless request, and so are the rules unless history_turns keeps a
+        chat session. Each has request_timeout seconds; a late description
+        falls back to the default text, late rules raise TimeoutError. For
+        large projects the modules are summarized first, while the
+        description request is already running.
+        """
+        pool = ThreadPoolExecutor(max_workers=2, thread_name_prefix='rules-llm')
+        try:
+            description_deadline = time.monotonic() + self.request_timeout
+            description_future = None
+            if description is None:
+                description_future = pool.submit(self._generate_project_description, analysis)
+
+            module_summaries = None
+            if sections != [] and CODE_SAMPLE_SECTIONS.intersection(sections or RULE_SECTIONS) \
+                    and self._use_map_reduce(analysis.structure):
+                module_summaries = self._summarize_modules(analysis.structure)
+
+            deadline = time.monotonic() + self.request_timeout
+            rules_future = None
+            if sections != []:
+                rules_future = pool.submit(self._generate_ai_rules, project_info, analysis, sections, module_summaries)
+
+            ai_rules = {'ai_behavior': {'code_generation': {}}}
+            if rules_future:
+                try:
+                    ai_rules = rules_future.result(timeout=max(0, deadline - time.monotonic()))
+                except FutureTimeoutError:
+                    raise TimeoutError(f"AI rules request timed out after {self.request_timeout:.0f}s")
+
+            if description_future:
+                try:
+                    description = description_future.result(timeout=max(0, description_deadline - time.monotonic()))
+                except FutureTimeoutError:
+                    print(f"⚠️ Project description request timed out after {self.request_timeout:.0f}s")
+                    description = DEFAULT_DESCRIPTION
+
+            return ai_rules, description
+        finally:
+            # Do not wait for a request that is still hanging past its deadline
+            pool.shutdown(wait=False)
+
+    def _use_map_reduce(self, structure: Dict[str, Any]) -> bool:
+        """Check whether the project is large enough to summarize module by module.
+        
+        LLM_MAP_REDUCE_MIN_FILES sets the number of analyzed code files from
+        which map-reduce is used (default 400, 0 disables it).
+        """
+        min_files = int(os.environ.get('LLM_MAP_REDUCE_MIN_FILES', 400))
+        return min_files > 0 and len(structure['file_index']) >= min_files and len(self._module_groups(structure)) > 1
+
+    def _module_groups(self, structure: Dict[str, Any]) -> Dict[str, List[str]]:
+        """Group the analyzed code files by top-level module.
+        
+        Files in the project root form the '.' module. When all files sit in
+        one directory (e.g. src/), its subdirectories become the modules.
+        """
+        prefix = ''
+        while True:
+            groups = {}
+            for path in structure['file_index']:
+                rest = path[len(prefix):].replace(os.sep, '/')
+                module = prefix + rest.split('/', 1)[0] if '/' in rest else (prefix.rstrip('/') or '.')
+                groups.setdefault(module, []).append(path)
+            if len(groups) != 1:
+                return groups
+            module, files = next(iter(groups.items()))
+            if module == (prefix.rstrip('/') or '.'):
+                return groups
+            prefix = module + '/'
+
+    def _module_prompt(self, module: str, files: List[str], structure: Dict[str, Any]) -> str:
+        """Build the map prompt summarizing one module."""
+        file_index = structure['file_index']
+        ranked = sorted(files, key=lambda f: (-(file_index[f]['classes'] + file_index[f]['functions']), f))
+        samples = []
+        for rel_path in ranked[:MAP_SAMPLE_FILES]:
+            try:
+                with open(os.path.join(self.project_path, rel_path), 'r', encoding='utf-8', errors='ignore') as f:
+                    samples.append(f"File: {rel_path}:{chr(10)}{f.read(MAP_SAMPLE_CHARS)}...")
+            except (IOError, OSError) as e:
+                print(f"⚠️ Error reading file {rel_path}: {e}")
+
+        classes = sum(file_index[f]['classes'] for f in files)
+        functions = sum(file_index[f]['functions'] for f in files)
+        builder = PromptBuilder(int(os.environ.get('LLM_MAP_TOKEN_BUDGET', 6000)))
+        builder.text(f"""Summarize this module of a larger project, so its conventions can be merged into project-wide coding rules.
+
+Module: {module} ({len(files)} files, {classes} classes, {functions} functions)
+
+Files:
+""")
+        builder.items('module files', [
+            f"- {f}: {file_index[f]['classes']} classes, {file_index[f]['functions']} functions"
+            + (f", imports: {', '.join(file_index[f]['imports'][:5])}" if file_index[f]['imports'] else '')
+            for f in ranked[:MAP_MAX_FILES_LISTED]
+        ], priority=0)
+        builder.text("\n\nCode Samples:\n")
+        builder.items('module samples', samples, priority=1, truncate=True)
+        builder.text("""
+
+Describe in at most 150 words:
+1. The module's responsibility
+2. Naming and code style conventions
+3. Error handling patterns
+4. Performance techniques
+5. How it depends on other modules
+
+Return plain text only.""")
+        prompt, _ = builder.build()
+        return prompt
+
+    def _summarize_modules(self, structure: Dict[str, Any]) -> Dict[str, str]:
+        """Summarize every top-level module in parallel requests (the map step).
+        
+        Each summary is cached under the fingerprint of the module's map
+        prompt, which covers its files, their symbols and its code samples,
+        so only changed modules are sent to the model again. Modules whose
+        summary fails are left out.
+        
+        Returns:
+            Summaries by module, largest modules first
+        """
+        groups = self._module_groups(structure)
+        modules = sorted(groups, key=lambda m: (-len(groups[m]), m))
+        prompts = {module: self._module_prompt(module, groups[module], structure) for module in modules}
+
+        def summarize(module: str) -> str:
+            fingerprint = hashlib.sha256(prompts[module].encode('utf-8')).hexdigest()
+            cache_key = LLMResponseCache.make_key(f"{self.provider.name}:{self.model_name}", f"module-summary:{module}",
+                                                  {'fingerprint': fingerprint})
+            return self._send_prompt(prompts[module], stateless=True, cache_key=cache_key).strip()
+
+        print(f"🧩 Summarizing {len(modules)} modules before generating rules")
+        summaries = {}
+        workers = max(1, int(os.environ.get('LLM_MAP_WORKERS', 4)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='rules-map') as pool:
+            futures = {module: pool.submit(summarize, module) for module in modules}
+            for module in modules:
+                try:
+                    summaries[module] = futures[module].result()
+                except Exception as e:
+                    print(f"⚠️ Error summarizing module {module}: {e}")
+        return summaries
+
+    def _generate_changed_sections(self, project_info: Dict[str, Any], analysis: ProjectAnalysis) -> Tuple[Dict[str, Any], str]:
+        """Request only the rules sections and description whose inputs changed.
+        
+        Sections are taken from the section store while their fingerprints
+        match and the .cursorrules file still exists; everything else is
+        requested in one rules prompt, see section_fingerprints().
+        """
+        fingerprints = section_fingerprints(project_info, analysis.structure, f"{self.provider.name}:{self.model_name}")
+        previous = None
+        if self.section_store and os.path.exists(os.path.join(self.project_path, '.cursorrules')):
+            previous = self.section_store.load()
+        old_fingerprints = previous.get('fingerprints', {}) if previous else {}
+        old_sections = previous['sections'] if previous else {}
+
+        changed = [name for name in RULE_SECTIONS
+                   if name not in old_sections or old_fingerprints.get(name) != fingerprints[name]]
+        description = None
+        if previous and previous.get('description') and old_fingerprints.get('description') == fingerprints['description']:
+            description = previous['description']
+
+        if previous:
+            reused = [name for name in RULE_SECTIONS if name not in changed] + (['description'] if description else [])
+            print(f"♻️ Reusing unchanged rules sections: {', '.join(reused) or 'none'}")
+
+        ai_rules, new_description = self._generate_rules_and_description(project_info, analysis, changed, description)
+        generated = ai_rules['ai_behavior'].get('code_generation') or {}
+
+        # Merge the new sections into the reused ones, remembering what each was written from
+        sections = {}
+        stored_fingerprints = {}
+        for name in RULE_SECTIONS:
+            if name in changed and name in generated:
+                sections[name] = generated[name]
+                stored_fingerprints[name] = fingerprints[name]
+            elif name in old_sections:
+                sections[name] = old_sections[name]
+                stored_fingerprints[name] = old_fingerprints.get(name)
+        if len(changed) == len(RULE_SECTIONS):
+            sections.update((name, value) for name, value in generated.items() if name not in sections)
+
+        if new_description != DEFAULT_DESCRIPTION:
+            stored_fingerprints['description'] = fingerprints['description']
+        if self.section_store:
+            self.section_store.save(stored_fingerprints, sections, new_description)
+
+        return {**ai_rules, 'ai_behavior': {**ai_rules['ai_behavior'], 'code_generation': sections}}, new_description
+
+    def _write_rules_file(self, project_info: Dict[str, Any], ai_rules: Dict[str, Any], description: str,
+                          format: str, analysis: ProjectAnalysis) -> str:
+        """Write .cursorrules in the given format and return its path."""
+        project_info['description'] = description
+        rules_file = os.path.join(self.project_path, '.cursorrules')
+        tmp_file = f"{rules_file}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+        if format.lower() == 'markdown':
+            content = self._generate_markdown_rules(project_info, ai_rules, analysis)
+        else:  # JSON format
+            rules = {
+                "version": "1.0",
+                "last_updated": self._get_timestamp(),
+                "project": {
+                    **project_info,
+                    "description": description
+                },
+                "ai_behavior": ai_rules['ai_behavior']
+            }
+            content = json.dumps(rules, indent=2)
+
+        # Replace the file in one step, the heuristic and refined rules may be written concurrently
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            f.write(content)
+        os.replace(tmp_file, rules_file)
+        return rules_file
+
+    def generate_heuristic_rules_file(self, project_info: Dict[str, Any] = None, format: str = 'json',
+                                      analysis: Optional[ProjectAnalysis] = None) -> str:
+        """Generate the .cursorrules file from the local analysis alone, without any AI request.
+        
+        The rules follow the same schema as the AI rules, see
+        build_heuristic_rules(); refine them later with generate_rules_file().
+        
+        Args:
+            project_info: Project information, detected by the analyzer if omitted
+            format: 'json' or 'markdown'
+            analysis: Structure analysis to use, see get_analysis()
+        """
+        if project_info is None:
+            project_info = self.analyzer.analyze_project_for_rules()
+        analysis = analysis or self.get_analysis()
+
+        ai_rules = build_heuristic_rules(analysis.structure)
+        description = build_heuristic_description(project_info, analysis.structure)
+        return self._write_rules_file(project_info, ai_rules, description, format, analysis)
+
+    def refine_rules_in_background(self, project_info: Dict[str, Any] = None, format: str = 'json') -> threading.Thread:
+        """Replace the rules file with AI-generated rules in a background thread.
+        
+        If the refinement fails, the existing rules file is kept. Processes
+        that exit soon after should call wait_for_refinements() first.
+        """
+        project_info = dict(project_info) if project_info is not None else None
+
+        def refine() -> None:
+            try:
+                rules_file = self.generate_rules_file(project_info, format=format)
+                print(f"✨ Refined {os.path.basename(rules_file)} with AI rules")
+            except Exception as e:
+                print(f"⚠️ Keeping the locally generated rules: {e}")
+            finally:
+                with _refinements_lock:
+                    _refinements.discard(threading.current_thread())
+
+        thread = threading.Thread(target=refine, name='rules-refine', daemon=True)
+        with _refinements_lock:
+            _refinements.add(thread)
+        thread.start()
+        return thread
+
+    def generate_rules_file(self, project_info: Dict[str, Any] = None, format: str = 'json', analysis: Optional[ProjectAnalysis] = None) -> str:
+        """Generate the .cursorrules file based on project analysis and AI suggestions.
+        
+        Args:
+            project_info: Project information, detected by the analyzer if omitted
+            format: 'json' or 'markdown'
+            analysis: Structure analysis to use, see get_analysis()
+        """
         try:
+            # Set up the AI provider first, so a missing API key fails before the analysis
+            self.provider
+
             # Use analyzer if no project_info provided
             if project_info is None:
                 project_info = self.analyzer.analyze_project_for_rules()
             
-            # Analyze project structure
-            project_structure = self._analyze_project_structure()
-            
-            # Generate AI rules
-            ai_rules = self._generate_ai_rules(project_info)
-            
-            # Generate project description
-            description = self._generate_project_description(project_structure)
-            project_info['description'] = description
-            
-            # Create rules file path
-            rules_file = os.path.join(self.project_path, '.cursorrules')
+            # Analyze project structure once for every prompt
+            analysis = analysis or self.get_analysis()
             
-            if format.lower() == 'markdown':
-                content = self._generate_markdown_rules(project_info, ai_rules)
-                with open(rules_file, 'w', encoding='utf-8') as f:
-                    f.write(content)
-            else:  # JSON format
-                rules = {
-                    "version": "1.0",
-                    "last_updated": self._get_timestamp(),
-                    "project": {
-                        **project_info,
-                        "description": description
-                    },
-                    "ai_behavior": ai_rules['ai_behavior']
-                }
-                with open(rules_file, 'w', encoding='utf-8') as f:
-                    json.dump(rules, f, indent=2)
-            
-            return rules_file
+            # Generate the changed AI rules sections and project description concurrently
+            ai_rules, description = self._generate_changed_sections(project_info, analysis)
+            return self._write_rules_file(project_info, ai_rules, description, format, analysis)
                 
         except Exception as e:
             print(f"❌ Failed to generate rules: {e}")
             raise 
 
-    def _analyze_web_patterns(self, content: str, rel_path: str, structure: Dict[str, Any]) -> None:
+    def _finditer(self, category: str, key: str, content: str):
+        """Iterate pattern matches, skipping the scan when a required literal is absent."""
+        if not self.patterns_analyzer.may_match(category, key, content):
+            return iter(())
+        return self.compiled_patterns[category][key].finditer(content)
+
+    def _analyze_web_patterns(self, content: str, rel_path: str, structure: Dict[str, Any], line_index: LineIndex) -> None:
         """Analyze React/Next.js specific patterns."""
         # Find interfaces and types
-        for match in self.compiled_patterns['common']['interface'].finditer(content):
-            structure['patterns']['class_patterns'].append({
+        for match in self._finditer('common', 'interface', content):
+            self._add_pattern(structure, 'class_patterns', {
                 'name': match.group(1),
                 'type': 'interface/type',
                 'inheritance': match.group(2).strip() if match.group(2) else '',
-                'file': rel_path
+                'file': rel_path,
+                'line': line_index.line_of(match.start())
             })
 
         # Find React components
-        for match in self.compiled_patterns['common']['jsx_component'].finditer(content):
+        for match in self._finditer('common', 'jsx_component', content):
             component_name = match.group(1)
             if component_name[0].isupper():  # React components start with uppercase
-                structure['patterns']['class_patterns'].append({
+                self._add_pattern(structure, 'class_patterns', {
                     'name': component_name,
                     'type': 'react_component',
-                    'file': rel_path
+                    'file': rel_path,
+                    'line': line_index.line_of(match.start())
                 })
 
         # Find React hooks
-        for hook in re.finditer(self.compiled_patterns['common']['react_hook'], content):
-            structure['patterns']['function_patterns'].append({
+        for hook in self._finditer('common', 'react_hook', content):
+            self._add_pattern(structure, 'function_patterns', {
                 'name': hook.group(0),
                 'type': 'react_hook',
-                'file': rel_path
+                'file': rel_path,
+                'line': line_index.line_of(hook.start())
             })
 
         # Find Next.js specific patterns
         if any(x in rel_path for x in ['pages/', 'app/']):
             # Check for Next.js data fetching methods
-            for method in re.finditer(self.compiled_patterns['common']['next_api'], content):
-                structure['patterns']['function_patterns'].append({
+            for method in self._finditer('common', 'next_api', content):
+                self._add_pattern(structure, 'function_patterns', {
                     'name': method.group(0),
                     'type': 'next_data_fetching',
-                    'file': rel_path
+                    'file': rel_path,
+                    'line': line_index.line_of(method.start())
                 })
 
             # Analyze page/route structure
             page_match = re.search(self.compiled_patterns['common']['next_page'], rel_path)
             if page_match:
-                structure['patterns']['code_organization'].append({
+                self._add_pattern(structure, 'code_organization', {
                     'type': 'next_page',
                     'route': page_match.group('route'),
                     'nested': page_match.group('nested'),
@@ -645,69 +1359,76 @@ Do not include technical metrics in the description."""
 
             # Check for layouts
             if re.search(self.compiled_patterns['common']['next_layout'], rel_path):
-                structure['patterns']['code_organization'].append({
+                self._add_pattern(structure, 'code_organization', {
                     'type': 'next_layout',
                     'file': rel_path
                 })
 
         # Find styled-components patterns
-        for match in re.finditer(self.compiled_patterns['common']['styled_component'], content):
-            structure['patterns']['code_organization'].append({
+        for match in self._finditer('common', 'styled_component', content):
+            self._add_pattern(structure, 'code_organization', {
                 'type': 'styled_component',
                 'element': match.group('element') if match.group('element') else 'css',
-                'file': rel_path
+                'file': rel_path,
+                'line': line_index.line_of(match.start())
             })
 
-    def _analyze_unity_patterns(self, content: str, rel_path: str, structure: Dict[str, Any]) -> None:
+    def _analyze_unity_patterns(self, content: str, rel_path: str, structure: Dict[str, Any], line_index: LineIndex) -> None:
         """Analyze Unity-specific patterns in C# scripts."""
         # Find MonoBehaviour and ScriptableObject components
-        for match in self.compiled_patterns['unity']['component'].finditer(content):
-            structure['patterns']['class_patterns'].append({
+        for match in self._finditer('unity', 'component', content):
+            self._add_pattern(structure, 'class_patterns', {
                 'name': match.group(0),
                 'type': 'unity_component',
-                'file': rel_path
+                'file': rel_path,
+                'line': line_index.line_of(match.start())
             })
 
         # Find Unity lifecycle methods
-        for match in self.compiled_patterns['unity']['lifecycle'].finditer(content):
-            structure['patterns']['function_patterns'].append({
+        for match in self._finditer('unity', 'lifecycle', content):
+            self._add_pattern(structure, 'function_patterns', {
                 'name': match.group(0),
                 'type': 'unity_lifecycle',
-                'file': rel_path
+                'file': rel_path,
+                'line': line_index.line_of(match.start())
             })
 
         # Find Unity attributes
-        for match in self.compiled_patterns['unity']['attribute'].finditer(content):
-            structure['patterns']['code_organization'].append({
+        for match in self._finditer('unity', 'attribute', content):
+            self._add_pattern(structure, 'code_organization', {
                 'type': 'unity_attribute',
                 'name': match.group(0),
                 'parameters': match.group('params') if match.group('params') else '',
-                'file': rel_path
+                'file': rel_path,
+                'line': line_index.line_of(match.start())
             })
 
         # Find Unity types
-        for match in self.compiled_patterns['unity']['type'].finditer(content):
-            structure['patterns']['class_patterns'].append({
+        for match in self._finditer('unity', 'type', content):
+            self._add_pattern(structure, 'class_patterns', {
                 'name': match.group(0),
                 'type': 'unity_type',
-                'file': rel_path
+                'file': rel_path,
+                'line': line_index.line_of(match.start())
             })
 
         # Find Unity events
-        for match in self.compiled_patterns['unity']['event'].finditer(content):
-            structure['patterns']['code_organization'].append({
+        for match in self._finditer('unity', 'event', content):
+            self._add_pattern(structure, 'code_organization', {
                 'type': 'unity_event',
                 'event_type': match.group('type'),
                 'name': match.group('name'),
-                'file': rel_path
+                'file': rel_path,
+                'line': line_index.line_of(match.start())
             })
 
         # Find Unity serialized fields
-        for match in self.compiled_patterns['unity']['field'].finditer(content):
-            structure['patterns']['code_organization'].append({
+        for match in self._finditer('unity', 'field', content):
+            self._add_pattern(structure, 'code_organization', {
                 'type': 'unity_field',
                 'field_type': match.group(1),
                 'name': match.group(2),
-                'file': rel_path
+                'file': rel_path,
+                'line': line_index.line_of(match.start())
             })
 
@@ -0,0 +1,127 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from typing import Dict, Any, List, Optional
+
+# Sections of ai_behavior.code_generation, in the order of the rules schema
+RULE_SECTIONS = ['style', 'error_handling', 'performance', 'suggest_patterns', 'module_organization']
+
+# Sections written from the code samples, the prompt leaves the samples out without them
+CODE_SAMPLE_SECTIONS = {'style', 'error_handling', 'performance', 'suggest_patterns'}
+
+# JSON schema of each section as shown in the rules prompt
+SECTION_SCHEMAS = {
+    'style': '''        "style": {
+            "prefer": [],
+            "avoid": []
+        }''',
+    'error_handling': '''        "error_handling": {
+            "prefer": [],
+            "avoid": []
+        }''',
+    'performance': '''        "performance": {
+            "prefer": [],
+            "avoid": []
+        }''',
+    'suggest_patterns': '''        "suggest_patterns": {
+            "improve": [],
+            "avoid": []
+        }''',
+    'module_organization': '''        "module_organization": {
+            "structure": [],  # Analyze and describe the current module structure
+            "dependencies": [],  # Analyze actual dependencies between modules
+            "responsibilities": {},  # Analyze and describe each module's core responsibilities
+            "rules": [],  # Extract rules from actual code organization patterns
+            "naming": {}  # Extract naming conventions from actual code
+        }''',
+}
+
+DEFAULT_SECTIONS_DIR = os.path.join(os.path.expanduser('~'), '.cursorfocus', 'sections')
+
+def rules_schema(sections: List[str]) -> str:
+    """JSON schema of the rules response, limited to the given sections."""
+    body = ',\n'.join(SECTION_SCHEMAS[name] for name in RULE_SECTIONS if name in sections)
+    return '{"ai_behavior": {\n    "code_generation": {\n' + body + '\n    }\n}}'
+
+def section_fingerprints(project_info: Dict[str, Any], structure: Dict[str, Any], model: str) -> Dict[str, str]:
+    """Fingerprint the inputs of every rules section and of the description.
+
+    Each section only depends on the parts of the analysis it is written
+    from, so a change to e.g. requirements.txt leaves the style and error
+    handling sections untouched. Every fingerprint includes the model, so
+    sections written by another provider or model are requested again.
+
+    Args:
+        project_info: Project information passed to the rules prompt
+        structure: Structure of the project analysis
+        model: 'provider:model' writing the sections
+    """
+    info = {key: value for key, value in project_info.items() if key != 'description'}
+    file_index = structure.get('file_index', {})
+    totals = structure.get('pattern_totals', {})
+    samples = structure.get('code_contents', {})
+    dependencies = [structure.get('declared_dependencies', {}), sorted(structure.get('dependencies', {}))]
+
+    inputs = {
+        'style': [info, samples, {f: [e['top_classes'], e['top_functions']] for f, e in file_index.items()}],
+        'error_handling': [info, samples, totals.get('error_patterns', 0)],
+        'performance': [info, samples, totals.get('performance_patterns', 0), structure.get('frameworks', [])],
+        'suggest_patterns': [info, samples, totals],
+        'module_organization': [
+            info,
+            {f: [e['imports'], e['classes'], e['functions']] for f, e in file_index.items()},
+            structure.get('manifest_files', []),
+            dependencies
+        ],
+        'description': [
+            {f: [e['classes'], e['functions'], e['top_classes']] for f, e in file_index.items()},
+            totals,
+            len(structure.get('files', [])),
+            len(structure.get('dependencies', {}))
+        ],
+    }
+    return {
+        name: hashlib.sha256(json.dumps([model, value], sort_keys=True, default=str).encode('utf-8')).hexdigest()
+        for name, value in inputs.items()
+    }
+
+class SectionStore:
+    """Sections of the last generated rules of each project, with their input fingerprints.
+
+    Stored as one JSON file per project under ~/.cursorfocus/sections (or
+    LLM_SECTIONS_DIR), so the next update can re-prompt only what changed.
+    """
+
+    def __init__(self, project_path: str, store_dir: Optional[str] = None):
+        self.store_dir = store_dir or os.environ.get('LLM_SECTIONS_DIR') or DEFAULT_SECTIONS_DIR
+        key = hashlib.sha1(os.path.abspath(project_path).encode('utf-8')).hexdigest()
+        self.path = os.path.join(self.store_dir, f"{key}.json")
+        self.logger = logging.getLogger(__name__)
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        """Load the stored state: 'fingerprints', 'sections' and 'description'."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict) or not isinstance(state.get('sections'), dict):
+            return None
+        return state
+
+    def save(self, fingerprints: Dict[str, str], sections: Dict[str, Any], description: Optional[str]) -> None:
+        """Store the generated sections and the fingerprints they were written from."""
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            os.makedirs(self.store_dir, exist_ok=True)
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'fingerprints': fingerprints, 'sections': sections, 'description': description}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            self.logger.warning(f"Could not store rules sections: {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
@@ -1,25 +1,191 @@
 import os
 import time
+import queue
+import atexit
 import logging
-from typing import Dict, Any, List, Optional, Set
+import threading
+from concurrent.futures import Future
+from typing import Dict, Any, Callable, List, Optional, Set, Tuple
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from rules_generator import RulesGenerator
+from debounce import Debouncer
 from rules_analyzer import RulesAnalyzer
 from project_detector import detect_project_type
 from config import load_config, IGNORED_NAMES
+from analyzers import should_ignore_file
 
 # Load configuration at module level
 _config = load_config()
 
+class RulesUpdateQueue:
+    """Bounded queue running watcher-triggered rules updates on a worker pool.
+    
+    Each project has at most one pending update: changes arriving while one
+    is queued are merged into it, and an update requested while the project
+    is being updated runs after that one finishes, never concurrently. When
+    more than max_pending projects are waiting, the queued changes are
+    coalesced into full rescans of the waiting projects, which take no
+    queue slots.
+    """
+
+    def __init__(self, workers: Optional[int] = None, max_pending: Optional[int] = None):
+        """
+        Args:
+            workers: Updates run at the same time ('rules_update_workers', default 2)
+            max_pending: Projects with queued changes before they are coalesced
+                into full rescans ('rules_update_queue_size', default 32)
+        """
+        self.workers = workers or _config.get('rules_update_workers', 2)
+        self.max_pending = max_pending or _config.get('rules_update_queue_size', 32)
+        self.logger = logging.getLogger(__name__)
+        self._pending: Dict[str, Tuple['RulesWatcher', Optional[Set[str]]]] = {}  # In arrival order
+        self._rescans: Dict[str, 'RulesWatcher'] = {}  # Coalesced full rescans
+        self._futures: Dict[str, List[Future]] = {}  # Submissions waiting on a queued update
+        self._running: Set[str] = set()
+        self._threads: List[threading.Thread] = []
+        self._stopped = False
+        self._condition = threading.Condition()
+        self.stats = {'submitted': 0, 'merged': 0, 'coalesced': 0, 'completed': 0, 'failed': 0}
+
+    @staticmethod
+    def _key(watcher: 'RulesWatcher') -> str:
+        return os.path.abspath(watcher.project_path)
+
+    def submit(self, watcher: 'RulesWatcher', changed_paths: Optional[Set[str]] = None) -> Future:
+        """Queue a rules update of the watcher's project.
+        
+        Args:
+            watcher: Watcher whose _update_rules() is run
+            changed_paths: Files that changed, None for a full rescan
+            
+        Returns:
+            Future resolved with the result of the update this submission
+            ended up in, or with its exception
+        """
+        key = self._key(watcher)
+        future = Future()
+        with self._condition:
+            self.stats['submitted'] += 1
+            self._futures.setdefault(key, []).append(future)
+            if key in self._rescans:
+                self._rescans[key] = watcher
+            elif key in self._pending:
+                _, paths = self._pending[key]
+                merged = None if paths is None or changed_paths is None else paths | changed_paths
+                self._pending[key] = (watcher, merged)
+                self.stats['merged'] += 1
+            elif len(self._pending) >= self.max_pending:
+                # Too many projects waiting: forget the individual changes and rescan them all
+                self.stats['coalesced'] += len(self._pending) + 1
+                self.logger.warning(f"Rules update queue full, rescanning {len(self._pending) + 1} projects instead")
+                self._rescans.update((pending_key, pending[0]) for pending_key, pending in self._pending.items())
+                self._rescans[key] = watcher
+                self._pending.clear()
+            else:
+                self._pending[key] = (watcher, set(changed_paths) if changed_paths is not None else None)
+            self._start_workers()
+            self._condition.notify()
+        return future
+
+    def discard(self, watcher: 'RulesWatcher') -> None:
+        """Drop the queued update of the watcher's project, if any."""
+        key = self._key(watcher)
+        with self._condition:
+            if key in self._pending and self._pending[key][0] is watcher:
+                del self._pending[key]
+            if self._rescans.get(key) is watcher:
+                del self._rescans[key]
+            if key not in self._pending and key not in self._rescans:
+                for future in self._futures.pop(key, []):
+                    future.cancel()
+
+    def _start_workers(self) -> None:
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        while len(self._threads) < self.workers:
+            thread = threading.Thread(target=self._work, name=f"rules-update-{len(self._threads)}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_job(self) -> Optional[Tuple[str, 'RulesWatcher', Optional[Set[str]]]]:
+        """Take the oldest queued update of a project that is not being updated."""
+        for jobs, full in ((self._pending, False), (self._rescans, True)):
+            for key in jobs:
+                if key not in self._running:
+                    job = jobs.pop(key)
+                    return (key, job, None) if full else (key, job[0], job[1])
+        return None
+
+    def _work(self) -> None:
+        while True:
+            with self._condition:
+                job = None
+                while not self._stopped and job is None:
+                    job = self._next_job()
+                    if job is None:
+                        self._condition.wait()
+                if self._stopped:
+                    return
+                key, watcher, changed_paths = job
+                self._running.add(key)
+                futures = [future for future in self._futures.pop(key, []) if future.set_running_or_notify_cancel()]
+
+            try:
+                result = watcher._update_rules(changed_paths)
+                outcome = 'completed'
+                for future in futures:
+                    future.set_result(result)
+            except Exception as e:
+                self.logger.error(f"Error updating rules for project {watcher.project_id}: {e}", exc_info=True)
+                outcome = 'failed'
+                for future in futures:
+                    future.set_exception(e)
+            finally:
+                with self._condition:
+                    self._running.discard(key)
+                    self.stats[outcome] += 1
+                    # A follow-up update of this project may be waiting
+                    self._condition.notify_all()
+
+    def pending_count(self) -> int:
+        """Number of projects waiting for an update."""
+        with self._condition:
+            return len(self._pending) + len(self._rescans)
+
+    def stop(self) -> None:
+        """Drop the queued updates and let the workers finish their current one."""
+        with self._condition:
+            self._stopped = True
+            self._pending.clear()
+            self._rescans.clear()
+            for futures in self._futures.values():
+                for future in futures:
+                    future.cancel()
+            self._futures.clear()
+            self._condition.notify_all()
+
+# Update queue shared by every RulesWatcher in the process
+_update_queue = None
+_update_queue_lock = threading.Lock()
+
+def get_update_queue() -> RulesUpdateQueue:
+    """Get the process-wide rules update queue."""
+    global _update_queue
+    with _update_queue_lock:
+        if _update_queue is None:
+            _update_queue = RulesUpdateQueue()
+        return _update_queue
+
 class RulesWatcher(FileSystemEventHandler):
     def __init__(self, project_path: str, project_id: str):
         self.project_path = project_path
         self.project_id = project_id
-        self.rules_generator = RulesGenerator(project_path)
+        self._rules_generator = None  # Created by the first rules update
         self.rules_analyzer = RulesAnalyzer(project_path)
-        self.last_update = 0
-        self.update_delay = _config.get('rules_update_delay', 5)  # Seconds to wait before updating to avoid multiple updates
+        self.last_generated = None  # (analysis fingerprint, project info) of the last update
+        self.update_delay = _config.get('rules_update_delay', 5)  # Quiet seconds after the last change before updating
+        self.update_max_wait = _config.get('rules_update_max_wait', 60)  # Longest a change waits during constant edits
+        self.debouncer = Debouncer(self.update_delay, self._queue_update, self.update_max_wait, name=f"rules-changes-{project_id}")
         self.auto_update = False  # Disable auto-update by default
         self.logger = logging.getLogger(__name__)
         
@@ -47,20 +213,44 @@ class RulesWatcher(FileSystemEventHandler):
             '.gemspec'
         }
 
+    @property
+    def rules_generator(self) -> RulesGenerator:
+        """Rules generator of the project, created when rules are first updated."""
+        if self._rules_generator is None:
+            self._rules_generator = RulesGenerator(self.project_path)
+        return self._rules_generator
+
     def on_modified(self, event):
-        if event.is_directory or not self.auto_update:  # Skip if auto-update is disabled
+        if not event.is_directory:
+            self._on_change(event.src_path)
+
+    def on_created(self, event):
+        if not event.is_directory:
+            self._on_change(event.src_path)
+
+    def on_deleted(self, event):
+        if not event.is_directory:
+            self._on_change(event.src_path)
+
+    def on_moved(self, event):
+        if not event.is_directory:
+            # Editors save by moving a temporary file over the real one
+            self._on_change(event.src_path)
+            self._on_change(event.dest_path)
+
+    def _on_change(self, file_path: str) -> None:
+        """Collect a changed trigger file; the rules are updated once the changes stop."""
+        if not self.auto_update:  # Skip if auto-update is disabled
             return
-            
+
         # Only process Focus.md changes or project configuration files
-        if not self._should_process_file(event.src_path):
-            return
-            
-        current_time = time.time()
-        if current_time - self.last_update < self.update_delay:
-            return
-            
-        self.last_update = current_time
-        self._update_rules()
+        file_path = os.fsdecode(file_path)
+        if self._should_process_file(file_path):
+            self.debouncer.trigger(file_path)
+
+    def _queue_update(self, changed_paths: Set[str]) -> None:
+        """Hand a burst of changes to the shared update queue, off the event threads."""
+        get_update_queue().submit(self, changed_paths)
 
     def _should_process_file(self, file_path: str) -> bool:
         """Check if the file change should trigger a rules update."""
@@ -68,9 +258,9 @@ class RulesWatcher(FileSystemEventHandler):
             return False
             
         # Skip files in ignored directories
-        for ignored in IGNORED_NAMES:
-            if f"/{ignored}/" in file_path or f"\\{ignored}\\" in file_path:
-                return False
+        rel_dir = os.path.relpath(os.path.dirname(file_path), self.project_path)
+        if not IGNORED_NAMES.isdisjoint(rel_dir.split(os.sep)):
+            return False
                 
         filename = os.path.basename(file_path)
         
@@ -87,43 +277,344 @@ class RulesWatcher(FileSystemEventHandler):
             
         return False
 
-    def _update_rules(self):
-        """Update the .cursorrules file."""
+    def _update_rules(self, changed_paths: Optional[Set[str]] = None):
+        """Update the .cursorrules file.
+        
+        Args:
+            changed_paths: Files whose changes triggered the update, None for a
+                full rescan, which analyzes the project again and regenerates
+                the rules even if nothing seems to have changed
+            
+        Raises:
+            Exception: Errors of the update are left to the update queue,
+                which logs and counts them
+        """
         if not self.auto_update:  # Skip if auto-update is disabled
             return
             
-        try:
-            # Re-detect project type
-            project_info = detect_project_type(self.project_path)
-            
-            # If project_info is missing or incomplete, enhance it with analyzer
-            if not project_info.get('language') or project_info.get('language') == 'unknown':
-                try:
-                    analyzed_info = self.rules_analyzer.analyze_project_for_rules()
-                    # Merge info, but keep detect_project_type results as primary
-                    for key, value in analyzed_info.items():
-                        if not project_info.get(key) or project_info[key] == 'unknown' or project_info[key] == 'none':
-                            project_info[key] = value
-                except Exception as e:
-                    self.logger.warning(f"Error enhancing project info with analyzer: {e}")
-            
-            # Generate new rules
-            rules_file = self.rules_generator.generate_rules_file(project_info)
-            self.logger.info(f"Updated .cursorrules for project {self.project_id} at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        full_rescan = changed_paths is None
+        if full_rescan:
+            self.logger.info(f"Rescanning project {self.project_id}")
+        elif changed_paths:
+            names = sorted(os.path.relpath(path, self.project_path) for path in changed_paths)
+            self.logger.info(f"Updating rules of project {self.project_id} after changes to: {', '.join(names)}")
+
+        # Re-detect project type
+        project_info = detect_project_type(self.project_path)
+        
+        # If project_info is missing or incomplete, enhance it with analyzer
+        if not project_info.get('language') or project_info.get('language') == 'unknown':
+            try:
+                analyzed_info = self.rules_analyzer.analyze_project_for_rules()
+                # Merge info, but keep detect_project_type results as primary
+                for key, value in analyzed_info.items():
+                    if not project_info.get(key) or project_info[key] == 'unknown' or project_info[key] == 'none':
+                        project_info[key] = value
+            except Exception as e:
+                self.logger.warning(f"Error enhancing project info with analyzer: {e}")
+        
+        # Skip the AI calls when neither the analyzed files nor the project info changed
+        analysis = self.rules_generator.get_analysis(refresh=full_rescan)
+        generated = (analysis.fingerprint, dict(project_info))
+        rules_file = os.path.join(self.project_path, '.cursorrules')
+        if not full_rescan and generated == self.last_generated and os.path.exists(rules_file):
+            self.logger.debug(f"Project {self.project_id} unchanged since the last rules update")
             return rules_file
-        except Exception as e:
-            self.logger.error(f"Error updating .cursorrules for project {self.project_id}: {e}", exc_info=True)
-            return None
+
+        # Generate new rules
+        rules_file = self.rules_generator.generate_rules_file(project_info, analysis=analysis)
+        self.last_generated = generated
+        self.logger.info(f"Updated .cursorrules for project {self.project_id} at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        return rules_file
 
     def set_auto_update(self, enabled: bool):
         """Enable or disable auto-update of .cursorrules."""
         self.auto_update = enabled
+        if not enabled:
+            self.debouncer.cancel()
+            get_update_queue().discard(self)
         status = "enabled" if enabled else "disabled"
         self.logger.info(f"Auto-update of .cursorrules is now {status} for project {self.project_id}")
 
+class WatchDispatcher(FileSystemEventHandler):
+    """One watchdog Observer shared by every watched project.
+    
+    Events are routed to the handlers registered for the project roots
+    containing their path. Watches are only placed outside ignored
+    directories: a subtree without any is watched recursively, a directory
+    with ignored children only for its own entries, so e.g. node_modules and
+    .git never take up inotify watches. The watches follow directories as
+    they are created, moved and deleted. Projects nested in another watched
+    project share its watches.
+    
+    The observer thread holds the observer's lock while it dispatches, so it
+    never takes self._lock: events are routed from a snapshot of the
+    handlers, and directory changes are applied to the watches by a
+    separate thread.
+    """
+
+    def __init__(self, ignore: Callable[[str], bool] = should_ignore_file):
+        """
+        Args:
+            ignore: Tells whether a directory name is left unwatched
+        """
+        self.ignore = ignore
+        self._observer = None
+        self._handlers: Dict[str, List[FileSystemEventHandler]] = {}  # Project root -> handlers
+        self._roots: Set[str] = set()  # Roots whose directory trees are watched
+        self._watches: Dict[str, Tuple[Any, bool]] = {}  # Directory -> (ObservedWatch, recursive)
+        self._routes: Tuple[Tuple[str, Tuple[FileSystemEventHandler, ...]], ...] = ()  # Read by dispatch without the lock
+        self._directory_changes = queue.Queue()  # Directory events for the follower thread
+        self._follower = None
+        self._follower_lock = threading.Lock()
+        self._lock = threading.RLock()
+        self.logger = logging.getLogger(__name__)
+
+    def register(self, project_path: str, handler: FileSystemEventHandler) -> None:
+        """Send the events under project_path to handler, starting the observer if needed."""
+        root = os.path.abspath(project_path)
+        with self._lock:
+            self._handlers.setdefault(root, []).append(handler)
+            self._update_routes()
+            try:
+                observer = self._sync_roots()
+            except Exception:
+                self._remove_handler(root, handler)
+                raise
+        self._join(observer)
+
+    def unregister(self, project_path: str, handler: FileSystemEventHandler) -> None:
+        """Stop sending events to handler; the observer stops with the last handler."""
+        root = os.path.abspath(project_path)
+        with self._lock:
+            self._remove_handler(root, handler)
+            observer = self._sync_roots()
+        self._join(observer)
+
+    def _remove_handler(self, root: str, handler: FileSystemEventHandler) -> None:
+        handlers = self._handlers.get(root, [])
+        if handler in handlers:
+            handlers.remove(handler)
+        if not handlers:
+            self._handlers.pop(root, None)
+        self._update_routes()
+
+    def _update_routes(self) -> None:
+        self._routes = tuple((root, tuple(handlers)) for root, handlers in self._handlers.items())
+
+    @staticmethod
+    def _contains(root: str, path: str) -> bool:
+        return path == root or path.startswith(root.rstrip(os.sep) + os.sep)
+
+    def _ignored_below(self, root: str, path: str) -> bool:
+        """Check whether a directory on the way from root down to path is ignored."""
+        rest = path[len(root.rstrip(os.sep)) + 1:]
+        return any(self.ignore(part) for part in rest.split(os.sep) if part)
+
+    def _sync_roots(self) -> Optional[Observer]:
+        """Watch the roots not already covered by another root's watches, drop the rest.
+        
+        Returns:
+            The observer stopped because nothing is watched any more, to be
+            joined once the lock is released
+        """
+        needed = {
+            root for root in self._handlers
+            if not any(other != root and self._contains(other, root) and not self._ignored_below(other, root)
+                       for other in self._handlers)
+        }
+        for root in self._roots - needed:
+            self._unwatch(root, owner=root)
+        added = needed - self._roots
+        self._roots = needed
+        for root in added:
+            self._watch_tree(root)
+
+        if not needed and self._observer is not None:
+            return self._stop_observer()
+        return None
+
+    def _plan(self, directory: str) -> Dict[str, bool]:
+        """Watches covering a directory tree without entering ignored directories.
+        
+        Returns:
+            Whether to watch recursively, by directory
+        """
+        plan = {}
+
+        def visit(path: str) -> bool:
+            # True when the subtree holds no ignored directory
+            try:
+                with os.scandir(path) as entries:
+                    subdirs = [(entry.name, entry.path) for entry in entries if entry.is_dir(follow_symlinks=False)]
+            except OSError:
+                return True
+            clean = True
+            clean_subdirs = []
+            for name, subdir in subdirs:
+                if self.ignore(name):
+                    clean = False
+                elif visit(subdir):
+                    clean_subdirs.append(subdir)
+                else:
+                    clean = False
+            if not clean:
+                plan[path] = False
+                plan.update((subdir, True) for subdir in clean_subdirs)
+            return clean
+
+        if visit(directory):
+            plan[directory] = True
+        return plan
+
+    def _watch_tree(self, directory: str) -> None:
+        if self._observer is None:
+            self._observer = Observer()
+            self._observer.name = 'rules-watcher'
+            self._observer.start()
+        for path, recursive in self._plan(directory).items():
+            if path in self._watches:
+                self._observer.unschedule(self._watches.pop(path)[0])
+            self._watches[path] = (self._observer.schedule(self, path, recursive=recursive), recursive)
+
+    def _owner(self, path: str) -> Optional[str]:
+        """Innermost watched root containing path."""
+        roots = [root for root in self._roots if self._contains(root, path)]
+        return max(roots, key=len) if roots else None
+
+    def _unwatch(self, directory: str, owner: Optional[str] = None) -> None:
+        """Drop the watches at or below directory, only those of owner's tree if given."""
+        for path in [p for p in self._watches if self._contains(directory, p)]:
+            if owner is None or self._owner(path) in (owner, None):
+                self._observer.unschedule(self._watches.pop(path)[0])
+
+    def _covering_watch(self, path: str) -> Optional[str]:
+        """Recursive watch whose tree contains path."""
+        for watched, (_, recursive) in self._watches.items():
+            if recursive and self._contains(watched, path):
+                return watched
+        return None
+
+    def _follow_directory_change(self, event) -> None:
+        """Keep the watches in step with a created, moved or deleted directory."""
+        if event.event_type in ('deleted', 'moved'):
+            self._unwatch(os.fsdecode(event.src_path))
+        if event.event_type not in ('created', 'moved'):
+            return
+
+        path = os.fsdecode(event.dest_path if event.event_type == 'moved' else event.src_path)
+        root = self._owner(path)
+        if root is None:
+            return
+        covering = self._covering_watch(path)
+        if self._ignored_below(root, path):
+            # An ignored directory appeared inside a recursive watch: watch around it instead
+            if covering is not None and self.ignore(os.path.basename(path)):
+                self._unwatch(covering)
+                self._watch_tree(covering)
+        elif covering is None and not self._ignored_below(root, os.path.dirname(path)):
+            self._watch_tree(path)
+
+    def _stop_observer(self) -> Optional[Observer]:
+        """Stop the observer; the caller joins it after releasing the lock."""
+        observer, self._observer = self._observer, None
+        self._watches.clear()
+        try:
+            observer.unschedule_all()
+            observer.stop()
+        except Exception as e:
+            self.logger.error(f"Error stopping the file observer: {e}", exc_info=True)
+        return observer
+
+    def _join(self, observer: Optional[Observer]) -> None:
+        if observer is None or observer is threading.current_thread():
+            return
+        try:
+            observer.join()
+        except Exception as e:
+            self.logger.error(f"Error stopping the file observer: {e}", exc_info=True)
+
+    def _start_follower(self) -> None:
+        with self._follower_lock:
+            if self._follower is None:
+                self._follower = threading.Thread(target=self._follow_directory_changes, name='rules-watch-follower', daemon=True)
+                self._follower.start()
+
+    def _follow_directory_changes(self) -> None:
+        """Apply queued directory changes to the watches, outside the observer thread."""
+        while True:
+            event = self._directory_changes.get()
+            with self._lock:
+                if self._observer is None:
+                    continue
+                try:
+                    self._follow_directory_change(event)
+                except Exception as e:
+                    self.logger.error(f"Error updating watches for {event.src_path}: {e}", exc_info=True)
+
+    def dispatch(self, event) -> None:
+        """Pass an event to the handlers of every project containing its path.
+        
+        Events below an ignored directory are dropped.
+        """
+        paths = [os.fsdecode(event.src_path)]
+        if getattr(event, 'dest_path', None):
+            paths.append(os.fsdecode(event.dest_path))
+        if event.is_directory and event.event_type in ('created', 'moved', 'deleted'):
+            self._directory_changes.put(event)
+            self._start_follower()
+        handlers = [handler for root, root_handlers in self._routes
+                    if any(self._contains(root, path) and not self._ignored_below(root, os.path.dirname(path))
+                           for path in paths)
+                    for handler in root_handlers]
+        for handler in handlers:
+            try:
+                handler.dispatch(event)
+            except Exception as e:
+                self.logger.error(f"Error handling change of {event.src_path}: {e}", exc_info=True)
+
+    def stop(self) -> None:
+        """Drop every handler and stop the observer."""
+        observer = None
+        with self._lock:
+            self._handlers.clear()
+            self._update_routes()
+            self._roots.clear()
+            if self._observer is not None:
+                observer = self._stop_observer()
+        self._join(observer)
+
+    @property
+    def watch_count(self) -> int:
+        """Number of directories scheduled with the observer."""
+        return len(self._watches)
+
+    @property
+    def watched_directories(self) -> Dict[str, bool]:
+        """Scheduled directories, with whether each is watched recursively."""
+        with self._lock:
+            return {path: recursive for path, (_, recursive) in self._watches.items()}
+
+# Dispatcher shared by every ProjectWatcherManager in the process
+_dispatcher = None
+_dispatcher_lock = threading.Lock()
+
+def get_dispatcher() -> WatchDispatcher:
+    """Get the process-wide watch dispatcher, stopped when the process exits."""
+    global _dispatcher
+    with _dispatcher_lock:
+        if _dispatcher is None:
+            _dispatcher = WatchDispatcher()
+            atexit.register(_dispatcher.stop)
+        return _dispatcher
+
 class ProjectWatcherManager:
-    def __init__(self):
-        self.observers: dict[str, Observer] = {} # type: ignore
+    def __init__(self, dispatcher: Optional[WatchDispatcher] = None):
+        """
+        Args:
+            dispatcher: Dispatcher delivering file events, the process-wide one by default
+        """
+        self.dispatcher = dispatcher or get_dispatcher()
         self.watchers: dict[str, RulesWatcher] = {}
         self.logger = logging.getLogger(__name__)
 
@@ -146,17 +637,13 @@ class ProjectWatcherManager:
             
         project_id = project_id or os.path.abspath(project_path)
         
-        if project_id in self.observers:
+        if project_id in self.watchers:
             self.logger.info(f"Project {project_id} is already being watched")
             return project_id
             
         event_handler = RulesWatcher(project_path, project_id)
-        observer = Observer()
-        observer.schedule(event_handler, project_path, recursive=True)
-        
         try:
-            observer.start()
-            self.observers[project_id] = observer
+            self.dispatcher.register(project_path, event_handler)
             self.watchers[project_id] = event_handler
             self.logger.info(f"Started watching project {project_id}")
             return project_id
@@ -173,16 +660,15 @@ class ProjectWatcherManager:
         Returns:
             True if project was removed, False if it wasn't being watched
         """
-        if project_id not in self.observers:
+        if project_id not in self.watchers:
             self.logger.warning(f"Project {project_id} is not being watched")
             return False
             
-        observer = self.observers[project_id]
+        watcher = self.watchers[project_id]
         try:
-            observer.stop()
-            observer.join()
-            
-            del self.observers[project_id]
+            self.dispatcher.unregister(watcher.project_path, watcher)
+            watcher.debouncer.cancel()
+            get_update_queue().discard(watcher)
             del self.watchers[project_id]
             
             self.logger.info(f"Stopped watching project {project_id}")
@@ -197,7 +683,7 @@ class ProjectWatcherManager:
 
     def stop_all(self):
         """Stop watching all projects."""
-        for project_id in list(self.observers.keys()):
+        for project_id in list(self.watchers.keys()):
             self.remove_project(project_id)
         self.logger.info("Stopped watching all projects")
 
@@ -224,15 +710,20 @@ class ProjectWatcherManager:
         Args:
             project_id: The identifier of the project
             
+        The update is a full rescan, queued with the watcher-triggered updates
+        so it never runs concurrently with another update of the project;
+        this call waits for it to finish.
+            
         Returns:
-            True if successful, False if project is not being watched
+            True if successful, False if the update failed or the project is
+            not being watched
         """
         if project_id in self.watchers:
             try:
-                self.watchers[project_id]._update_rules()
+                get_update_queue().submit(self.watchers[project_id], None).result()
                 return True
-            except Exception as e:
-                self.logger.error(f"Error updating rules for project {project_id}: {e}", exc_info=True)
+            except Exception:
+                # Already logged by the update queue
                 return False
         else:
             self.logger.warning(f"Project {project_id} is not being watched")